@@ -16,10 +16,11 @@
 
 
 
-from flask import Flask, request
+from flask import Flask, request, make_response
 from flask_restx import Api, Resource, fields, Namespace
-from queue import Queue
 from services.webhook import send_webhook
+from services.job_executor import JobExecutor
+from services.job_queue import create_job_queue, job_function_key
 import threading
 import uuid
 import os
@@ -30,6 +31,18 @@ from version import BUILD_NUMBER  # Import the BUILD_NUMBER
 from app_utils import log_job_status, discover_and_register_blueprints  # Import the discover_and_register_blueprints function
 from routes.restx_resources import register_restx_namespaces
 from services.gcp_toolkit import trigger_cloud_run_job
+from config import QUEUE_WORKERS, RESOURCE_CLASSES, DEFAULT_RESOURCE_CLASS, JOB_QUEUE_BACKEND, JOB_QUEUE_DB, GUNICORN_WORKERS
+from config import MAX_BACKLOG_SECONDS, JOB_COST_PROBE, RESULT_CACHE_ENABLED, ASYNC_COST_THRESHOLD
+from services.job_cost import estimate_job_cost, backlog_wait_seconds, has_headroom
+from services.job_eta import estimate_new_job
+from services.process_pool import warm_pool
+from services.janitor import start_janitor
+from services.watchdog import start_watchdog
+from services.result_cache import is_bypass_requested, compute_cache_key, get_cached_result, store_result
+from services.job_control import (
+    JobCancelled, start_job, finish_job, cancel_job, is_cancel_requested, cleanup_job_files, start_monitor,
+    stage_timings
+)
 
 # Configurar logger
 logging.basicConfig(
@@ -142,84 +155,217 @@ def create_app():
         security='APIKeyHeader'
     )
 
-    # Create a queue to hold tasks
-    task_queue = Queue()
-    queue_id = id(task_queue)  # Generate a single queue_id for this worker
-
-    # Function to process tasks from the queue
-    def process_queue():
-        while True:
-            job_id, data, task_func, queue_start_time = task_queue.get()
-            queue_time = time.time() - queue_start_time
-            run_start_time = time.time()
-            pid = os.getpid()  # Get the PID of the actual processing thread
-            
-            # Log job status as running
-            log_job_status(job_id, {
-                "job_status": "running",
-                "job_id": job_id,
-                "queue_id": queue_id,
-                "process_id": pid,
-                "response": None
-            })
-            
-            response = task_func()
-            run_time = time.time() - run_start_time
-            total_time = time.time() - queue_start_time
-
-            # SANITIZAR response[0] ANTES de usar
-            logger.info(f"Job {job_id}: [QUEUE] Função executada | Status: {response[2]}")
-            sanitized_response = inspect_and_sanitize_response(response[0] if response[2] == 200 else None, job_id, logger)
-
-            response_data = {
-                "endpoint": response[1],
-                "code": response[2],
-                "id": data.get("id"),
-                "job_id": job_id,
-                "response": sanitized_response,  # ← JÁ SANITIZADO
-                "message": "success" if response[2] == 200 else str(response[0]),
-                "pid": pid,
-                "queue_id": queue_id,
-                "run_time": round(run_time, 3),
-                "queue_time": round(queue_time, 3),
-                "total_time": round(total_time, 3),
-                "queue_length": task_queue.qsize(),
-                "build_number": BUILD_NUMBER  # Add build number to response
-            }
-            
-            # Validar serialização
-            try:
-                json.dumps(response_data)
-            except Exception as e:
-                logger.error(f"Job {job_id}: [QUEUE ERRO] Serialização falhou: {str(e)}")
-                response_data = sanitize_for_json(response_data)
-            
-            # Log job status as done
-            log_job_status(job_id, {
-                "job_status": "done",
-                "job_id": job_id,
-                "queue_id": queue_id,
-                "process_id": pid,
-                "response": response_data
-            })
-
-            # Only send webhook if webhook_url has an actual value (not an empty string)
-            if data.get("webhook_url") and data.get("webhook_url") != "":
-                send_webhook(data.get("webhook_url"), response_data)
-
-            task_queue.task_done()
-
-    # Start the queue processing in a separate thread
-    threading.Thread(target=process_queue, daemon=True).start()
+    # Turn the result of a cancelled or timed-out job into a 499/504 error
+    # and free its scratch files
+    def cancelled_response(control, response):
+        if control is None or not control.cancelled.is_set():
+            return response, None
+        cleanup_job_files(control.job_id, control)
+        code = 504 if control.timed_out else 499
+        return (control.reason, response[1], code), "cancelled"
+
+    # Answer a request from the result cache without running the job
+    def cached_result_response(job_id, data, entry):
+        pid = os.getpid()
+        response_obj = {
+            "endpoint": entry["endpoint"],
+            "code": 200,
+            "id": data.get("id"),
+            "job_id": job_id,
+            "response": entry["response"],
+            "message": "success",
+            "cached": True,
+            "cache_age": round(time.time() - entry["created_at"], 3),
+            "run_time": 0,
+            "queue_time": 0,
+            "total_time": 0,
+            "pid": pid,
+            "queue_id": queue_id,
+            "queue_length": executor.qsize(),
+            "build_number": BUILD_NUMBER
+        }
+        logger.info(f"Job {job_id}: [CACHE] Resultado servido do cache | Key: {entry['key']}")
+        log_job_status(job_id, {
+            "job_status": "done",
+            "job_id": job_id,
+            "queue_id": queue_id,
+            "process_id": pid,
+            "response": response_obj
+        })
+        if data.get("webhook_url"):
+            send_webhook(data.get("webhook_url"), response_obj)
+        return response_obj, 200
+
+    # Function to run a single job taken from the queue
+    def process_job(job):
+        job_id = job["job_id"]
+        data = job["data"]
+        queue_start_time = job["queue_start_time"]
+        queue_time = time.time() - queue_start_time
+        run_start_time = time.time()
+        pid = os.getpid()  # Get the PID of the actual processing thread
+
+        # Log job status as running
+        log_job_status(job_id, {
+            "job_status": "running",
+            "job_id": job_id,
+            "queue_id": queue_id,
+            "process_id": pid,
+            "endpoint": job["endpoint"],
+            "resource_class": job["resource_class"],
+            "estimated_cost": job.get("cost"),
+            "started_at": run_start_time,
+            "response": None
+        })
+
+        control = start_job(job_id, max_runtime=job.get("max_runtime"), endpoint=job["endpoint"], cost=job.get("cost"))
+        if is_cancel_requested(job_id):
+            cancel_job(job_id)
+        try:
+            if control.cancelled.is_set():
+                raise JobCancelled(control.reason)
+            # Queued jobs run outside any request; give them an app context
+            with app.app_context():
+                response = job["task_func"]()
+        except JobCancelled as e:
+            response = (str(e), job["endpoint"], 499)
+        except Exception as e:
+            logger.error(f"Job {job_id}: [QUEUE ERRO] Exceção durante execução: {type(e).__name__}: {str(e)}", exc_info=True)
+            response = (str(e), job["endpoint"], 500)
+        finally:
+            finish_job(job_id)
+        response, final_status = cancelled_response(control, response)
+        run_time = time.time() - run_start_time
+        total_time = time.time() - queue_start_time
+
+        # SANITIZAR response[0] ANTES de usar
+        logger.info(f"Job {job_id}: [QUEUE] Função executada | Status: {response[2]}")
+        sanitized_response = inspect_and_sanitize_response(response[0] if response[2] == 200 else None, job_id, logger)
+
+        response_data = {
+            "endpoint": response[1],
+            "code": response[2],
+            "id": data.get("id"),
+            "job_id": job_id,
+            "response": sanitized_response,  # ← JÁ SANITIZADO
+            "message": "success" if response[2] == 200 else str(response[0]),
+            "pid": pid,
+            "queue_id": queue_id,
+            "worker": threading.current_thread().name,
+            "resource_class": job["resource_class"],
+            "estimated_cost": job.get("cost"),
+            "run_time": round(run_time, 3),
+            "queue_time": round(queue_time, 3),
+            "total_time": round(total_time, 3),
+            "queue_length": executor.qsize(),
+            "queue_workers": executor.workers,
+            "build_number": BUILD_NUMBER  # Add build number to response
+        }
+
+        # Validar serialização
+        try:
+            json.dumps(response_data)
+        except Exception as e:
+            logger.error(f"Job {job_id}: [QUEUE ERRO] Serialização falhou: {str(e)}")
+            response_data = sanitize_for_json(response_data)
+
+        if job.get("cache_key") and response[2] == 200:
+            store_result(job["cache_key"], response[1], response_data["response"])
+
+        # Log job status as done
+        final_record = {
+            "job_status": final_status or "done",
+            "job_id": job_id,
+            "queue_id": queue_id,
+            "process_id": pid,
+            "response": response_data,
+            "stage_timings": stage_timings(control)
+        }
+        if control.diagnostics:
+            final_record["diagnostics"] = control.diagnostics
+        log_job_status(job_id, final_record)
+
+        # Only send webhook if webhook_url has an actual value (not an empty string)
+        if data.get("webhook_url") and data.get("webhook_url") != "":
+            webhook_start_time = time.time()
+            send_webhook(data.get("webhook_url"), response_data)
+            # The record is written before the webhook so clients it notifies see the final status
+            final_record["stage_timings"]["webhook"] = {"seconds": round(time.time() - webhook_start_time, 3), "count": 1}
+            log_job_status(job_id, final_record)
+
+    # Report jobs that were dropped from the shared queue after their
+    # worker died repeatedly while running them
+    def abandon_job(job_id, data):
+        error_response = {
+            "code": 500,
+            "id": data.get("id"),
+            "job_id": job_id,
+            "message": "Job interrupted: worker process exited while running it",
+            "queue_id": queue_id,
+            "build_number": BUILD_NUMBER
+        }
+        log_job_status(job_id, {
+            "job_status": "done",
+            "job_id": job_id,
+            "queue_id": queue_id,
+            "process_id": os.getpid(),
+            "response": error_response
+        })
+        if data.get("webhook_url"):
+            send_webhook(data.get("webhook_url"), error_response)
+
+    # Create the executor that runs queued jobs on QUEUE_WORKERS threads,
+    # split into resource-class lanes with their own caps and priorities
+    executor = JobExecutor(
+        process_job,
+        RESOURCE_CLASSES,
+        workers=QUEUE_WORKERS,
+        default_lane=DEFAULT_RESOURCE_CLASS,
+        queue=create_job_queue(JOB_QUEUE_BACKEND, JOB_QUEUE_DB),
+        on_abandoned=abandon_job,
+        admit=lambda job, reserved: has_headroom(job.get("cost"), reserved),
+        processes=GUNICORN_WORKERS
+    )
+    queue_id = id(executor)  # Generate a single queue_id for this worker
+    executor.start()
+
+    # Enforce job max runtimes and cancel requests coming from other workers
+    start_monitor()
+
+    # Capture diagnostics of jobs running far longer than expected
+    start_watchdog()
+
+    # Start the process pool for CPU-bound Python stages (ASS, Whisper) now,
+    # so pool workers have their heavy modules imported before the first job
+    warm_pool()
+
+    # Archive old job records and remove abandoned scratch files (one pass per node)
+    start_janitor()
 
     # Decorator to add tasks to the queue or bypass it
-    def queue_task(bypass_queue=False):
+    def queue_task(bypass_queue=False, resource_class=None, max_runtime=None, cacheable=False):
         def decorator(f):
             def wrapper(*args, **kwargs):
                 job_id = str(uuid.uuid4())
                 data = request.json if request.is_json else {}
                 pid = os.getpid()  # Get PID for non-queued tasks
                 start_time = time.time()
+                lane = executor.resolve_lane(resource_class)
+                job_max_runtime = max_runtime or executor.max_runtime(lane)
+
+                # Async mode: queue the job and answer 202 even without a
+                # webhook_url, the client polls /v1/toolkit/job/status
+                async_flag = data.pop("async", None) if isinstance(data, dict) else None
+                if async_flag is None and "respond-async" in request.headers.get("Prefer", "").lower():
+                    async_flag = True
+
+                # Identical payload on unchanged inputs: return the stored result
+                cache_key = None
+                if cacheable and RESULT_CACHE_ENABLED and not is_bypass_requested(request.headers):
+                    cache_key = compute_cache_key(request.path, data)
+                    cached_entry = get_cached_result(cache_key) if cache_key else None
+                    if cached_entry is not None:
+                        return cached_result_response(job_id, data, cached_entry)
 
                 # If running inside a GCP Cloud Run Job instance, execute synchronously
                 if os.environ.get("CLOUD_RUN_JOB"):
@@ -379,7 +525,16 @@ def create_app():
                         })
                         return error_response, 500
 
-                elif bypass_queue or 'webhook_url' not in data:
+                cost = None
+                run_async = bool(async_flag)
+                if not bypass_queue and async_flag is None and 'webhook_url' not in data and ASYNC_COST_THRESHOLD > 0:
+                    # Expensive jobs would hold this web worker for their whole run
+                    cost = estimate_job_cost(request.path, lane, data, probe=JOB_COST_PROBE)
+                    run_async = cost["cpu_seconds"] >= ASYNC_COST_THRESHOLD
+                    if run_async:
+                        logger.info(f"Job {job_id}: [ASYNC] Custo estimado {cost['cpu_seconds']} CPU-s >= {ASYNC_COST_THRESHOLD}, enfileirando")
+
+                if bypass_queue or ('webhook_url' not in data and not run_async):
                     
                     # Log ANTES de executar
                     logger.info(f"Job {job_id}: [00] Recebendo requisição | Endpoint: {request.path} | Método: {request.method}")
@@ -398,7 +553,14 @@ def create_app():
                     logger.info(f"Job {job_id}: [02] Executando função do endpoint...")
                     
                     try:
-                        response = f(job_id=job_id, data=data)
+                        control = start_job(job_id, max_runtime=job_max_runtime, endpoint=request.path, cost=cost)
+                        try:
+                            response = f(job_id=job_id, data=data)
+                        except JobCancelled as e:
+                            response = (str(e), request.path, 499)
+                        finally:
+                            finish_job(job_id)
+                        response, final_status = cancelled_response(control, response)
                         run_time = time.time() - start_time
                         
                         # Log DEPOIS de executar - ANTES de criar response_obj
@@ -430,7 +592,7 @@ def create_app():
                             "total_time": round(run_time, 3),
                             "pid": pid,
                             "queue_id": queue_id,
-                            "queue_length": task_queue.qsize(),
+                            "queue_length": executor.qsize(),
                             "build_number": BUILD_NUMBER
                         }
                         
@@ -453,14 +615,21 @@ def create_app():
                                 logger.error(f"Job {job_id}: [ERRO CRÍTICO] Falha total de serialização: {str(e2)}")
                                 raise ValueError(f"Erro crítico de serialização: {str(e2)}")
                         
+                        if cache_key and response[2] == 200:
+                            store_result(cache_key, response[1], response_obj["response"])
+
                         # Log job status as done
-                        log_job_status(job_id, {
-                            "job_status": "done",
+                        final_record = {
+                            "job_status": final_status or "done",
                             "job_id": job_id,
                             "queue_id": queue_id,
                             "process_id": pid,
-                            "response": response_obj
-                        })
+                            "response": response_obj,
+                            "stage_timings": stage_timings(control)
+                        }
+                        if control.diagnostics:
+                            final_record["diagnostics"] = control.diagnostics
+                        log_job_status(job_id, final_record)
                         
                         logger.info(f"Job {job_id}: [08] ✅ Resposta retornada com sucesso")
                         return response_obj, response[2]
@@ -469,7 +638,7 @@ def create_app():
                         logger.error(f"Job {job_id}: [ERRO] Exceção durante execução: {type(e).__name__}: {str(e)}", exc_info=True)
                         raise
                 else:
-                    if MAX_QUEUE_LENGTH > 0 and task_queue.qsize() >= MAX_QUEUE_LENGTH:
+                    if MAX_QUEUE_LENGTH > 0 and executor.qsize() >= MAX_QUEUE_LENGTH:
                         error_message = f"MAX_QUEUE_LENGTH ({MAX_QUEUE_LENGTH}) reached"
                         error_response = {
                             "code": 429,
@@ -478,7 +647,7 @@ def create_app():
                             "message": error_message,  # Já é string
                             "pid": pid,
                             "queue_id": queue_id,
-                            "queue_length": task_queue.qsize(),
+                            "queue_length": executor.qsize(),
                             "build_number": BUILD_NUMBER  # Add build number to response
                         }
                         
@@ -500,18 +669,70 @@ def create_app():
                         
                         return error_response, 429
                     
+                    if cost is None:
+                        # Inputs are only probed when the backlog check needs the estimate;
+                        # otherwise the endpoint defaults are enough for dispatch headroom
+                        cost = estimate_job_cost(request.path, lane, data, probe=JOB_COST_PROBE and MAX_BACKLOG_SECONDS > 0)
+
+                    # Reject when the estimated backlog would take too long to drain
+                    if MAX_BACKLOG_SECONDS > 0:
+                        backlog_wait = backlog_wait_seconds(executor.estimated_backlog() + cost["cpu_seconds"])
+                        if backlog_wait > MAX_BACKLOG_SECONDS:
+                            retry_after = max(1, int(backlog_wait - MAX_BACKLOG_SECONDS))
+                            error_response = {
+                                "code": 429,
+                                "id": data.get("id"),
+                                "job_id": job_id,
+                                "message": f"Estimated backlog ({int(backlog_wait)}s) exceeds MAX_BACKLOG_SECONDS ({int(MAX_BACKLOG_SECONDS)}s)",
+                                "retry_after": retry_after,
+                                "estimated_cost": cost,
+                                "pid": pid,
+                                "queue_id": queue_id,
+                                "queue_length": executor.qsize(),
+                                "build_number": BUILD_NUMBER
+                            }
+                            log_job_status(job_id, {
+                                "job_status": "done",
+                                "job_id": job_id,
+                                "queue_id": queue_id,
+                                "process_id": pid,
+                                "response": error_response
+                            })
+                            http_response = make_response(error_response, 429)
+                            http_response.headers["Retry-After"] = str(retry_after)
+                            return http_response
+
+                    # Queue position and expected start/finish, refreshed by /v1/toolkit/job/status
+                    eta = estimate_new_job(executor, lane, request.path, cost)
+
                     # Log job status as queued
                     log_job_status(job_id, {
                         "job_status": "queued",
                         "job_id": job_id,
                         "queue_id": queue_id,
                         "process_id": pid,
+                        "endpoint": request.path,
+                        "resource_class": lane,
+                        "estimated_cost": cost,
+                        "queued_at": start_time,
+                        "eta": eta,
                         "response": None
                     })
                     
                     # Corrigido: removido *args, **kwargs do lambda para evitar TypeError
                     # As funções decoradas têm assinatura f(job_id, data) apenas
-                    task_queue.put((job_id, data, lambda: f(job_id=job_id, data=data), start_time))
+                    executor.submit({
+                        "job_id": job_id,
+                        "data": data,
+                        "task_func": lambda: f(job_id=job_id, data=data),
+                        "function_key": job_function_key(f),
+                        "queue_start_time": start_time,
+                        "endpoint": request.path,
+                        "resource_class": lane,
+                        "cost": cost,
+                        "max_runtime": job_max_runtime,
+                        "cache_key": cache_key
+                    })
                     
                     response_202 = {
                         "code": 202,
@@ -521,7 +742,13 @@ def create_app():
                         "pid": pid,
                         "queue_id": queue_id,
                         "max_queue_length": MAX_QUEUE_LENGTH if MAX_QUEUE_LENGTH > 0 else "unlimited",
-                        "queue_length": task_queue.qsize(),
+                        "queue_length": executor.qsize(),
+                        "queue_workers": executor.workers,
+                        "resource_class": lane,
+                        "lane_queue_length": executor.qsize(lane),
+                        "estimated_cost": cost,
+                        "eta": eta,
+                        "status_endpoint": "/v1/toolkit/job/status",
                         "build_number": BUILD_NUMBER  # Add build number to response
                     }
                     
@@ -537,6 +764,7 @@ def create_app():
         return decorator
 
     app.queue_task = queue_task
+    app.job_executor = executor
     app.api = api  # Make API available to routes for namespace registration
 
     # Register special route for Next.js root asset paths first
@@ -19,10 +19,12 @@
 from flask import request, jsonify, current_app
 from functools import wraps
 import jsonschema
-import os
-import json
 import time
-from config import LOCAL_STORAGE_PATH
+from services.job_queue import register_job_function
+
+# Payload keys that control how a request is run rather than what it does.
+# They are accepted by every endpoint and removed before the job runs.
+QUEUE_CONTROL_KEYS = ("async",)
 
 def validate_payload(schema):
     def decorator(f):
@@ -30,72 +32,111 @@ def validate_payload(schema):
         def decorated_function(*args, **kwargs):
             if not request.json:
                 return jsonify({"message": "Missing JSON in request"}), 400
+            payload = request.json
+            if isinstance(payload, dict):
+                if "async" in payload and not isinstance(payload["async"], bool):
+                    return jsonify({"message": "Invalid payload: 'async' must be a boolean"}), 400
+                payload = {k: v for k, v in payload.items() if k not in QUEUE_CONTROL_KEYS}
             try:
-                jsonschema.validate(instance=request.json, schema=schema)
+                jsonschema.validate(instance=payload, schema=schema)
             except jsonschema.exceptions.ValidationError as validation_error:
                 return jsonify({"message": f"Invalid payload: {validation_error.message}"}), 400
             
             return f(*args, **kwargs)
+        # Lets batch/pipeline requests validate sub-job payloads
+        decorated_function.payload_schema = schema
         return decorated_function
     return decorator
 
 def log_job_status(job_id, data):
     """
-    Log job status to a file in the STORAGE_PATH/jobs folder
+    Log job status to the job status store (JOB_STATUS_BACKEND)
     
     Args:
         job_id (str): The unique job ID
-        data (dict): Data to write to the log file
+        data (dict): Status record of the job
     """
     import logging
+    from services.job_status_store import get_job_status_store
     logger = logging.getLogger(__name__)
     
-    jobs_dir = os.path.join(LOCAL_STORAGE_PATH, 'jobs')
-    
-    # Validação humanizada: verificar se o diretório pai existe
-    parent_dir = os.path.dirname(jobs_dir)
-    if parent_dir and not os.path.exists(parent_dir):
-        try:
-            logger.info(f"📁 Criando diretório pai: {parent_dir}")
-            os.makedirs(parent_dir, exist_ok=True)
-        except PermissionError as e:
-            logger.error(f"❌ Erro de permissão ao criar diretório {parent_dir}: {e}")
-            logger.error(f"💡 Solução: Verifique as permissões ou altere LOCAL_STORAGE_PATH para um diretório acessível")
-            raise PermissionError(f"Não foi possível criar o diretório {parent_dir}. Verifique as permissões ou altere LOCAL_STORAGE_PATH no EasyPanel.") from e
-    
-    # Validação humanizada: criar diretório de jobs
-    if not os.path.exists(jobs_dir):
-        try:
-            logger.info(f"📁 Criando diretório de jobs: {jobs_dir}")
-            os.makedirs(jobs_dir, exist_ok=True)
-        except PermissionError as e:
-            logger.error(f"❌ Erro de permissão ao criar diretório de jobs {jobs_dir}: {e}")
-            logger.error(f"💡 Solução: Verifique se LOCAL_STORAGE_PATH={LOCAL_STORAGE_PATH} está correto e tem permissões de escrita")
-            raise PermissionError(f"Não foi possível criar o diretório de jobs {jobs_dir}. Verifique LOCAL_STORAGE_PATH no EasyPanel.") from e
-    
-    # Create or update the job log file
-    job_file = os.path.join(jobs_dir, f"{job_id}.json")
-    
     try:
-        # Write data directly to file
-        with open(job_file, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.debug(f"✅ Status do job {job_id} salvo em {job_file}")
-    except PermissionError as e:
-        logger.error(f"❌ Erro de permissão ao escrever arquivo {job_file}: {e}")
-        raise PermissionError(f"Não foi possível escrever o arquivo de status do job. Verifique as permissões do diretório {jobs_dir}.") from e
+        get_job_status_store().put(job_id, data)
+        logger.debug(f"✅ Status do job {job_id} salvo")
+    except PermissionError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erro inesperado ao salvar status do job {job_id}: {e}")
         raise
 
-def queue_task_wrapper(bypass_queue=False):
+def queue_task_wrapper(bypass_queue=False, resource_class=None, max_runtime=None, cacheable=False):
+    """
+    Run the decorated endpoint through the application job queue.
+
+    Args:
+        bypass_queue (bool): Execute immediately instead of queueing
+        resource_class (str): Lane used when the job is queued
+            (io-light, ffmpeg-encode, whisper, browser). Defaults to
+            DEFAULT_RESOURCE_CLASS.
+        max_runtime (int): Seconds after which the job is cancelled and its
+            FFmpeg children killed. Defaults to the resource class limit.
+        cacheable (bool): The result only depends on the payload and its
+            inputs, so it may be served from the result cache
+            (RESULT_CACHE_ENABLED)
+    """
     def decorator(f):
+        # Allow jobs queued in a shared queue to be run by any worker
+        register_job_function(f)
+
         @wraps(f)
         def wrapper(*args, **kwargs):
-            return current_app.queue_task(bypass_queue=bypass_queue)(f)(*args, **kwargs)
+            return current_app.queue_task(bypass_queue=bypass_queue, resource_class=resource_class, max_runtime=max_runtime, cacheable=cacheable)(f)(*args, **kwargs)
+        wrapper.job_function = f
+        wrapper.queue_options = {"bypass_queue": bypass_queue, "resource_class": resource_class, "max_runtime": max_runtime}
         return wrapper
     return decorator
 
+def _view_chain(path, method):
+    """The view function of an endpoint path followed by the functions its decorators wrap."""
+    from werkzeug.exceptions import HTTPException
+    try:
+        endpoint, _ = current_app.url_map.bind("localhost").match(path, method=method)
+    except HTTPException:
+        return
+    view = current_app.view_functions.get(endpoint)
+    while view is not None:
+        yield view
+        view = getattr(view, "__wrapped__", None)
+
+def resolve_job_endpoint(path, method="POST"):
+    """
+    Find the job function and payload schema behind an endpoint path.
+
+    Follows the decorator chain of the view function (authenticate,
+    validate_payload, queue_task_wrapper) down to the f(job_id, data)
+    function wrapped by queue_task_wrapper.
+
+    Returns:
+        tuple: (job_function, schema), or (None, None) if the path is not a
+        queued job endpoint
+    """
+    schema = None
+    for view in _view_chain(path, method):
+        schema = schema or getattr(view, "payload_schema", None)
+        if hasattr(view, "job_function"):
+            return view.job_function, schema
+    return None, None
+
+def resolve_job_options(path, method="POST"):
+    """
+    The queue_task_wrapper options (bypass_queue, resource_class,
+    max_runtime) of an endpoint path, or None if it is not a job endpoint.
+    """
+    for view in _view_chain(path, method):
+        if hasattr(view, "queue_options"):
+            return view.queue_options
+    return None
+
 def discover_and_register_blueprints(app, base_dir='routes'):
     """
     Dynamically discovers and registers all Flask blueprints in the routes directory.
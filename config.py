@@ -27,6 +27,188 @@ if not API_KEY:
 # Storage path setting
 LOCAL_STORAGE_PATH = os.environ.get('LOCAL_STORAGE_PATH', '/tmp')
 
+# Job executor settings
+# Resource classes (lanes) for queued jobs. Each class has its own queue, a
+# per-process concurrency cap, a priority (higher priority runs first when
+# job slots are scarce) and a max runtime in seconds after which the job and
+# its FFmpeg children are killed (0 = no limit). Override per class with
+# RESOURCE_CLASS_<NAME>_CONCURRENCY / _PRIORITY / _MAX_RUNTIME,
+# e.g. RESOURCE_CLASS_FFMPEG_ENCODE_CONCURRENCY=4
+_DEFAULT_RESOURCE_CLASSES = {
+    'io-light': {'concurrency': 4, 'priority': 30, 'max_runtime': 900},
+    'browser': {'concurrency': 1, 'priority': 20, 'max_runtime': 300},
+    'ffmpeg-encode': {'concurrency': 2, 'priority': 10, 'max_runtime': 3600},
+    'whisper': {'concurrency': 1, 'priority': 0, 'max_runtime': 7200},
+}
+
+def _resource_class_env(name, key, default):
+    env_name = f"RESOURCE_CLASS_{name.upper().replace('-', '_')}_{key.upper()}"
+    return int(os.environ.get(env_name, default))
+
+RESOURCE_CLASSES = {
+    name: {
+        'concurrency': max(1, _resource_class_env(name, 'concurrency', defaults['concurrency'])),
+        'priority': _resource_class_env(name, 'priority', defaults['priority']),
+        'max_runtime': _resource_class_env(name, 'max_runtime', defaults['max_runtime'])
+    }
+    for name, defaults in _DEFAULT_RESOURCE_CLASSES.items()
+}
+DEFAULT_RESOURCE_CLASS = os.environ.get('DEFAULT_RESOURCE_CLASS', 'ffmpeg-encode')
+
+# Total number of worker threads per process that run queued (webhook) jobs.
+# Defaults to the sum of the resource class caps.
+QUEUE_WORKERS = max(1, int(os.environ.get(
+    'QUEUE_WORKERS',
+    sum(c['concurrency'] for c in RESOURCE_CLASSES.values())
+)))
+
+# Queue backend for queued jobs: "memory" keeps a private queue per worker
+# process, "sqlite" shares one durable queue (WAL mode) between all workers of
+# the node so idle workers pick up pending jobs and they survive restarts
+JOB_QUEUE_BACKEND = os.environ.get('JOB_QUEUE_BACKEND', 'memory').lower()
+JOB_QUEUE_DB = os.environ.get('JOB_QUEUE_DB', os.path.join(LOCAL_STORAGE_PATH, 'job_queue.sqlite3'))
+# Gunicorn worker processes of the node (the Dockerfile passes it to --workers)
+GUNICORN_WORKERS = max(1, int(os.environ.get('GUNICORN_WORKERS', 2)))
+
+# Job status records: "sqlite" keeps them in one indexed database (status,
+# endpoint, updated_at) shared by the workers of the node; "file" keeps the
+# original layout of one JSON file per job in LOCAL_STORAGE_PATH/jobs
+JOB_STATUS_BACKEND = os.environ.get('JOB_STATUS_BACKEND', 'sqlite').lower()
+JOB_STATUS_DB = os.environ.get('JOB_STATUS_DB', os.path.join(LOCAL_STORAGE_PATH, 'job_status.sqlite3'))
+# Status updates are kept in memory and written every N seconds (several
+# updates of a job in between cost one write). The first and the terminal
+# (done/failed/cancelled) record of a job are always written at once. 0 writes every update
+JOB_STATUS_FLUSH_INTERVAL = float(os.environ.get('JOB_STATUS_FLUSH_INTERVAL', 1.0))
+
+# Janitor: one worker per node (file lock) periodically archives job records
+# older than JOB_RECORD_TTL into LOCAL_STORAGE_PATH/jobs/archive/YYYY-MM-DD.jsonl.gz,
+# deletes archives older than JOB_ARCHIVE_TTL and removes job scratch files
+# (names starting with a job/file id) older than SCRATCH_TTL. Seconds; 0 disables each policy
+JANITOR_ENABLED = os.environ.get('JANITOR_ENABLED', 'true').lower() == 'true'
+JANITOR_INTERVAL = int(os.environ.get('JANITOR_INTERVAL', 3600))
+JOB_RECORD_TTL = int(os.environ.get('JOB_RECORD_TTL', 7 * 86400))
+JOB_ARCHIVE_TTL = int(os.environ.get('JOB_ARCHIVE_TTL', 30 * 86400))
+SCRATCH_TTL = int(os.environ.get('SCRATCH_TTL', 6 * 3600))
+
+# Admission control. Queued jobs are costed before they are accepted
+# (CPU-seconds, RAM, scratch disk) from cheap signals: HEAD Content-Length,
+# an ffprobe of the input URL and the endpoint type.
+# MAX_BACKLOG_SECONDS: reject new jobs with 429 when the estimated backlog
+# would take longer than this to drain on this node (0 = disabled)
+MAX_BACKLOG_SECONDS = float(os.environ.get('MAX_BACKLOG_SECONDS', 0))
+# Probe job inputs to estimate their cost (false = endpoint defaults only)
+JOB_COST_PROBE = os.environ.get('JOB_COST_PROBE', 'true').lower() == 'true'
+# Overall time budget (seconds) for the probes of one request; they run
+# concurrently and unfinished inputs get the endpoint defaults
+COST_PROBE_TIMEOUT = float(os.environ.get('COST_PROBE_TIMEOUT', 10))
+# Resource-aware dispatch: a queued job only starts when this much RAM and
+# scratch disk (MB) stays free after its estimated usage
+NODE_MIN_FREE_RAM_MB = int(os.environ.get('NODE_MIN_FREE_RAM_MB', 512))
+NODE_MIN_FREE_DISK_MB = int(os.environ.get('NODE_MIN_FREE_DISK_MB', 1024))
+
+# Requests without webhook_url whose estimated cost is at least this many
+# CPU-seconds are queued and answered with 202 as if they had sent
+# "async": true (0 = only when the client asks for it)
+ASYNC_COST_THRESHOLD = float(os.environ.get('ASYNC_COST_THRESHOLD', 0))
+
+# Queue position and ETA of queued jobs: the wall-clock seconds per estimated
+# CPU-second of each endpoint are learned from the jobs it finished in the
+# last ETA_HISTORY_SECONDS
+ETA_HISTORY_SECONDS = int(os.environ.get('ETA_HISTORY_SECONDS', 86400))
+
+# Slow-job watchdog: when a running job takes WATCHDOG_SLOW_FACTOR times the
+# expected run time of its endpoint and input (same model as the ETA), the
+# Python stack of the job, its FFmpeg progress, the CPU/RSS of its child
+# processes and its open transfers are captured into the job record (again at
+# 2x and 4x that point). Jobs younger than WATCHDOG_MIN_SECONDS are never
+# flagged. WATCHDOG_CANCEL_FACTOR > 0 also cancels jobs past that many times
+# the expected run time
+WATCHDOG_ENABLED = os.environ.get('WATCHDOG_ENABLED', 'true').lower() == 'true'
+WATCHDOG_INTERVAL = int(os.environ.get('WATCHDOG_INTERVAL', 15))
+WATCHDOG_SLOW_FACTOR = float(os.environ.get('WATCHDOG_SLOW_FACTOR', 3.0))
+WATCHDOG_MIN_SECONDS = int(os.environ.get('WATCHDOG_MIN_SECONDS', 60))
+WATCHDOG_CANCEL_FACTOR = float(os.environ.get('WATCHDOG_CANCEL_FACTOR', 0))
+
+# /v1/batch: sub-jobs run at the same time per batch, and sub-jobs per batch
+BATCH_MAX_PARALLEL = int(os.environ.get('BATCH_MAX_PARALLEL', 4))
+BATCH_MAX_JOBS = int(os.environ.get('BATCH_MAX_JOBS', 100))
+
+# Longest time (seconds) a /v1/toolkit/job/progress Server-Sent Events stream
+# stays open before the client reconnects. Each open stream holds a sync
+# Gunicorn worker, so keep it well below GUNICORN_TIMEOUT
+PROGRESS_STREAM_MAX_SECONDS = int(os.environ.get('PROGRESS_STREAM_MAX_SECONDS', 60))
+
+# Process pool for CPU-bound Python stages (ASS generation, segment cleanup).
+# One pool per Gunicorn worker, at most 2 processes by default; 0 runs them
+# inline. Whisper always gets its own single process per Gunicorn worker
+PROCESS_POOL_WORKERS = int(os.environ.get(
+    'PROCESS_POOL_WORKERS',
+    min(2, max(1, (os.cpu_count() or 1) // GUNICORN_WORKERS))
+))
+# Modules imported by every worker of the pool when it starts. Whisper/torch
+# is left out on purpose: only the Whisper process imports it
+PROCESS_POOL_WARM_MODULES = [
+    m.strip() for m in os.environ.get('PROCESS_POOL_WARM_MODULES', 'services.ass_toolkit').split(',') if m.strip()
+]
+
+# Result cache for endpoints declared cacheable (caption, transcribe, convert).
+# Identical payloads on unchanged inputs (same ETag/Last-Modified/size) return
+# the stored response instead of running the job again
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'false').lower() == 'true'
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join(LOCAL_STORAGE_PATH, 'result_cache'))
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 86400))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 1000))
+
+# Input cache: downloaded inputs are kept in INPUT_CACHE_DIR, stored by the
+# SHA-256 of their content and indexed by URL with its ETag/Last-Modified.
+# A later download of the URL is a conditional GET (304 = no transfer) and the
+# job gets a hard link (or reflink/copy) of the cached file. Inputs without
+# ETag/Last-Modified are not cached. Least recently used files are evicted
+# above INPUT_CACHE_MAX_MB
+INPUT_CACHE_ENABLED = os.environ.get('INPUT_CACHE_ENABLED', 'true').lower() == 'true'
+INPUT_CACHE_DIR = os.environ.get('INPUT_CACHE_DIR', os.path.join(LOCAL_STORAGE_PATH, 'input_cache'))
+INPUT_CACHE_MAX_MB = int(os.environ.get('INPUT_CACHE_MAX_MB', 5120))
+
+# Ranged downloads: inputs of at least DOWNLOAD_RANGED_MIN_MB from servers
+# that accept byte ranges are fetched over DOWNLOAD_CONNECTIONS parallel
+# connections, in DOWNLOAD_CHUNK_MB pieces written in place into a
+# preallocated file. DOWNLOAD_CONNECTIONS=1 always uses a single stream
+DOWNLOAD_CONNECTIONS = max(1, int(os.environ.get('DOWNLOAD_CONNECTIONS', 4)))
+DOWNLOAD_CHUNK_MB = max(1, int(os.environ.get('DOWNLOAD_CHUNK_MB', 16)))
+DOWNLOAD_RANGED_MIN_MB = int(os.environ.get('DOWNLOAD_RANGED_MIN_MB', 64))
+
+# Inputs of multi-input endpoints (concatenate, compose, audio mixing)
+# downloaded at the same time per job
+DOWNLOAD_PARALLEL_INPUTS = max(1, int(os.environ.get('DOWNLOAD_PARALLEL_INPUTS', 4)))
+
+# Per-job scratch workspaces (services.workspace): a job is cancelled when
+# its workspace grows past WORKSPACE_QUOTA_MB (0 = no limit). Small
+# intermediates may go to a RAM disk, up to WORKSPACE_RAM_MAX_MB per job
+# (0 disables the RAM tier)
+WORKSPACE_QUOTA_MB = int(os.environ.get('WORKSPACE_QUOTA_MB', 0))
+WORKSPACE_RAM_DIR = os.environ.get('WORKSPACE_RAM_DIR', '/dev/shm')
+WORKSPACE_RAM_MAX_MB = int(os.environ.get('WORKSPACE_RAM_MAX_MB', 256))
+
+# Default of the stream_input option of trim, split, silence, media_to_mp3
+# and convert: FFmpeg reads the input URL directly (input seeking fetches
+# only the byte ranges it needs) instead of downloading it first. Servers
+# without byte ranges always fall back to downloading
+STREAM_INPUT_ENABLED = os.environ.get('STREAM_INPUT_ENABLED', 'false').lower() == 'true'
+
+# Outbound HTTP (downloads, HEAD probes, webhooks, streaming uploads) goes
+# through one pooled session per worker process: HTTP_POOL_MAXSIZE kept-alive
+# connections per host, connect/read timeouts in seconds and HTTP_RETRIES
+# retries with exponential backoff on connection errors, 429 and 5xx.
+# Streamed downloads slower than HTTP_MIN_SPEED_KBPS over HTTP_STALL_SECONDS
+# are aborted as stalled (0 disables)
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 16))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 3))
+HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', 0.5))
+HTTP_MIN_SPEED_KBPS = float(os.environ.get('HTTP_MIN_SPEED_KBPS', 32))
+HTTP_STALL_SECONDS = float(os.environ.get('HTTP_STALL_SECONDS', 30))
+
 # GCP environment variables
 GCP_SA_CREDENTIALS = os.environ.get('GCP_SA_CREDENTIALS', '')
 GCP_BUCKET_NAME = os.environ.get('GCP_BUCKET_NAME', '')
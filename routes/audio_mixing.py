@@ -16,10 +16,12 @@
 
 
 
+import os
 from flask import Blueprint
 from app_utils import *
 import logging
 from services.audio_mixing import process_audio_mixing
+from services.workspace import JobWorkspace
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
 
@@ -42,7 +44,7 @@ logger = logging.getLogger(__name__)
     "required": ["video_url", "audio_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def audio_mixing(job_id, data):
     video_url = data.get('video_url')
     audio_url = data.get('audio_url')
@@ -54,11 +56,14 @@ def audio_mixing(job_id, data):
 
     logger.info(f"Job {job_id}: Received audio mixing request for {video_url} and {audio_url}")
 
+    output_filename = None
     try:
         # Process audio and video mixing
-        output_filename = process_audio_mixing(
-            video_url, audio_url, video_vol, audio_vol, output_length, job_id, webhook_url
-        )
+        # The downloaded inputs are removed with the workspace as soon as the mix is done
+        with JobWorkspace(job_id) as workspace:
+            output_filename = process_audio_mixing(
+                video_url, audio_url, video_vol, audio_vol, output_length, job_id, workspace, webhook_url
+            )
 
         # Upload the mixed file using the unified upload_file() method
         cloud_url = upload_file(output_filename)
@@ -71,3 +76,8 @@ def audio_mixing(job_id, data):
     except Exception as e:
         logger.error(f"Job {job_id}: Error during audio mixing process - {str(e)}")
         return str(e), "/audio-mixing", 500
+
+    finally:
+        # Em modo local, manter o arquivo de saída para facilitar acesso
+        if output_filename and os.getenv('LOCAL_STORAGE_MODE', '').lower() != 'true' and os.path.exists(output_filename):
+            os.remove(output_filename)
@@ -56,7 +56,7 @@ logger = logging.getLogger(__name__)
     ],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="whisper", cacheable=True)
 def caption_video(job_id, data):
     video_url = data['video_url']
     caption_srt = data.get('srt')
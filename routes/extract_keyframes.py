@@ -20,6 +20,7 @@ from flask import Blueprint
 from app_utils import *
 import logging
 from services.extract_keyframes import process_keyframe_extraction
+from services.workspace import JobWorkspace
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
 
@@ -38,7 +39,7 @@ logger = logging.getLogger(__name__)
     "required": ["video_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def extract_keyframes(job_id, data):
     video_url = data.get('video_url')
     webhook_url = data.get('webhook_url')
@@ -47,14 +48,16 @@ def extract_keyframes(job_id, data):
     logger.info(f"Job {job_id}: Received keyframe extraction request for {video_url}")
 
     try:
-        # Process keyframe extraction
-        image_paths = process_keyframe_extraction(video_url, job_id)
+        # The workspace (video and keyframes) is removed once the keyframes are uploaded
+        with JobWorkspace(job_id) as workspace:
+            # Process keyframe extraction
+            image_paths = process_keyframe_extraction(video_url, job_id, workspace)
 
-        # Upload each extracted keyframe and collect the cloud URLs
-        image_urls = []
-        for image_path in image_paths:
-            cloud_url = upload_file(image_path)
-            image_urls.append({"image_url": cloud_url})
+            # Upload each extracted keyframe and collect the cloud URLs
+            image_urls = []
+            for image_path in image_paths:
+                cloud_url = upload_file(image_path)
+                image_urls.append({"image_url": cloud_url})
 
         logger.info(f"Job {job_id}: Keyframes uploaded to cloud storage")
 
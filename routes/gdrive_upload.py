@@ -30,6 +30,7 @@ import time
 import psutil
 from services.authentication import authenticate
 from app_utils import validate_payload, queue_task_wrapper
+from services.http_client import get_session, iter_content
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -86,7 +87,7 @@ def initiate_resumable_upload(filename, folder_id, mime_type='application/octet-
         'name': filename,
         'parents': [folder_id]
     }
-    response = requests.post(url, headers=headers, data=json.dumps(metadata))
+    response = get_session().post(url, headers=headers, data=json.dumps(metadata))
     response.raise_for_status()
     upload_url = response.headers['Location']
     return upload_url
@@ -96,8 +97,6 @@ def upload_file_in_chunks(file_url, upload_url, total_size, job_id, chunk_size):
     Uploads the file to Google Drive in chunks by streaming data directly from the source URL.
     """
     bytes_uploaded = 0
-    max_retries = 5
-    retry_delay = 5  # seconds
 
     progress = UploadProgress(job_id, total_size)
 
@@ -106,53 +105,43 @@ def upload_file_in_chunks(file_url, upload_url, total_size, job_id, chunk_size):
         active_uploads.append(progress)
 
     try:
-        with requests.get(file_url, stream=True) as r:
+        with get_session().get(file_url, stream=True) as r:
             r.raise_for_status()
-            iterator = r.iter_content(chunk_size=chunk_size)
+            iterator = iter_content(r, chunk_size=chunk_size)
             for chunk in iterator:
                 if chunk:
-                    for attempt in range(max_retries):
-                        start = bytes_uploaded
-                        end = bytes_uploaded + len(chunk) - 1
-                        content_range = f'bytes {start}-{end}/{total_size}'
-                        headers = {
-                            'Content-Length': str(len(chunk)),
-                            'Content-Range': content_range,
-                        }
-                        try:
-                            upload_response = requests.put(
-                                upload_url,
-                                headers=headers,
-                                data=chunk
-                            )
-                            if upload_response.status_code in (200, 201):
-                                # Upload complete
-                                logger.info(f"Job {job_id}: Upload complete.")
-                                with progress.lock:
-                                    progress.bytes_uploaded = end + 1
-                                return upload_response.json()['id']
-                            elif upload_response.status_code == 308:
-                                # Resumable upload incomplete
-                                bytes_uploaded = end + 1
-                                with progress.lock:
-                                    progress.bytes_uploaded = bytes_uploaded
-                                break  # Break retry loop and continue with next chunk
-                            else:
-                                # Handle unexpected status codes
-                                logger.error(f"Job {job_id}: Unexpected status code: {upload_response.status_code}")
-                                raise Exception(f"Upload failed with status code {upload_response.status_code}")
-                        except requests.exceptions.RequestException as e:
-                            logger.error(f"Job {job_id}: Network error during upload: {e}")
-                            if attempt < max_retries - 1:
-                                logger.info(f"Job {job_id}: Retrying upload chunk after {retry_delay} seconds...")
-                                time.sleep(retry_delay)
-                                continue
-                            else:
-                                logger.error(f"Job {job_id}: Max retries reached. Upload failed.")
-                                raise
+                    # The pooled session retries the PUT on connection errors, 429 and 5xx
+                    start = bytes_uploaded
+                    end = bytes_uploaded + len(chunk) - 1
+                    content_range = f'bytes {start}-{end}/{total_size}'
+                    headers = {
+                        'Content-Length': str(len(chunk)),
+                        'Content-Range': content_range,
+                    }
+                    try:
+                        upload_response = get_session().put(
+                            upload_url,
+                            headers=headers,
+                            data=chunk
+                        )
+                    except requests.exceptions.RequestException as e:
+                        logger.error(f"Job {job_id}: Network error during upload: {e}")
+                        raise
+                    if upload_response.status_code in (200, 201):
+                        # Upload complete
+                        logger.info(f"Job {job_id}: Upload complete.")
+                        with progress.lock:
+                            progress.bytes_uploaded = end + 1
+                        return upload_response.json()['id']
+                    elif upload_response.status_code == 308:
+                        # Resumable upload incomplete
+                        bytes_uploaded = end + 1
+                        with progress.lock:
+                            progress.bytes_uploaded = bytes_uploaded
                     else:
-                        # If we exhausted retries, exit the function
-                        raise Exception("Failed to upload chunk after multiple retries.")
+                        # Handle unexpected status codes
+                        logger.error(f"Job {job_id}: Unexpected status code: {upload_response.status_code}")
+                        raise Exception(f"Upload failed with status code {upload_response.status_code}")
     finally:
         # Remove progress from active_uploads
         with uploads_lock:
@@ -175,7 +164,7 @@ def upload_file_in_chunks(file_url, upload_url, total_size, job_id, chunk_size):
     "required": ["file_url", "filename", "folder_id"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="io-light")
 def gdrive_upload(job_id, data):
     logger.info(f"Processing Job ID: {job_id}")
 
@@ -192,13 +181,14 @@ def gdrive_upload(job_id, data):
 
         # Get the total size of the file
         try:
-            head_response = requests.head(file_url, allow_redirects=True, timeout=30)
+            head_response = get_session().head(file_url, allow_redirects=True, timeout=30)
             head_response.raise_for_status()
             total_size = int(head_response.headers.get('Content-Length', 0))
             
-            get_response = requests.get(file_url, stream=True, timeout=30)
-            get_response.raise_for_status()
-            total_size = int(get_response.headers.get('Content-Length', 0))
+            # Only the headers are needed; give the connection back to the pool
+            with get_session().get(file_url, stream=True, timeout=30) as get_response:
+                get_response.raise_for_status()
+                total_size = int(get_response.headers.get('Content-Length', 0))
             if total_size == 0:
                 raise ValueError("Content-Length header is missing or zero")
         except requests.exceptions.RequestException as e:
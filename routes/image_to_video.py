@@ -41,7 +41,7 @@ logger = logging.getLogger(__name__)
     "required": ["image_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def image_to_video(job_id, data):
     image_url = data.get('image_url')
     length = data.get('length', 5)
@@ -41,7 +41,7 @@ logger = logging.getLogger(__name__)
     "required": ["media_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def convert_media_to_mp3(job_id, data):
     media_url = data['media_url']
     webhook_url = data.get('webhook_url')
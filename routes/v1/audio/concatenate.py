@@ -2,6 +2,7 @@ from flask import Blueprint
 from app_utils import *
 import logging
 from services.v1.audio.concatenate import process_audio_concatenate
+from services.workspace import JobWorkspace
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
 
@@ -31,7 +32,7 @@ logger = logging.getLogger(__name__)
         "additionalProperties": False,
     }
 )
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def combine_audio(job_id, data):
     """
     Concatena múltiplos arquivos de áudio em um único arquivo
@@ -125,13 +126,15 @@ def combine_audio(job_id, data):
     )
 
     try:
-        output_file = process_audio_concatenate(media_urls, job_id)
-        logger.info(f"Job {job_id}: Audio combination process completed successfully")
+        # The workspace (inputs, concat list and output) is removed once the output is uploaded
+        with JobWorkspace(job_id) as workspace:
+            output_file = process_audio_concatenate(media_urls, job_id, workspace)
+            logger.info(f"Job {job_id}: Audio combination process completed successfully")
 
-        cloud_url = upload_file(output_file)
-        logger.info(
-            f"Job {job_id}: Combined audio uploaded to cloud storage: {cloud_url}"
-        )
+            cloud_url = upload_file(output_file)
+            logger.info(
+                f"Job {job_id}: Combined audio uploaded to cloud storage: {cloud_url}"
+            )
 
         return cloud_url, "/v1/audio/concatenate", 200
 
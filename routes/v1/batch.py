@@ -0,0 +1,129 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+from flask import Blueprint, current_app
+from app_utils import validate_payload, queue_task_wrapper
+import logging
+from services.authentication import authenticate
+from services.batch import prepare_batch, run_batch
+from config import BATCH_MAX_PARALLEL, BATCH_MAX_JOBS
+
+v1_batch_bp = Blueprint('v1_batch', __name__)
+logger = logging.getLogger(__name__)
+
+@v1_batch_bp.route('/v1/batch', methods=['POST'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "jobs": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "endpoint": {"type": "string", "pattern": "^/"},
+                    "payload": {"type": "object"},
+                    "id": {"type": "string"}
+                },
+                "required": ["endpoint", "payload"],
+                "additionalProperties": False
+            },
+            "minItems": 1,
+            "maxItems": BATCH_MAX_JOBS
+        },
+        "max_parallel": {"type": "integer", "minimum": 1},
+        "webhook_url": {"type": "string", "format": "uri"},
+        "id": {"type": "string"}
+    },
+    "required": ["jobs"],
+    "additionalProperties": False
+})
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
+def batch(job_id, data):
+    """
+    Executa vários jobs em uma única requisição
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - jobs
+          properties:
+            jobs:
+              type: array
+              description: Sub-jobs, cada um com o endpoint e o payload que seriam enviados a ele
+              items:
+                type: object
+                properties:
+                  endpoint:
+                    type: string
+                    example: "/v1/video/thumbnail"
+                  payload:
+                    type: object
+                    example: {"video_url": "https://example.com/video.mp4", "second": 5}
+                  id:
+                    type: string
+            max_parallel:
+              type: integer
+              description: Sub-jobs executados ao mesmo tempo (limitado por BATCH_MAX_PARALLEL)
+              example: 4
+            webhook_url:
+              type: string
+              format: uri
+            id:
+              type: string
+    responses:
+      200:
+        description: Resultado de cada sub-job, na ordem enviada
+      202:
+        description: Batch enfileirado (quando webhook_url é fornecido)
+      400:
+        description: Sub-job inválido
+      500:
+        description: Erro interno do servidor
+    """
+    endpoint = "/v1/batch"
+    sub_jobs, error = prepare_batch(data['jobs'])
+    if error:
+        logger.warning(f"Job {job_id}: [BATCH] {error}")
+        return error, endpoint, 400
+
+    max_parallel = min(data.get('max_parallel', BATCH_MAX_PARALLEL), BATCH_MAX_PARALLEL)
+    try:
+        result = run_batch(current_app._get_current_object(), job_id, sub_jobs, max_parallel)
+        return result, endpoint, 200
+    except Exception as e:
+        logger.error(f"Job {job_id}: [BATCH] Error: {str(e)}")
+        return str(e), endpoint, 500
@@ -40,7 +40,7 @@ v1_gcp_upload_bp = Blueprint('v1_gcp_upload', __name__)
     "required": ["file_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="io-light")
 def gcp_upload_endpoint(job_id, data):
     try:
         filename = data.get('filename')  # Optional, will default to original filename if not provided
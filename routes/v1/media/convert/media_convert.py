@@ -37,13 +37,14 @@ logger = logging.getLogger(__name__)
         "video_crf": {"type": "number", "minimum": 0, "maximum": 51},
         "audio_codec": {"type": "string"},
         "audio_bitrate": {"type": "string"},
+        "stream_input": {"type": "boolean"},
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"}
     },
     "required": ["media_url", "format"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode", cacheable=True)
 def convert_media_format(job_id, data):
     """
     Converte arquivos de mídia entre diferentes formatos
@@ -103,6 +104,9 @@ def convert_media_format(job_id, data):
               type: string
               description: Bitrate de áudio
               example: "128k"
+            stream_input:
+              type: boolean
+              description: Lê a mídia direto da URL (o FFmpeg busca só as faixas de bytes necessárias) em vez de baixá-la antes; servidores sem suporte a Range usam o download (padrão: STREAM_INPUT_ENABLED)
             webhook_url:
               type: string
               format: uri
@@ -168,7 +172,8 @@ def convert_media_format(job_id, data):
             video_crf,
             audio_codec,
             audio_bitrate,
-            webhook_url
+            webhook_url,
+            data.get('stream_input')
         )
         logger.info(f"Job {job_id}: Media format conversion completed successfully")
 
@@ -35,6 +35,7 @@ logger = logging.getLogger(__name__)
     "type": "object",
     "properties": {
         "media_url": {"type": "string", "format": "uri"},
+        "stream_input": {"type": "boolean"},
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"},
         "bitrate": {"type": "string", "pattern": "^[0-9]+k$"},
@@ -43,7 +44,7 @@ logger = logging.getLogger(__name__)
     "required": ["media_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode", cacheable=True)
 def convert_media_to_mp3(job_id, data):
     """
     Converte arquivos de mídia para formato MP3
@@ -85,6 +86,9 @@ def convert_media_to_mp3(job_id, data):
               type: number
               description: Taxa de amostragem em Hz (opcional)
               example: 44100
+            stream_input:
+              type: boolean
+              description: Lê a mídia direto da URL (o FFmpeg busca só as faixas de bytes necessárias) em vez de baixá-la antes; servidores sem suporte a Range usam o download (padrão: STREAM_INPUT_ENABLED)
             webhook_url:
               type: string
               format: uri
@@ -137,7 +141,7 @@ def convert_media_to_mp3(job_id, data):
     logger.info(f"Job {job_id}: Received media-to-mp3 request for media URL: {media_url}")
 
     try:
-        output_file = process_media_to_mp3(media_url, job_id, bitrate, sample_rate)
+        output_file = process_media_to_mp3(media_url, job_id, bitrate, sample_rate, data.get('stream_input'))
         logger.info(f"Job {job_id}: Media conversion process completed successfully")
 
         cloud_url = upload_file(output_file)
@@ -48,7 +48,7 @@ logger = logging.getLogger(__name__)
     "required": ["media_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="whisper", cacheable=True)
 def transcribe(job_id, data):
     """
     Transcreve ou traduz áudio/vídeo usando Whisper
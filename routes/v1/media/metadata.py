@@ -40,7 +40,7 @@ v1_media_metadata_bp = Blueprint('v1_media_metadata', __name__)
     "required": ["media_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=True)  # Set to execute immediately instead of queueing
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")  # Set to execute immediately instead of queueing
 def media_metadata(job_id, data):
     """
     Extrai metadados de um arquivo de mídia
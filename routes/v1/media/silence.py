@@ -36,13 +36,14 @@ logger = logging.getLogger(__name__)
         "noise": {"type": "string"},
         "duration": {"type": "number", "minimum": 0.1},
         "mono": {"type": "boolean"},
+        "stream_input": {"type": "boolean"},
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"}
     },
     "required": ["media_url", "duration"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def silence(job_id, data):
     """Detect silence in a media file and return the silence intervals."""
     media_url = data['media_url']
@@ -62,7 +63,8 @@ def silence(job_id, data):
             noise_threshold=noise_threshold,
             min_duration=min_duration,
             mono=mono,
-            job_id=job_id
+            job_id=job_id,
+            stream_input=data.get('stream_input')
         )
         
         logger.info(f"Job {job_id}: Silence detection completed successfully")
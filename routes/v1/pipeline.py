@@ -0,0 +1,133 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+from flask import Blueprint
+from app_utils import validate_payload, queue_task_wrapper
+import logging
+from services.authentication import authenticate
+from services.pipeline import prepare_pipeline, run_pipeline
+
+v1_pipeline_bp = Blueprint('v1_pipeline', __name__)
+logger = logging.getLogger(__name__)
+
+@v1_pipeline_bp.route('/v1/pipeline', methods=['POST'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "steps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "pattern": "^[A-Za-z0-9_-]+$"},
+                    "endpoint": {"type": "string", "pattern": "^/"},
+                    "payload": {"type": "object"}
+                },
+                "required": ["id", "endpoint", "payload"],
+                "additionalProperties": False
+            },
+            "minItems": 1,
+            "maxItems": 20
+        },
+        "outputs": {
+            "type": "array",
+            "items": {"type": "string"},
+            "minItems": 1
+        },
+        "webhook_url": {"type": "string", "format": "uri"},
+        "id": {"type": "string"}
+    },
+    "required": ["steps"],
+    "additionalProperties": False
+})
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
+def pipeline(job_id, data):
+    """
+    Executa uma sequência de endpoints mantendo os arquivos intermediários em disco local
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - steps
+          properties:
+            steps:
+              type: array
+              description: Etapas executadas em ordem. Use "{{id}}" no payload para referenciar o resultado de uma etapa anterior
+              items:
+                type: object
+                properties:
+                  id:
+                    type: string
+                    example: "trimmed"
+                  endpoint:
+                    type: string
+                    example: "/v1/video/trim"
+                  payload:
+                    type: object
+                    example: {"video_url": "https://example.com/video.mp4", "start": "00:00:05"}
+            outputs:
+              type: array
+              description: Etapas cujos arquivos são enviados ao storage (padrão - a última)
+              items:
+                type: string
+            webhook_url:
+              type: string
+              format: uri
+            id:
+              type: string
+    responses:
+      200:
+        description: Resultado das etapas de saída e tempo de cada etapa
+      202:
+        description: Pipeline enfileirado (quando webhook_url é fornecido)
+      400:
+        description: Etapa inválida
+      500:
+        description: Erro interno do servidor
+    """
+    endpoint = "/v1/pipeline"
+    steps, outputs, error = prepare_pipeline(data['steps'], data.get('outputs'))
+    if error:
+        logger.warning(f"Job {job_id}: [PIPELINE] {error}")
+        return error, endpoint, 400
+
+    try:
+        result, code = run_pipeline(job_id, steps, outputs)
+        return result, endpoint, code
+    except Exception as e:
+        logger.error(f"Job {job_id}: [PIPELINE] Error: {str(e)}")
+        return str(e), endpoint, 500
@@ -42,7 +42,7 @@ v1_s3_upload_bp = Blueprint('v1_s3_upload', __name__)
     "required": ["file_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="io-light")
 def s3_upload_endpoint(job_id, data):
     """
     Faz upload de um arquivo para S3 via streaming direto da URL
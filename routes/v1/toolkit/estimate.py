@@ -0,0 +1,113 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import logging
+from flask import Blueprint, current_app
+from config import JOB_COST_PROBE
+from services.authentication import authenticate
+from services.job_cost import estimate_job_cost
+from services.job_eta import queue_estimate
+from app_utils import queue_task_wrapper, validate_payload, resolve_job_options
+
+v1_toolkit_estimate_bp = Blueprint('v1_toolkit_estimate', __name__)
+logger = logging.getLogger(__name__)
+
+@v1_toolkit_estimate_bp.route('/v1/toolkit/estimate', methods=['POST'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "endpoint": {"type": "string"},
+        "payload": {"type": "object"},
+        "probe": {"type": "boolean"}
+    },
+    "required": ["endpoint"],
+    "additionalProperties": False
+})
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
+def estimate_job(job_id, data):
+    """
+    Estima custo, posição na fila e tempos de início e término de um job antes de enviá-lo
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - endpoint
+          properties:
+            endpoint:
+              type: string
+              description: Endpoint do job
+              example: /v1/video/caption
+            payload:
+              type: object
+              description: Payload que seria enviado ao endpoint (as URLs de mídia são inspecionadas)
+            probe:
+              type: boolean
+              description: Inspeciona as mídias de entrada (HEAD + ffprobe); false usa os valores padrão do endpoint
+    responses:
+      200:
+        description: Custo estimado e eta (queue_position, estimated_wait_seconds, estimated_start, estimated_finish)
+      400:
+        description: Endpoint desconhecido
+      500:
+        description: Erro interno do servidor
+    """
+    endpoint = "/v1/toolkit/estimate"
+    target = data["endpoint"]
+    options = resolve_job_options(target)
+    if options is None:
+        return {"error": f"Not a job endpoint: {target}"}, endpoint, 400
+
+    try:
+        executor = current_app.job_executor
+        lane = executor.resolve_lane(options["resource_class"])
+        cost = estimate_job_cost(target, lane, data.get("payload") or {}, probe=data.get("probe", JOB_COST_PROBE))
+        if options["bypass_queue"]:
+            # Runs in the request itself, it never waits in the queue
+            snapshot = {"lane": lane, "pending": [], "running": [], "slots": 1}
+        else:
+            snapshot = executor.lane_snapshot(lane)
+        return {
+            "endpoint": target,
+            "resource_class": lane,
+            "queued": not options["bypass_queue"],
+            "estimated_cost": cost,
+            "eta": queue_estimate(snapshot, endpoint=target, cpu_seconds=cost["cpu_seconds"]),
+            "queue_length": executor.qsize()
+        }, endpoint, 200
+    except Exception as e:
+        logger.error(f"Error estimating job for {target}: {str(e)}")
+        return {"error": f"Failed to estimate job: {str(e)}"}, endpoint, 500
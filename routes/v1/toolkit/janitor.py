@@ -0,0 +1,85 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import logging
+from flask import Blueprint
+from services.authentication import authenticate
+from services.janitor import run_janitor, get_janitor_report
+from app_utils import queue_task_wrapper, validate_payload
+
+v1_toolkit_janitor_bp = Blueprint('v1_toolkit_janitor', __name__)
+logger = logging.getLogger(__name__)
+
+@v1_toolkit_janitor_bp.route('/v1/toolkit/janitor', methods=['POST'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "run": {
+            "type": "boolean"
+        }
+    }
+})
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
+def janitor_report(job_id, data):
+    """
+    Relatório da limpeza automática de registros de jobs e arquivos temporários
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: false
+        schema:
+          type: object
+          properties:
+            run:
+              type: boolean
+              description: Executa uma limpeza agora antes de retornar o relatório
+              example: false
+    responses:
+      200:
+        description: Última execução (bytes liberados por tipo) e totais acumulados do nó
+      409:
+        description: Uma limpeza já está em execução em outro worker
+      500:
+        description: Erro interno do servidor
+    """
+    endpoint = "/v1/toolkit/janitor"
+    try:
+        if data.get("run"):
+            logger.info(f"Job {job_id}: [JANITOR] Pass requested")
+            if run_janitor(force=True) is None:
+                return {"error": "A janitor pass is already running on this node"}, endpoint, 409
+        return get_janitor_report(), endpoint, 200
+    except Exception as e:
+        logger.error(f"Job {job_id}: [JANITOR] Error: {str(e)}")
+        return {"error": f"Failed to run janitor: {str(e)}"}, endpoint, 500
@@ -0,0 +1,135 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import logging
+from flask import Blueprint, current_app
+from services.authentication import authenticate
+from services.job_control import request_cancel, cleanup_job_files
+from services.webhook import send_webhook
+from services.job_status_store import get_job_status_store, TERMINAL_STATUSES
+from app_utils import queue_task_wrapper, validate_payload, log_job_status
+
+v1_toolkit_job_cancel_bp = Blueprint('v1_toolkit_job_cancel', __name__)
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = TERMINAL_STATUSES
+
+@v1_toolkit_job_cancel_bp.route('/v1/toolkit/job/cancel', methods=['POST', 'DELETE'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "job_id": {
+            "type": "string"
+        }
+    },
+    "required": ["job_id"],
+})
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
+def cancel_job_endpoint(job_id, data):
+    """
+    Cancela um job enfileirado ou em execução
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - job_id
+          properties:
+            job_id:
+              type: string
+              description: ID do job a cancelar
+              example: "a1b2c3d4-e5f6-g7h8-i9j0-k1l2m3n4o5p6"
+    responses:
+      200:
+        description: Job removido da fila (status "cancelled") ou cancelamento solicitado (status "cancelling")
+      404:
+        description: Job não encontrado
+      409:
+        description: Job já finalizado
+      500:
+        description: Erro interno do servidor
+    """
+
+    target_job_id = data.get('job_id')
+    endpoint = "/v1/toolkit/job/cancel"
+    logger.info(f"Cancel requested for job {target_job_id}")
+
+    try:
+        # Queued jobs are simply removed from the queue
+        queued_job = current_app.job_executor.cancel_queued(target_job_id)
+        if queued_job is not None:
+            job_data = queued_job.get("data") or {}
+            cancel_response = {
+                "endpoint": queued_job.get("endpoint"),
+                "code": 499,
+                "id": job_data.get("id"),
+                "job_id": target_job_id,
+                "response": None,
+                "message": "Job cancelled by request before it started"
+            }
+            log_job_status(target_job_id, {
+                "job_status": "cancelled",
+                "job_id": target_job_id,
+                "process_id": os.getpid(),
+                "response": cancel_response
+            })
+            cleanup_job_files(target_job_id)
+            if job_data.get("webhook_url"):
+                send_webhook(job_data.get("webhook_url"), cancel_response)
+            return {"job_id": target_job_id, "job_status": "cancelled"}, endpoint, 200
+
+        record = get_job_status_store().get(target_job_id)
+        if record is None:
+            return {"error": "Job not found", "job_id": target_job_id}, endpoint, 404
+
+        job_status = record.get("job_status")
+
+        if job_status in FINISHED_STATUSES:
+            return {"error": f"Job already {job_status}", "job_id": target_job_id, "job_status": job_status}, endpoint, 409
+
+        # Running (or queued in another worker's memory queue): the worker that
+        # owns the job kills its FFmpeg process group and frees its scratch files
+        running_here = request_cancel(target_job_id)
+        return {
+            "job_id": target_job_id,
+            "job_status": "cancelling",
+            "running_in_this_worker": running_here
+        }, endpoint, 200
+
+    except Exception as e:
+        logger.error(f"Error cancelling job {target_job_id}: {str(e)}")
+        return {"error": f"Failed to cancel job: {str(e)}"}, endpoint, 500
@@ -0,0 +1,192 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import json
+import time
+import logging
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from config import PROGRESS_STREAM_MAX_SECONDS
+from services.authentication import authenticate
+from services.job_progress import read_progress
+from services.job_status_store import get_job_status_store, TERMINAL_STATUSES
+from app_utils import queue_task_wrapper, validate_payload
+
+v1_toolkit_job_progress_bp = Blueprint('v1_toolkit_job_progress', __name__)
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.25
+
+def job_snapshot(target_job_id):
+    """Status and latest FFmpeg progress of a job, or None if the job is unknown."""
+    record = get_job_status_store().get(target_job_id)
+    if record is None:
+        return None
+    progress = read_progress(target_job_id)
+    return {
+        "job_id": target_job_id,
+        "job_status": record.get("job_status"),
+        "progress": progress,
+        "cursor": progress["updated_at"] if progress else None
+    }
+
+def wait_for_progress(target_job_id, since=None, wait=0):
+    """
+    Return the job snapshot as soon as its progress is newer than `since`,
+    the job finishes or `wait` seconds pass.
+    """
+    deadline = time.time() + wait
+    while True:
+        snapshot = job_snapshot(target_job_id)
+        if snapshot is None or since is None or snapshot["job_status"] in TERMINAL_STATUSES:
+            return snapshot
+        if (snapshot["cursor"] or 0) > since or time.time() >= deadline:
+            return snapshot
+        time.sleep(POLL_INTERVAL)
+
+@v1_toolkit_job_progress_bp.route('/v1/toolkit/job/progress', methods=['POST'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "job_id": {"type": "string"},
+        "since": {"type": "number"},
+        "wait": {"type": "integer", "minimum": 0, "maximum": 30}
+    },
+    "required": ["job_id"],
+    "additionalProperties": False
+})
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
+def get_job_progress(job_id, data):
+    """
+    Obtém o progresso de um job (long-poll)
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - job_id
+          properties:
+            job_id:
+              type: string
+              description: ID do job
+            since:
+              type: number
+              description: Valor de "cursor" da resposta anterior; a resposta espera por um progresso mais novo
+            wait:
+              type: integer
+              description: Segundos máximos de espera por um progresso mais novo (0-30, padrão 0)
+              example: 25
+    responses:
+      200:
+        description: Status do job, progresso do FFmpeg (percentual, fps, velocidade, ETA) e cursor
+      404:
+        description: Job não encontrado
+      500:
+        description: Erro interno do servidor
+    """
+    endpoint = "/v1/toolkit/job/progress"
+    target_job_id = data['job_id']
+    try:
+        snapshot = wait_for_progress(target_job_id, data.get('since'), data.get('wait', 0))
+        if snapshot is None:
+            return {"error": "Job not found", "job_id": target_job_id}, endpoint, 404
+        return snapshot, endpoint, 200
+    except Exception as e:
+        logger.error(f"Error retrieving progress for job {target_job_id}: {str(e)}")
+        return {"error": f"Failed to retrieve job progress: {str(e)}"}, endpoint, 500
+
+@v1_toolkit_job_progress_bp.route('/v1/toolkit/job/progress', methods=['GET'])
+@authenticate
+def stream_job_progress():
+    """
+    Transmite o progresso de um job via Server-Sent Events
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    produces:
+      - text/event-stream
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: query
+        name: job_id
+        type: string
+        required: true
+        description: ID do job
+    responses:
+      200:
+        description: Eventos "progress" a cada atualização e um evento "status" quando o job termina
+      400:
+        description: job_id ausente
+      404:
+        description: Job não encontrado
+    """
+    target_job_id = request.args.get('job_id')
+    if not target_job_id:
+        return jsonify({"error": "job_id is required"}), 400
+    if job_snapshot(target_job_id) is None:
+        return jsonify({"error": "Job not found", "job_id": target_job_id}), 404
+
+    def events():
+        # Streams are bounded: each one holds a sync worker until it closes
+        deadline = time.time() + PROGRESS_STREAM_MAX_SECONDS
+        since = None
+        yield "retry: 1000\n\n"
+        while True:
+            snapshot = wait_for_progress(target_job_id, since, max(0.0, min(15, deadline - time.time())))
+            if snapshot is None:
+                break
+            if since is None or (snapshot["cursor"] or 0) > since:
+                since = snapshot["cursor"] or 0
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if snapshot["job_status"] in TERMINAL_STATUSES:
+                yield f"event: status\ndata: {json.dumps(snapshot)}\n\n"
+                break
+            if time.time() >= deadline:
+                break
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -16,13 +16,12 @@
 
 
 
-import os
-import json
 import logging
-from flask import Blueprint, request
-from config import LOCAL_STORAGE_PATH
+from flask import Blueprint, request, current_app
 from services.authentication import authenticate
 from app_utils import queue_task_wrapper, validate_payload
+from services.job_status_store import get_job_status_store
+from services.job_eta import job_eta
 
 v1_toolkit_job_status_bp = Blueprint('v1_toolkit_job_status', __name__)
 logger = logging.getLogger(__name__)
@@ -38,7 +37,7 @@ logger = logging.getLogger(__name__)
     },
     "required": ["job_id"],
 })
-@queue_task_wrapper(bypass_queue=True)
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
 def get_job_status(job_id, data):
     """
     Obtém o status de um job específico
@@ -85,6 +84,9 @@ def get_job_status(job_id, data):
             response:
               type: object
               description: Resposta do job (varia conforme o tipo)
+            eta:
+              type: object
+              description: Jobs na fila ou em execução - posição na fila (queue_position), início e término estimados (estimated_start, estimated_finish, epoch em segundos)
       404:
         description: Job não encontrado
         schema:
@@ -104,18 +106,14 @@ def get_job_status(job_id, data):
     logger.info(f"Retrieving status for job {get_job_id}")
     endpoint = "/v1/toolkit/job/status"
     try:
-        # Construct the path to the job status file
-        job_file_path = os.path.join(LOCAL_STORAGE_PATH, 'jobs', f"{get_job_id}.json")
-        
-        # Check if the job file exists
-        if not os.path.exists(job_file_path):
+        job_status = get_job_status_store().get(get_job_id)
+        if job_status is None:
             return {"error": "Job not found", "job_id": get_job_id}, endpoint, 404
         
-        # Read the job status file
-        with open(job_file_path, 'r') as file:
-            job_status = json.load(file)
-        
-        # Return the job status file content directly
+        # Queued and running jobs get a live queue position and ETA
+        if job_status.get("job_status") in ("queued", "running"):
+            job_status = dict(job_status, eta=job_eta(current_app.job_executor, get_job_id, job_status))
+
         return job_status, endpoint, 200
         
     except Exception as e:
@@ -0,0 +1,142 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import time
+import logging
+from flask import Blueprint
+from services.authentication import authenticate
+from services.job_status_store import get_job_status_store
+from app_utils import queue_task_wrapper, validate_payload
+
+v1_toolkit_jobs_query_bp = Blueprint('v1_toolkit_jobs_query', __name__)
+logger = logging.getLogger(__name__)
+
+@v1_toolkit_jobs_query_bp.route('/v1/toolkit/jobs/query', methods=['POST'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "status": {
+            "oneOf": [
+                {"type": "string"},
+                {"type": "array", "items": {"type": "string"}, "minItems": 1}
+            ]
+        },
+        "endpoint": {"type": "string"},
+        "id": {"type": "string"},
+        "since_seconds": {"type": "integer", "minimum": 1},
+        "updated_after": {"type": "number"},
+        "updated_before": {"type": "number"},
+        "limit": {"type": "integer", "minimum": 1, "maximum": 500},
+        "cursor": {"type": "string"},
+        "include_response": {"type": "boolean"}
+    },
+    "additionalProperties": False
+})
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
+def query_jobs(job_id, data):
+    """
+    Consulta jobs por status, endpoint, id e intervalo de tempo, com paginação
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            status:
+              type: array
+              description: Status a incluir (string ou lista), ex. ["running", "queued"]
+              items:
+                type: string
+            endpoint:
+              type: string
+              example: /v1/video/caption
+            id:
+              type: string
+              description: Campo "id" enviado na requisição original
+            since_seconds:
+              type: integer
+              description: Apenas jobs atualizados nos últimos N segundos
+            updated_after:
+              type: number
+              description: Início do intervalo (epoch em segundos)
+            updated_before:
+              type: number
+              description: Fim do intervalo (epoch em segundos, exclusivo)
+            limit:
+              type: integer
+              description: Tamanho da página (1-500, padrão 50)
+            cursor:
+              type: string
+              description: Valor de next_cursor da página anterior
+            include_response:
+              type: boolean
+              description: Inclui o campo response de cada job (padrão false)
+    responses:
+      200:
+        description: Jobs mais recentes primeiro e next_cursor (null na última página)
+      400:
+        description: Cursor inválido
+      500:
+        description: Erro interno do servidor
+    """
+    endpoint = "/v1/toolkit/jobs/query"
+    status = data.get("status")
+    updated_after = data.get("updated_after")
+    if "since_seconds" in data:
+        since = time.time() - data["since_seconds"]
+        updated_after = max(updated_after, since) if updated_after is not None else since
+    include_response = data.get("include_response", False)
+
+    try:
+        jobs, next_cursor = get_job_status_store().query(
+            status=[status] if isinstance(status, str) else status,
+            endpoint=data.get("endpoint"),
+            client_id=data.get("id"),
+            updated_after=updated_after,
+            updated_before=data.get("updated_before"),
+            limit=data.get("limit", 50),
+            cursor=data.get("cursor"),
+            include_record=include_response
+        )
+    except ValueError as e:
+        return {"error": str(e)}, endpoint, 400
+    except Exception as e:
+        logger.error(f"Error querying jobs: {str(e)}")
+        return {"error": f"Failed to query jobs: {str(e)}"}, endpoint, 500
+
+    if include_response:
+        for job in jobs:
+            job["response"] = job.pop("record").get("response")
+    return {"jobs": jobs, "count": len(jobs), "next_cursor": next_cursor}, endpoint, 200
@@ -16,21 +16,19 @@
 
 
 
-import os
-import json
 import logging
 import time
 from flask import Blueprint, request
-from config import LOCAL_STORAGE_PATH
 from services.authentication import authenticate
 from app_utils import queue_task_wrapper, validate_payload
+from services.job_status_store import get_job_status_store
 
 v1_toolkit_jobs_status_bp = Blueprint('v1_toolkit_jobs_status', __name__)
 logger = logging.getLogger(__name__)
 
 @v1_toolkit_jobs_status_bp.route('/v1/toolkit/jobs/status', methods=['POST'])
 @authenticate
-@queue_task_wrapper(bypass_queue=True)
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
 def get_all_jobs_status(job_id, data):
     """
     Obtém o status de todos os jobs dentro de um intervalo de tempo especificado
@@ -89,34 +87,11 @@ def get_all_jobs_status(job_id, data):
             
         cutoff_time = time.time() - since_seconds
         
-        # Construct the path to the jobs directory
-        jobs_dir = os.path.join(LOCAL_STORAGE_PATH, 'jobs')
-        
-        # Check if the jobs directory exists
-        if not os.path.exists(jobs_dir):
+        # Indexed lookup on updated_at (a directory scan with the file backend)
+        jobs_status = get_job_status_store().statuses_since(cutoff_time)
+        if jobs_status is None:
             return {"error": "Jobs directory not found"}, endpoint, 404
         
-        # Dictionary to store job statuses
-        jobs_status = {}
-        
-        # Iterate through job files in the directory
-        for filename in os.listdir(jobs_dir):
-            if filename.endswith('.json'):
-                job_file_path = os.path.join(jobs_dir, filename)
-                file_mod_time = os.path.getmtime(job_file_path)
-                
-                # Check if the file was modified within the time range
-                if file_mod_time >= cutoff_time:
-                    job_id = filename.split('.')[0]  # Remove .json extension to get job_id
-                    
-                    # Read the job status file
-                    with open(job_file_path, 'r') as file:
-                        job_data = json.load(file)
-                        
-                        # Only include the job_status field, not the response
-                        if "job_status" in job_data:
-                            jobs_status[job_id] = job_data["job_status"]
-        
         # Return the job statuses
         return jobs_status, endpoint, 200
         
@@ -0,0 +1,83 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import logging
+from flask import Blueprint
+from services.authentication import authenticate
+from services.job_stats import latency_report
+from app_utils import queue_task_wrapper, validate_payload
+
+v1_toolkit_stats_bp = Blueprint('v1_toolkit_stats', __name__)
+logger = logging.getLogger(__name__)
+
+@v1_toolkit_stats_bp.route('/v1/toolkit/stats', methods=['POST'])
+@authenticate
+@validate_payload({
+    "type": "object",
+    "properties": {
+        "window_seconds": {"type": "integer", "minimum": 60, "maximum": 30 * 86400},
+        "endpoint": {"type": "string"}
+    },
+    "additionalProperties": False
+})
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
+def get_stats(job_id, data):
+    """
+    Percentis de latência (p50/p95/p99) por endpoint e por etapa
+    ---
+    tags:
+      - Toolkit
+    security:
+      - APIKeyHeader: []
+    consumes:
+      - application/json
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: x-api-key
+        type: string
+        required: true
+        description: Chave de API para autenticação
+        example: sua-chave-api-aqui
+      - in: body
+        name: body
+        required: false
+        schema:
+          type: object
+          properties:
+            window_seconds:
+              type: integer
+              description: Janela de tempo em segundos (padrão 3600)
+              example: 3600
+            endpoint:
+              type: string
+              description: Limita o relatório a um endpoint
+              example: /v1/video/caption
+    responses:
+      200:
+        description: Tempo de execução, tempo em fila e etapas (download, probe, encode, transcribe, upload, webhook) por endpoint
+      500:
+        description: Erro interno do servidor
+    """
+    endpoint = "/v1/toolkit/stats"
+    try:
+        return latency_report(data.get("window_seconds", 3600), data.get("endpoint")), endpoint, 200
+    except Exception as e:
+        logger.error(f"Error building stats report: {str(e)}")
+        return {"error": f"Failed to build stats report: {str(e)}"}, endpoint, 500
@@ -29,7 +29,7 @@ logger = logging.getLogger(__name__)
 
 @v1_toolkit_test_bp.route('/v1/toolkit/test', methods=['GET'])
 @authenticate
-@queue_task_wrapper(bypass_queue=True)
+@queue_task_wrapper(bypass_queue=True, resource_class="io-light")
 def test_api(job_id, data):
     """
     Testa se a API está funcionando corretamente
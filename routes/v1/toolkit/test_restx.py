@@ -38,7 +38,7 @@ class TestAPI(Resource):
     )
     @toolkit_ns.marshal_with(success_response, code=200)
     @authenticate
-    @queue_task_wrapper(bypass_queue=True)
+    @queue_task_wrapper(bypass_queue=True, resource_class="io-light")
     def get(self, job_id, data):
         """Testa se a API está funcionando corretamente"""
         logger.info(f"Job {job_id}: Testing NCA Toolkit API setup")
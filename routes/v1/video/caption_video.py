@@ -22,6 +22,7 @@ import logging
 from services.ass_toolkit import generate_ass_captions_v1, generate_multi_captions_ass
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
+from services.job_control import run_ffmpeg
 import os
 import requests  # Ensure requests is imported for webhook handling
 import time
@@ -338,7 +339,7 @@ def normalize_swagger_format_to_internal(data):
     "required": ["video_url"],
     "additionalProperties": True
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="whisper", cacheable=True)
 def caption_video_v1(job_id, data):
     # Normalizar formato Swagger para formato interno
     data = normalize_swagger_format_to_internal(data)
@@ -531,11 +532,11 @@ def caption_video_v1(job_id, data):
         
         try:
             import ffmpeg
-            ffmpeg.input(video_path).output(
+            run_ffmpeg(ffmpeg.input(video_path).output(
                 output_path,
                 vf=f"subtitles='{ass_path}'",
                 acodec='copy'
-            ).run(overwrite_output=True)
+            ), overwrite_output=True)
             processing_steps[-1].update({
                 "status": "completed",
                 "completed_at": time.time(),
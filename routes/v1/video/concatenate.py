@@ -20,6 +20,7 @@ from flask import Blueprint
 from app_utils import *
 import logging
 from services.v1.video.concatenate import process_video_concatenate
+from services.workspace import JobWorkspace
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
 
@@ -48,7 +49,7 @@ logger = logging.getLogger(__name__)
     "required": ["video_urls"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def combine_videos(job_id, data):
     """
     Concatena múltiplos vídeos em um único arquivo
@@ -155,11 +156,13 @@ def combine_videos(job_id, data):
     logger.info(f"Job {job_id}: Received combine-videos request for {len(media_urls)} videos")
 
     try:
-        output_file = process_video_concatenate(media_urls, job_id)
-        logger.info(f"Job {job_id}: Video combination process completed successfully")
+        # The workspace (inputs, concat list and output) is removed once the output is uploaded
+        with JobWorkspace(job_id) as workspace:
+            output_file = process_video_concatenate(media_urls, job_id, workspace)
+            logger.info(f"Job {job_id}: Video combination process completed successfully")
 
-        cloud_url = upload_file(output_file)
-        logger.info(f"Job {job_id}: Combined video uploaded to cloud storage: {cloud_url}")
+            cloud_url = upload_file(output_file)
+            logger.info(f"Job {job_id}: Combined video uploaded to cloud storage: {cloud_url}")
 
         return cloud_url, "/v1/video/concatenate", 200
 
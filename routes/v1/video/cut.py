@@ -55,7 +55,7 @@ logger = logging.getLogger(__name__)
     "required": ["video_url", "cuts"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def video_cut(job_id, data):
     """
     Remove segmentos especificados de um arquivo de vídeo
@@ -16,6 +16,7 @@
 
 
 
+import shutil
 from flask import Blueprint
 from app_utils import *
 import logging
@@ -49,13 +50,14 @@ logger = logging.getLogger(__name__)
         "video_crf": {"type": "number", "minimum": 0, "maximum": 51},
         "audio_codec": {"type": "string"},
         "audio_bitrate": {"type": "string"},
+        "stream_input": {"type": "boolean"},
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"}
     },
     "required": ["video_url", "splits"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def video_split(job_id, data):
     """
     Divide um vídeo em múltiplos segmentos
@@ -129,6 +131,9 @@ def video_split(job_id, data):
               type: string
               description: Bitrate de áudio
               example: "128k"
+            stream_input:
+              type: boolean
+              description: Lê a mídia direto da URL (o FFmpeg busca só as faixas de bytes necessárias) em vez de baixá-la antes; servidores sem suporte a Range usam o download (padrão: STREAM_INPUT_ENABLED)
             webhook_url:
               type: string
               format: uri
@@ -240,6 +245,7 @@ def video_split(job_id, data):
     
     logger.info(f"Job {job_id}: Received video split request for {video_url}")
     
+    output_files, input_filename = [], None
     try:
         # Process the video file and get list of output files
         output_files, input_filename = split_video(
@@ -250,7 +256,8 @@ def video_split(job_id, data):
             video_preset=video_preset,
             video_crf=video_crf,
             audio_codec=audio_codec,
-            audio_bitrate=audio_bitrate
+            audio_bitrate=audio_bitrate,
+            stream_input=data.get('stream_input')
         )
         
         # Upload all output files to cloud storage
@@ -277,14 +284,6 @@ def video_split(job_id, data):
             else:
                 logger.info(f"Job {job_id}: Modo local ativo - arquivo mantido em: {output_file}")
         
-        # Clean up input file (sempre remover)
-        import os
-        try:
-            os.remove(input_filename)
-            logger.info(f"Job {job_id}: Removed input file")
-        except Exception as e:
-            logger.warning(f"Job {job_id}: Could not remove input file {input_filename}: {str(e)}")
-        
         # Prepare the response with only file URLs
         response = [{"file_url": item["file_url"]} for item in result_files]
         
@@ -293,4 +292,17 @@ def video_split(job_id, data):
         
     except Exception as e:
         logger.error(f"Job {job_id}: Error during video split process - {str(e)}")
-        return str(e), "/v1/video/split", 500
\ No newline at end of file
+        return str(e), "/v1/video/split", 500
+
+    finally:
+        # os is a local name of this function (see the upload loop), so a failure before that loop needs its own import
+        import os
+        # Clean up the input file and its download directory (sempre remover)
+        if input_filename:
+            shutil.rmtree(os.path.dirname(input_filename), ignore_errors=True)
+            logger.info(f"Job {job_id}: Removed input file")
+        # Split files left behind by a failed upload
+        if os.getenv('LOCAL_STORAGE_MODE', '').lower() != 'true':
+            for output_file in output_files:
+                if os.path.exists(output_file):
+                    os.remove(output_file)
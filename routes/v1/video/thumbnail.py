@@ -39,7 +39,7 @@ logger = logging.getLogger(__name__)
     "required": ["video_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="io-light")
 def generate_thumbnail(job_id, data):
     """
     Extrai uma thumbnail de um vídeo em um timestamp específico
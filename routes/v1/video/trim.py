@@ -38,13 +38,14 @@ logger = logging.getLogger(__name__)
         "video_crf": {"type": "number", "minimum": 0, "maximum": 51},
         "audio_codec": {"type": "string"},
         "audio_bitrate": {"type": "string"},
+        "stream_input": {"type": "boolean"},
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"}
     },
     "required": ["video_url"],
     "additionalProperties": False
 })
-@queue_task_wrapper(bypass_queue=False)
+@queue_task_wrapper(bypass_queue=False, resource_class="ffmpeg-encode")
 def video_trim(job_id, data):
     """
     Corta um vídeo removendo partes do início e/ou fim
@@ -107,6 +108,9 @@ def video_trim(job_id, data):
               type: string
               description: Bitrate de áudio
               example: "128k"
+            stream_input:
+              type: boolean
+              description: Lê a mídia direto da URL (o FFmpeg busca só as faixas de bytes necessárias) em vez de baixá-la antes; servidores sem suporte a Range usam o download (padrão: STREAM_INPUT_ENABLED)
             webhook_url:
               type: string
               format: uri
@@ -174,7 +178,8 @@ def video_trim(job_id, data):
             video_preset=video_preset,
             video_crf=video_crf,
             audio_codec=audio_codec,
-            audio_bitrate=audio_bitrate
+            audio_bitrate=audio_bitrate,
+            stream_input=data.get('stream_input')
         )
         
         # Upload the processed file to cloud storage
@@ -184,12 +189,13 @@ def video_trim(job_id, data):
         
         # Clean up temporary files
         import os
-        # Sempre remover arquivo de entrada
-        try:
-            os.remove(input_filename)
-            logger.info(f"Job {job_id}: Removed input file: {input_filename}")
-        except Exception as e:
-            logger.warning(f"Job {job_id}: Could not remove input file {input_filename}: {str(e)}")
+        # Sempre remover arquivo de entrada (não existe quando a entrada foi lida da URL)
+        if input_filename:
+            try:
+                os.remove(input_filename)
+                logger.info(f"Job {job_id}: Removed input file: {input_filename}")
+            except Exception as e:
+                logger.warning(f"Job {job_id}: Could not remove input file {input_filename}: {str(e)}")
         
         # Em modo local, manter o arquivo de saída para facilitar acesso
         is_local_mode = os.getenv('LOCAL_STORAGE_MODE', '').lower() == 'true'
@@ -21,16 +21,16 @@ import platform
 import ffmpeg
 import logging
 import subprocess
-import whisper
 from datetime import timedelta
 import srt
 import re
 import unicodedata
 from services.file_management import download_file
 from services.cloud_storage import upload_file  # Ensure this import is present
-import requests  # Ensure requests is imported for webhook handling
 from urllib.parse import urlparse
 from config import LOCAL_STORAGE_PATH
+from services.process_pool import run_in_process, whisper_transcribe
+from services.http_client import get_session
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -66,14 +66,13 @@ def rgb_to_ass_color(rgb_color):
 
 def generate_transcription(video_path, language='auto'):
     try:
-        model = whisper.load_model("base")
         transcription_options = {
             'word_timestamps': True,
             'verbose': True,
         }
         if language != 'auto':
             transcription_options['language'] = language
-        result = model.transcribe(video_path, **transcription_options)
+        result = run_in_process(whisper_transcribe, "base", video_path, **transcription_options)
         logger.info(f"Transcription generated successfully for video: {video_path}")
         return result
     except Exception as e:
@@ -200,7 +199,7 @@ def download_captions(captions_url):
     """Download captions from the given URL."""
     try:
         logger.info(f"Downloading captions from URL: {captions_url}")
-        response = requests.get(captions_url)
+        response = get_session().get(captions_url)
         response.encoding = 'utf-8'  # Forçar UTF-8 para suportar acentos e emojis
         response.raise_for_status()
         logger.info("Captions downloaded successfully.")
@@ -1216,7 +1215,7 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
                             return {"error": f"Erro ao baixar o vídeo: {str(e)}"}
                     
                     # Generate unicode-safe ASS
-                    subtitle_content = generate_unicode_safe_ass(captions_content, settings, video_resolution, job_id)
+                    subtitle_content = run_in_process(generate_unicode_safe_ass, captions_content, settings, video_resolution, job_id)
                     if isinstance(subtitle_content, dict) and 'error' in subtitle_content:
                         return subtitle_content
                     
@@ -1253,7 +1252,7 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
                     return {"error": error_message}
                 transcription_result = srt_to_transcription_result(captions_content)
                 # Generate ASS based on chosen style
-                subtitle_content = process_subtitle_events(transcription_result, style_type, style_options, replace_dict, video_resolution)
+                subtitle_content = run_in_process(process_subtitle_events, transcription_result, style_type, style_options, replace_dict, video_resolution)
                 subtitle_type = 'ass'
         else:
             # No captions provided, generate transcription
@@ -1282,7 +1281,7 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
             logger.info(f"Job {job_id}: No captions provided, generating transcription.")
             transcription_result = generate_transcription(video_path, language=language)
             # Generate ASS based on chosen style
-            subtitle_content = process_subtitle_events(transcription_result, style_type, style_options, replace_dict, video_resolution)
+            subtitle_content = run_in_process(process_subtitle_events, transcription_result, style_type, style_options, replace_dict, video_resolution)
             subtitle_type = 'ass'
 
         # Check for subtitle processing errors
@@ -1296,7 +1295,7 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
 
         # After subtitle_content is generated and before saving to file:
         if exclude_time_ranges:
-            subtitle_content = filter_subtitle_lines(subtitle_content, exclude_time_ranges, subtitle_type)
+            subtitle_content = run_in_process(filter_subtitle_lines, subtitle_content, exclude_time_ranges, subtitle_type)
             if subtitle_type == 'ass':
                 logger.info(f"Job {job_id}: Filtered ASS Dialogue lines due to exclude_time_ranges.")
             elif subtitle_type == 'srt':
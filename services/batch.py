@@ -0,0 +1,149 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import time
+import logging
+import contextvars
+from contextlib import nullcontext
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import jsonschema
+from app_utils import resolve_job_endpoint, resolve_job_options, QUEUE_CONTROL_KEYS
+from config import DEFAULT_RESOURCE_CLASS
+from services.job_control import bind_job, current_job_id, check_cancelled, JobCancelled
+from services.shared_inputs import shared_inputs
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that cannot be nested inside a batch
+NON_BATCHABLE_ENDPOINTS = ("/v1/batch", "/v1/pipeline")
+
+# Sub-job payload keys ignored inside a batch: the batch reports the results
+SUB_JOB_IGNORED_KEYS = ("webhook_url",) + QUEUE_CONTROL_KEYS
+
+def collect_urls(value, urls=None):
+    """All http(s) URLs in a payload, including nested lists and objects."""
+    urls = [] if urls is None else urls
+    if isinstance(value, dict):
+        for item in value.values():
+            collect_urls(item, urls)
+    elif isinstance(value, list):
+        for item in value:
+            collect_urls(item, urls)
+    elif isinstance(value, str) and value.startswith(("http://", "https://")):
+        urls.append(value)
+    return urls
+
+def prepare_batch(jobs):
+    """
+    Resolve and validate the sub-jobs of a batch before anything runs.
+
+    Returns:
+        tuple: (prepared sub-jobs, None) or (None, error message)
+    """
+    prepared = []
+    for index, job in enumerate(jobs):
+        endpoint = job["endpoint"]
+        if endpoint in NON_BATCHABLE_ENDPOINTS:
+            return None, f"jobs[{index}]: {endpoint} cannot be used inside a batch"
+        func, schema = resolve_job_endpoint(endpoint)
+        if func is None:
+            return None, f"jobs[{index}]: unknown endpoint {endpoint}"
+        payload = {k: v for k, v in (job.get("payload") or {}).items() if k not in SUB_JOB_IGNORED_KEYS}
+        if schema:
+            try:
+                jsonschema.validate(instance=payload, schema=schema)
+            except jsonschema.exceptions.ValidationError as e:
+                return None, f"jobs[{index}]: invalid payload for {endpoint}: {e.message}"
+        prepared.append({
+            "index": index,
+            "id": job.get("id"),
+            "endpoint": endpoint,
+            "func": func,
+            "resource_class": (resolve_job_options(endpoint) or {}).get("resource_class") or DEFAULT_RESOURCE_CLASS,
+            "payload": payload
+        })
+    return prepared, None
+
+def _run_sub_job(app, parent_job_id, sub_job):
+    sub_job_id = f"{parent_job_id}-{sub_job['index']}"
+    start_time = time.time()
+    bind_job(parent_job_id)
+    executor = getattr(app, "job_executor", None)
+    try:
+        # Sub-jobs take a slot in their own lane, like queued jobs of that endpoint
+        with executor.lane_slot(sub_job["resource_class"], check_cancelled) if executor else nullcontext():
+            start_time = time.time()
+            with app.app_context():
+                response, _, code = sub_job["func"](job_id=sub_job_id, data=sub_job["payload"])
+    except JobCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Job {parent_job_id}: [BATCH] Sub-job {sub_job['index']} ({sub_job['endpoint']}) failed: {str(e)}")
+        response, code = str(e), 500
+    finally:
+        bind_job(None)
+    result = {
+        "index": sub_job["index"],
+        "id": sub_job["id"],
+        "job_id": sub_job_id,
+        "endpoint": sub_job["endpoint"],
+        "code": code,
+        "run_time": round(time.time() - start_time, 3)
+    }
+    if code == 200:
+        result["response"] = response
+    else:
+        result["error"] = str(response)
+    return result
+
+def run_batch(app, job_id, sub_jobs, max_parallel):
+    """
+    Run prepared sub-jobs with at most max_parallel at a time.
+
+    Every sub-job also waits for a slot in the lane of its endpoint, so a
+    batch never runs more of them than the lane caps allow next to the
+    queued jobs; while it waits on them the batch lends out its own slot.
+    URLs used by more than one sub-job are downloaded and probed once for
+    the whole batch. A failed sub-job does not stop the others.
+
+    Returns:
+        dict: results in submission order plus succeeded/failed counts
+    """
+    counts = Counter(url for sub_job in sub_jobs for url in set(collect_urls(sub_job["payload"])))
+    shared_urls = {url for url, count in counts.items() if count > 1}
+    parent_job_id = current_job_id() or job_id
+    logger.info(f"Job {job_id}: [BATCH] {len(sub_jobs)} sub-job(s), parallel={max_parallel}, shared inputs={len(shared_urls)}")
+
+    executor = getattr(app, "job_executor", None)
+    with shared_inputs(shared_urls), executor.lend_slot(job_id) if executor else nullcontext():
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix=f"batch-{job_id[:8]}") as pool:
+            # Each thread runs in a copy of this context to see the shared inputs
+            futures = [
+                pool.submit(contextvars.copy_context().run, _run_sub_job, app, parent_job_id, sub_job)
+                for sub_job in sub_jobs
+            ]
+            results = [future.result() for future in futures]
+
+    succeeded = sum(1 for result in results if result["code"] == 200)
+    return {
+        "results": results,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
@@ -19,9 +19,10 @@
 import os
 import ffmpeg
 import logging
-import requests
 import subprocess
 from services.file_management import download_file
+from services.job_control import run_ffmpeg
+from services.http_client import get_session
 
 # Set the default local storage directory
 STORAGE_PATH = "/tmp/"
@@ -133,7 +134,7 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         if caption_srt.startswith("https"):
             # Download the file if caption_srt is a URL
             logger.info(f"Job {job_id}: Downloading caption file from {caption_srt}")
-            response = requests.get(caption_srt)
+            response = get_session().get(caption_srt)
             response.raise_for_status()  # Raise an exception for bad status codes
             if caption_type in ['srt','vtt']:
                 with open(srt_path, 'wb') as srt_file:
@@ -205,11 +206,11 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
             logger.info(f"Job {job_id}: Running FFmpeg with filter: {subtitle_filter}")
 
             # Run FFmpeg to add subtitles to the video
-            ffmpeg.input(video_path).output(
+            run_ffmpeg(ffmpeg.input(video_path).output(
                 output_path,
                 vf=subtitle_filter,
                 acodec='copy'
-            ).run()
+            ))
             logger.info(f"Job {job_id}: FFmpeg processing completed, output file at {output_path}")
         except ffmpeg.Error as e:
             # Log the FFmpeg stderr output
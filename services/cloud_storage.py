@@ -22,6 +22,8 @@ from abc import ABC, abstractmethod
 from services.gcp_toolkit import upload_to_gcs
 from services.s3_toolkit import upload_to_s3
 from config import validate_env_vars
+from services.shared_inputs import local_output_url, remember_output
+from services.job_control import stage, transfer
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -130,11 +132,19 @@ def get_storage_provider() -> CloudStorageProvider:
     raise ValueError(f"No cloud storage settings provided.")
 
 def upload_file(file_path: str) -> str:
+    # Intermediate outputs of a pipeline step stay on local disk
+    local_url = local_output_url(file_path)
+    if local_url is not None:
+        logger.info(f"Keeping pipeline intermediate on local disk: {file_path} -> {local_url}")
+        return local_url
+
     provider = get_storage_provider()
     try:
         logger.info(f"Uploading file to cloud storage: {file_path}")
-        url = provider.upload_file(file_path)
+        with stage("upload"), transfer(file_path, "upload", os.path.getsize(file_path)):
+            url = provider.upload_file(file_path)
         logger.info(f"File uploaded successfully: {url}")
+        remember_output(url, file_path)
         return url
     except Exception as e:
         logger.error(f"Error uploading file to cloud storage: {e}")
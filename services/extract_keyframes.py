@@ -17,37 +17,41 @@
 
 
 import os
-import subprocess
 import json
-from services.file_management import download_file
-
-STORAGE_PATH = "/tmp/"
-
-def process_keyframe_extraction(video_url, job_id):
-    video_path = download_file(video_url, STORAGE_PATH)
-
-    # Extract keyframes
-    output_pattern = os.path.join(STORAGE_PATH, f"{job_id}_%03d.jpg")
-    cmd = [
-        'ffmpeg',
-        '-i', video_path,
-        '-vf', f"select='eq(pict_type,I)',scale=iw*sar:ih,setsar=1",
-        '-vsync', 'vfr',
-        output_pattern
-    ]
-
-    print(f"Images: {cmd}")
-
-    subprocess.run(cmd, check=True)
-
-    # Upload keyframes to GCS and get URLs
-    output_filenames = []
-    for filename in sorted(os.listdir(STORAGE_PATH)):
-        if filename.startswith(f"{job_id}_") and filename.endswith(".jpg"):
-            file_path = os.path.join(STORAGE_PATH, filename)
-            output_filenames.append(file_path)
-
-    # Clean up input file
-    os.remove(video_path)
-
-    return output_filenames
\ No newline at end of file
+from services.job_control import run_subprocess
+
+def process_keyframe_extraction(video_url, job_id, workspace):
+    """
+    Extract the keyframes (I-frames) of a video as JPEG files.
+
+    The frames are written to the outputs of `workspace` (a
+    services.workspace.JobWorkspace), which removes them, and the
+    downloaded video, when the caller closes it.
+
+    Returns:
+        list: Paths of the keyframes, in order
+    """
+    video_path = workspace.download(video_url)
+
+    try:
+        # Extract keyframes
+        output_pattern = workspace.output_path(f"{job_id}_%03d.jpg")
+        cmd = [
+            'ffmpeg',
+            '-i', video_path,
+            '-vf', f"select='eq(pict_type,I)',scale=iw*sar:ih,setsar=1",
+            '-vsync', 'vfr',
+            output_pattern
+        ]
+
+        print(f"Images: {cmd}")
+
+        run_subprocess(cmd, check=True)
+        workspace.check_quota()
+
+        # The outputs directory holds the frames of this job only
+        return [entry["path"] for entry in workspace.collect_outputs(".jpg")]
+    finally:
+        # Clean up input file
+        if os.path.exists(video_path):
+            os.remove(video_path)
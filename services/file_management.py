@@ -17,61 +17,216 @@
 
 
 import os
+import re
 import uuid
-import requests
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from email.message import Message
 from urllib.parse import urlparse, parse_qs
 import mimetypes
+from config import DOWNLOAD_PARALLEL_INPUTS
+from services.job_control import track_job_file, stage, transfer, bind_job, current_job_id
+from services.shared_inputs import current_shared_inputs
+from services import input_cache
 
-def get_extension_from_url(url):
-    """Extract file extension from URL or content type.
-    
-    Args:
-        url (str): The URL to extract the extension from
-        
-    Returns:
-        str: The file extension including the dot (e.g., '.jpg')
-        
-    Raises:
-        ValueError: If no valid extension can be determined from the URL or content type
-    """
-    # First try to get extension from URL
-    parsed_url = urlparse(url)
-    path = parsed_url.path
+# Content types that say nothing about the format
+GENERIC_CONTENT_TYPES = {
+    "", "application/octet-stream", "binary/octet-stream", "application/binary",
+    "application/download", "application/x-download", "application/force-download"
+}
+# Where mimetypes has no answer, or one FFmpeg would not expect
+CONTENT_TYPE_EXTENSIONS = {
+    "audio/mpeg": ".mp3", "audio/mp3": ".mp3", "audio/mp4": ".m4a", "audio/x-m4a": ".m4a",
+    "audio/wav": ".wav", "audio/x-wav": ".wav", "audio/wave": ".wav", "audio/ogg": ".ogg",
+    "audio/webm": ".webm", "video/x-matroska": ".mkv", "audio/x-matroska": ".mka",
+    "video/mp2t": ".ts", "image/jpeg": ".jpg", "text/vtt": ".vtt",
+    "application/x-subrip": ".srt", "text/x-ssa": ".ass", "text/x-ass": ".ass"
+}
+# Leading bytes of formats without a container box to look into
+MAGIC_SIGNATURES = (
+    (b"ID3", ".mp3"), (b"OggS", ".ogg"), (b"fLaC", ".flac"), (b"FLV", ".flv"),
+    (b"\x89PNG\r\n\x1a\n", ".png"), (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"), (b"GIF89a", ".gif"), (b"%PDF", ".pdf")
+)
+SNIFF_BYTES = 4096
+SRT_START = re.compile(r"\d+\s*\r?\n\d{1,2}:\d{2}:\d{2}[,.]\d{3}\s+-->")
+
+def _extension_from_path(url):
+    path = urlparse(url).path
     if path:
         ext = os.path.splitext(path)[1].lower()
         if ext:
             return ext
+    return None
 
-    # If no extension in URL, try to determine from content type
-    try:
-        response = requests.head(url, allow_redirects=True)
-        content_type = response.headers.get('content-type', '').split(';')[0]
-        ext = mimetypes.guess_extension(content_type)
+def _extension_from_content_type(content_type):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in GENERIC_CONTENT_TYPES:
+        return None
+    ext = CONTENT_TYPE_EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type)
+    return ext.lower() if ext else None
+
+def _extension_from_disposition(content_disposition):
+    if not content_disposition:
+        return None
+    message = Message()
+    message["content-disposition"] = content_disposition
+    filename = message.get_filename()
+    if filename:
+        ext = os.path.splitext(filename)[1].lower()
         if ext:
-            return ext.lower()
-    except:
-        pass
+            return ext
+    return None
 
-    # If we can't determine the extension, raise an error
-    raise ValueError(f"Could not determine file extension from URL: {url}")
+def sniff_extension(path):
+    """Extension of a media or subtitle file from its first bytes, or None."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand == b"qt  ":
+            return ".mov"
+        if brand in (b"M4A ", b"M4B "):
+            return ".m4a"
+        if brand.startswith(b"3g"):
+            return ".3gp"
+        return ".mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return ".webm" if b"webm" in head[:64] else ".mkv"
+    if head.startswith(b"RIFF"):
+        return {b"WAVE": ".wav", b"AVI ": ".avi", b"WEBP": ".webp"}.get(head[8:12])
+    for signature, ext in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if len(head) > 376 and head[0] == head[188] == head[376] == 0x47:
+        return ".ts"
+    if len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # MPEG audio frame sync; layer bits 00 are ADTS AAC
+        return ".aac" if head[1] & 0x06 == 0 else ".mp3"
+    text = head.decode("utf-8-sig", errors="ignore").lstrip()
+    if text.startswith("WEBVTT"):
+        return ".vtt"
+    if text.startswith("[Script Info]"):
+        return ".ass"
+    if SRT_START.match(text):
+        return ".srt"
+    return None
+
+def resolve_extension(url, info=None, path=None):
+    """Extension of a downloaded input, without another request.
+
+    Tried in order: the URL path, the Content-Disposition filename and the
+    Content-Type of the GET response (`info`, as filled by
+    input_cache.download), then the first bytes of the file at `path`.
+
+    Returns:
+        str: The extension including the dot, or None
+    """
+    info = info or {}
+    return (
+        _extension_from_path(url)
+        or _extension_from_disposition(info.get("content_disposition"))
+        or _extension_from_content_type(info.get("content_type"))
+        or (sniff_extension(path) if path else None)
+    )
 
 def download_file(url, storage_path="/tmp/"):
-    """Download a file from URL to local storage."""
+    """Download a file from URL to local storage.
+
+    Inside a batch (services.shared_inputs) each shared URL is downloaded
+    only once; every caller gets its own link to that file.
+    """
+    shared = current_shared_inputs()
+    if shared is not None and shared.shares(url):
+        local_filename = shared.local_copy(url, storage_path, fetch_file)
+        track_job_file(local_filename)
+        return local_filename
+    return fetch_file(url, storage_path)
+
+def download_files(downloads, max_workers=None):
+    """Download several files at once, DOWNLOAD_PARALLEL_INPUTS at a time.
+
+    Args:
+        downloads (list): (url, storage_path) pairs, as for download_file
+
+    Returns:
+        list: The local paths, in the order of `downloads`
+
+    Raises:
+        Exception: The first download error. Downloads not started yet are
+            dropped and every file already downloaded is removed.
+    """
+    downloads = list(downloads)
+    max_workers = min(max_workers or DOWNLOAD_PARALLEL_INPUTS, len(downloads))
+    if max_workers <= 1:
+        paths = []
+        try:
+            for url, storage_path in downloads:
+                paths.append(download_file(url, storage_path))
+        except Exception:
+            _remove_files(paths)
+            raise
+        return paths
+
+    job_id = current_job_id()
+
+    def fetch(url, storage_path):
+        if job_id:
+            bind_job(job_id)
+        return download_file(url, storage_path)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="input-download") as pool:
+        # Each thread gets the caller's context so shared inputs still apply
+        futures = [
+            pool.submit(contextvars.copy_context().run, fetch, url, storage_path)
+            for url, storage_path in downloads
+        ]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = [future for future in futures if future in done and future.exception() is not None]
+        if failed:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            _remove_files(future.result() for future in futures if not future.cancelled() and future.exception() is None)
+            raise failed[0].exception()
+    return [future.result() for future in futures]
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def fetch_file(url, storage_path="/tmp/"):
+    """
+    Download a file from URL to local storage, bypassing shared inputs.
+
+    Goes through the on-disk input cache (services.input_cache), so an
+    unchanged input is linked from the cache instead of downloaded again.
+    """
     # Create storage directory if it doesn't exist
     os.makedirs(storage_path, exist_ok=True)
     
     file_id = str(uuid.uuid4())
-    extension = get_extension_from_url(url)
-    local_filename = os.path.join(storage_path, f"{file_id}{extension}")
+    # Without an extension in the URL, the GET response itself tells the type
+    extension = _extension_from_path(url)
+    local_filename = os.path.join(storage_path, f"{file_id}{extension or ''}")
+    track_job_file(local_filename)
 
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        info = {}
+        with stage("download"), transfer(url) as progress:
+            input_cache.download(url, local_filename, progress, info)
 
-        with open(local_filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        if extension is None:
+            extension = resolve_extension(url, info, local_filename)
+            if extension is None:
+                raise ValueError(f"Could not determine file extension from URL: {url}")
+            typed_filename = local_filename + extension
+            track_job_file(typed_filename)
+            os.rename(local_filename, typed_filename)
+            local_filename = typed_filename
 
         return local_filename
     except Exception as e:
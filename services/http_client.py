@@ -0,0 +1,132 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import time
+import threading
+import logging
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ProtocolError, DecodeError, ReadTimeoutError, SSLError
+from config import (
+    HTTP_POOL_MAXSIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES,
+    HTTP_RETRY_BACKOFF, HTTP_MIN_SPEED_KBPS, HTTP_STALL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TransferStalled(requests.RequestException):
+    """A streamed transfer fell below HTTP_MIN_SPEED_KBPS for HTTP_STALL_SECONDS."""
+
+class PooledSession(requests.Session):
+    """Session whose requests get the default connect/read timeouts."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        return super().request(method, url, **kwargs)
+
+def _create_session():
+    session = PooledSession()
+    # POST (webhooks) is only retried when the request never reached the server
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # The session is shared by unrelated jobs; never carry cookies between them
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Process-wide pooled session for outbound HTTP.
+
+    Connections are kept alive per host and reused across jobs and threads,
+    requests get connect/read timeouts, and idempotent requests are retried
+    with exponential backoff on connection errors, 429 and 5xx.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        # Sockets must not be shared with a forked parent
+        if _session is None or _session_pid != os.getpid():
+            _session = _create_session()
+            _session_pid = os.getpid()
+        return _session
+
+def _read_available(response, chunk_size):
+    """
+    Yield what the socket has, up to chunk_size, as soon as it arrives.
+    response.iter_content() waits for a full chunk, which hides a trickling
+    origin from the stall check for as long as the chunk takes to fill.
+    """
+    raw = response.raw
+    if not hasattr(raw, "read1"):
+        # urllib3 < 2
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    try:
+        while True:
+            chunk = raw.read1(chunk_size, decode_content=True)
+            if not chunk:
+                break
+            yield chunk
+    except ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e)
+    except DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e)
+    except ReadTimeoutError as e:
+        raise requests.exceptions.ConnectionError(e)
+    except SSLError as e:
+        raise requests.exceptions.SSLError(e)
+    response._content_consumed = True
+
+def iter_content(response, chunk_size=READ_SIZE):
+    """
+    response.iter_content() that raises TransferStalled when fewer than
+    HTTP_MIN_SPEED_KBPS arrive over HTTP_STALL_SECONDS. The read timeout
+    only catches an origin that sends nothing; this catches one that trickles.
+    """
+    if HTTP_MIN_SPEED_KBPS <= 0 or HTTP_STALL_SECONDS <= 0:
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    min_bytes = HTTP_MIN_SPEED_KBPS * 1024 * HTTP_STALL_SECONDS
+    window_start = time.monotonic()
+    window_bytes = 0
+    for chunk in _read_available(response, chunk_size):
+        yield chunk
+        window_bytes += len(chunk)
+        now = time.monotonic()
+        if now - window_start >= HTTP_STALL_SECONDS:
+            if window_bytes < min_bytes:
+                speed = window_bytes / 1024 / (now - window_start)
+                raise TransferStalled(f"Transfer from {response.url.split('?')[0]} stalled at {speed:.1f} KB/s")
+            window_start, window_bytes = now, 0
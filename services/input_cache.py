@@ -0,0 +1,301 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+from contextlib import contextmanager
+from config import INPUT_CACHE_ENABLED, INPUT_CACHE_DIR, INPUT_CACHE_MAX_MB
+from services.job_control import check_cancelled
+from services.http_client import get_session, iter_content
+from services.ranged_download import use_ranges, ranged_download, RangesNotSupported
+
+logger = logging.getLogger(__name__)
+
+OBJECTS_DIR = os.path.join(INPUT_CACHE_DIR, 'objects')
+INDEX_DIR = os.path.join(INPUT_CACHE_DIR, 'index')
+LOCKS_DIR = os.path.join(INPUT_CACHE_DIR, 'locks')
+EVICT_LOCK = os.path.join(INPUT_CACHE_DIR, 'evict.lock')
+
+CHUNK_SIZE = 1024 * 1024
+# Downloads of one URL are serialized on one of 16^LOCK_STRIPE_CHARS lock files
+LOCK_STRIPE_CHARS = 4
+LOCK_POLL_INTERVAL = 0.2
+# Partial downloads left behind by a killed worker
+STALE_TMP_SECONDS = 3600
+# ioctl that clones a file's extents (btrfs, xfs), see _link()
+FICLONE = 0x40049409
+
+def _url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def _object_path(digest):
+    return os.path.join(OBJECTS_DIR, digest)
+
+def _read_index(key):
+    try:
+        with open(os.path.join(INDEX_DIR, f"{key}.json"), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_index(key, entry):
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    path = os.path.join(INDEX_DIR, f"{key}.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+@contextmanager
+def _url_lock(key):
+    """Single-flight: one download or revalidation of a URL at a time across threads and workers."""
+    os.makedirs(LOCKS_DIR, exist_ok=True)
+    with open(os.path.join(LOCKS_DIR, f"{key[:LOCK_STRIPE_CHARS]}.lock"), "a") as lock:
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                check_cancelled()
+                time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _link(source, dest):
+    """Hard link `source` to `dest`, else reflink it, else copy it."""
+    try:
+        os.link(source, dest)
+        return
+    except OSError:
+        pass
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+def _stream(response, path, progress=None, digest=None):
+    """Write a streamed response to `path`, feeding `digest` on the way. Returns the bytes written."""
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in iter_content(response, chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            f.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            size += len(chunk)
+            if progress is not None:
+                progress.add(len(chunk))
+            check_cancelled()
+    return size
+
+def _hash_file(path, digest):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+
+def _fetch_body(url, response, path, progress=None, digest=None):
+    """
+    Save the body of a 200 response to `path`: over parallel byte ranges for
+    large inputs of servers that accept them, else from the response stream.
+    Returns the bytes written.
+    """
+    length = _content_length(response)
+    if use_ranges(response, length):
+        response.close()
+        try:
+            ranged_download(url, path, length, response.headers.get("ETag") or response.headers.get("Last-Modified"), progress)
+            if digest is not None:
+                # Ranges arrive out of order; hash the file while it is still in the page cache
+                _hash_file(path, digest)
+            return length
+        except RangesNotSupported as e:
+            logger.info(f"[INPUT_CACHE] Ranged download of {url.split('?')[0]} not possible ({str(e)}), using a single stream")
+            if progress is not None:
+                progress.bytes = 0
+            with get_session().get(url, stream=True) as response:
+                response.raise_for_status()
+                return _stream(response, path, progress, digest)
+    return _stream(response, path, progress, digest)
+
+def _content_length(response):
+    length = response.headers.get("content-length")
+    return int(length) if length and length.isdigit() else None
+
+def _describe(headers, into):
+    """Copy the headers that identify the type of the content into `into`."""
+    if into is not None:
+        into["content_type"] = headers.get("Content-Type")
+        into["content_disposition"] = headers.get("Content-Disposition")
+
+def download(url, dest, progress=None, info=None):
+    """
+    Download `url` to `dest` through the input cache.
+
+    A cached URL is revalidated with a conditional GET and, when unchanged,
+    `dest` becomes a hard link (or reflink/copy) of the cached file.
+    Concurrent downloads of the same URL wait for the first one and reuse its
+    result. Responses without ETag/Last-Modified, or larger than the cache,
+    are streamed straight to `dest`.
+
+    Args:
+        progress (Transfer, optional): Receives total and bytes downloaded
+        info (dict, optional): Receives the content_type and
+            content_disposition of the response (or of the cached one)
+
+    Returns:
+        str: "hit", "miss" (downloaded and cached) or "bypass" (not cached)
+    """
+    if not INPUT_CACHE_ENABLED or INPUT_CACHE_MAX_MB <= 0:
+        with get_session().get(url, stream=True) as response:
+            response.raise_for_status()
+            _describe(response.headers, info)
+            if progress is not None:
+                progress.total = _content_length(response)
+            _fetch_body(url, response, dest, progress)
+        return "bypass"
+
+    key = _url_key(url)
+    waited_since = time.time()
+    with _url_lock(key):
+        entry = _read_index(key)
+        if entry is not None and not os.path.exists(_object_path(entry["sha256"])):
+            entry = None
+        # Fetched or revalidated by the download we waited for
+        if entry is not None and entry["validated_at"] >= waited_since:
+            return _hand_off(entry, dest, progress, info)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        with get_session().get(url, stream=True, headers=headers) as response:
+            if entry is not None and response.status_code == 304:
+                entry["validated_at"] = time.time()
+                _write_index(key, entry)
+                return _hand_off(entry, dest, progress, info)
+            response.raise_for_status()
+            _describe(response.headers, info)
+            length = _content_length(response)
+            if progress is not None:
+                progress.total = length
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            content_type = response.headers.get("Content-Type")
+            content_disposition = response.headers.get("Content-Disposition")
+            if (not etag and not last_modified) or (length or 0) > INPUT_CACHE_MAX_MB * 1024 * 1024:
+                _fetch_body(url, response, dest, progress)
+                return "bypass"
+
+            os.makedirs(OBJECTS_DIR, exist_ok=True)
+            tmp_path = os.path.join(OBJECTS_DIR, f"tmp-{uuid.uuid4()}")
+            digest = hashlib.sha256()
+            try:
+                size = _fetch_body(url, response, tmp_path, progress, digest)
+                object_path = _object_path(digest.hexdigest())
+                if os.path.exists(object_path):
+                    # Same content already cached under another URL or version
+                    os.remove(tmp_path)
+                else:
+                    # Jobs get links to this inode; keep them from changing it in place
+                    os.chmod(tmp_path, 0o444)
+                    os.replace(tmp_path, object_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        now = time.time()
+        entry = {
+            "url": url, "etag": etag, "last_modified": last_modified,
+            "content_type": content_type, "content_disposition": content_disposition,
+            "sha256": digest.hexdigest(), "size": size,
+            "fetched_at": now, "validated_at": now
+        }
+        _write_index(key, entry)
+        _link(object_path, dest)
+        os.utime(object_path, None)
+    evict()
+    return "miss"
+
+def _hand_off(entry, dest, progress, info=None):
+    object_path = _object_path(entry["sha256"])
+    # Entries written before these were recorded leave the type to sniffing
+    _describe({"Content-Type": entry.get("content_type"), "Content-Disposition": entry.get("content_disposition")}, info)
+    _link(object_path, dest)
+    # The mtime is the LRU clock
+    os.utime(object_path, None)
+    if progress is not None:
+        progress.total = entry["size"]
+        progress.add(entry["size"])
+    logger.info(f"[INPUT_CACHE] Hit for {entry['url'].split('?')[0]} ({entry['size']} bytes)")
+    return "hit"
+
+def evict(max_bytes=None):
+    """
+    Remove the least recently used cached files above INPUT_CACHE_MAX_MB
+    and stale partial downloads. Files still linked by a job stay on disk
+    until the job deletes its link.
+
+    Returns:
+        int: Bytes removed from the cache
+    """
+    max_bytes = INPUT_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    if not os.path.isdir(OBJECTS_DIR):
+        return 0
+    with open(EVICT_LOCK, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        now = time.time()
+        objects, total, removed = [], 0, 0
+        for item in os.scandir(OBJECTS_DIR):
+            try:
+                st = item.stat()
+                if item.name.startswith("tmp-"):
+                    if st.st_mtime < now - STALE_TMP_SECONDS:
+                        os.remove(item.path)
+                    continue
+            except FileNotFoundError:
+                continue
+            objects.append((st.st_mtime, st.st_size, item.path))
+            total += st.st_size
+        objects.sort()
+        for _, size, path in objects:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            removed += size
+    if removed:
+        logger.info(f"[INPUT_CACHE] Evicted {removed} bytes, {total} bytes cached")
+    return removed
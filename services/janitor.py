@@ -0,0 +1,251 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import re
+import json
+import gzip
+import time
+import fcntl
+import shutil
+import threading
+import logging
+from datetime import datetime, timezone
+from config import (
+    LOCAL_STORAGE_PATH, JANITOR_ENABLED, JANITOR_INTERVAL,
+    JOB_RECORD_TTL, JOB_ARCHIVE_TTL, SCRATCH_TTL
+)
+from services.job_control import running_job_ids, registered_job_files
+from services.job_status_store import get_job_status_store
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(LOCAL_STORAGE_PATH, 'jobs')
+ARCHIVE_DIR = os.path.join(JOBS_DIR, 'archive')
+LOCK_FILE = os.path.join(LOCAL_STORAGE_PATH, 'janitor.lock')
+REPORT_FILE = os.path.join(LOCAL_STORAGE_PATH, 'janitor_report.json')
+
+# Scratch files and directories are named after a job id or a downloaded file
+# id (uuid4), e.g. "<job_id>_split_1.mp4", "<job_id>_input/", "shared_<uuid>/"
+SCRATCH_NAME = re.compile(r"^(?:shared_)?([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})")
+# Leftovers in the jobs directory: cancel markers, progress of dead jobs,
+# interrupted writes and scratch manifests of finished jobs
+JOBS_DIR_SCRATCH = (".cancel", ".progress", ".tmp", ".files")
+SHARED_TMP = "/tmp"
+
+BATCH_SIZE = 500
+
+def _usage(path):
+    """(bytes, newest mtime) of a file or directory tree."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        st = os.lstat(path)
+        return st.st_size, st.st_mtime
+    size, newest = 0, os.lstat(path).st_mtime
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            size += st.st_size
+            newest = max(newest, st.st_mtime)
+    return size, newest
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+def archive_job_records(now, report):
+    """Move records older than JOB_RECORD_TTL into gzipped daily JSON Lines archives."""
+    if not JOB_RECORD_TTL:
+        return
+    store = get_job_status_store()
+    before = now - JOB_RECORD_TTL
+    seen = set()
+    while True:
+        batch = [item for item in store.expired(before, BATCH_SIZE) if item[0] not in seen]
+        if not batch:
+            break
+        by_day = {}
+        for job_id, updated_at, record in batch:
+            seen.add(job_id)
+            day = datetime.fromtimestamp(updated_at, timezone.utc).strftime("%Y-%m-%d")
+            by_day.setdefault(day, []).append(json.dumps({"job_id": job_id, "updated_at": updated_at, "record": record}))
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        for day, lines in by_day.items():
+            # Appending adds a gzip member; gzip readers see one continuous stream
+            with gzip.open(os.path.join(ARCHIVE_DIR, f"{day}.jsonl.gz"), "at") as f:
+                f.write("\n".join(lines) + "\n")
+        report["records_bytes"] += store.delete([item[0] for item in batch])
+        report["records_archived"] += len(batch)
+        if len(batch) < BATCH_SIZE:
+            break
+
+def remove_old_archives(now, report):
+    if not JOB_ARCHIVE_TTL or not os.path.isdir(ARCHIVE_DIR):
+        return
+    for entry in os.scandir(ARCHIVE_DIR):
+        st = entry.stat()
+        if entry.name.endswith(".jsonl.gz") and st.st_mtime < now - JOB_ARCHIVE_TTL:
+            os.remove(entry.path)
+            report["archives_removed"] += 1
+            report["archive_bytes"] += st.st_size
+
+def _running_job_ids(store):
+    """Jobs running in any worker of the node, as the status store sees them."""
+    job_ids = set(running_job_ids())
+    cursor = None
+    while True:
+        jobs, cursor = store.query(status=["running"], limit=BATCH_SIZE, cursor=cursor)
+        job_ids.update(job["job_id"] for job in jobs)
+        if not cursor:
+            return job_ids
+
+def remove_scratch(now, report):
+    """
+    Remove job scratch entries untouched for SCRATCH_TTL.
+
+    Nothing of a job running in any worker is removed: neither entries named
+    after it nor the paths it registered with track_job_file. In
+    LOCAL_STORAGE_PATH every job-named entry is scratch; /tmp is shared with
+    other programs, so there only paths registered by a finished job and
+    entries named after a job the status store knows are.
+    """
+    if not SCRATCH_TTL:
+        return
+    cutoff = now - SCRATCH_TTL
+    store = get_job_status_store()
+    active = _running_job_ids(store)
+    manifests = registered_job_files()
+    protected, left_behind = set(), set()
+    for job_id, paths in manifests.items():
+        (protected if job_id in active else left_behind).update(paths)
+
+    storage = os.path.abspath(LOCAL_STORAGE_PATH)
+    candidates = set(left_behind)
+    if os.path.isdir(storage):
+        candidates.update(entry.path for entry in os.scandir(storage) if SCRATCH_NAME.match(entry.name))
+    if storage != SHARED_TMP and os.path.isdir(SHARED_TMP):
+        for entry in os.scandir(SHARED_TMP):
+            match = SCRATCH_NAME.match(entry.name)
+            if match and store.get(match.group(1)) is not None:
+                candidates.add(entry.path)
+    if os.path.isdir(JOBS_DIR):
+        for entry in os.scandir(JOBS_DIR):
+            if not entry.name.endswith(JOBS_DIR_SCRATCH):
+                continue
+            # A manifest goes last, once every path it lists is gone
+            if entry.name.endswith(".files") and any(os.path.lexists(p) for p in manifests.get(entry.name[:-len(".files")], ())):
+                continue
+            candidates.add(entry.path)
+
+    for path in candidates:
+        name = os.path.basename(path)
+        if any(job_id in name for job_id in active):
+            continue
+        if path in protected or any(p.startswith(path + os.sep) for p in protected):
+            continue
+        try:
+            size, newest = _usage(path)
+            if newest >= cutoff:
+                continue
+            _remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.warning(f"[JANITOR] Could not remove {path}: {str(e)}")
+            continue
+        report["scratch_removed"] += 1
+        report["scratch_bytes"] += size
+
+def get_janitor_report():
+    """Last and cumulative janitor results of this node."""
+    try:
+        with open(REPORT_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def run_janitor(force=False):
+    """
+    Run one janitor pass unless another worker of the node is running one
+    or (without force) one finished less than JANITOR_INTERVAL ago.
+
+    Returns:
+        dict: The report of this pass, or None when it was skipped
+    """
+    os.makedirs(LOCAL_STORAGE_PATH, exist_ok=True)
+    with open(LOCK_FILE, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        previous = get_janitor_report()
+        now = time.time()
+        last = previous.get("last_run") or {}
+        if not force and now - last.get("finished_at", 0) < JANITOR_INTERVAL:
+            return None
+
+        report = {
+            "started_at": now,
+            "records_archived": 0, "records_bytes": 0,
+            "archives_removed": 0, "archive_bytes": 0,
+            "scratch_removed": 0, "scratch_bytes": 0
+        }
+        for step in (archive_job_records, remove_old_archives, remove_scratch):
+            try:
+                step(now, report)
+            except Exception as e:
+                logger.error(f"[JANITOR] {step.__name__} failed: {str(e)}")
+        report["bytes_reclaimed"] = report["records_bytes"] + report["archive_bytes"] + report["scratch_bytes"]
+        report["finished_at"] = time.time()
+
+        totals = previous.get("totals") or {}
+        for key in ("records_archived", "archives_removed", "scratch_removed", "bytes_reclaimed"):
+            totals[key] = totals.get(key, 0) + report[key]
+        tmp_file = f"{REPORT_FILE}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"last_run": report, "totals": totals}, f, indent=2)
+        os.replace(tmp_file, REPORT_FILE)
+
+    logger.info(
+        f"[JANITOR] Archived {report['records_archived']} job record(s), removed {report['scratch_removed']} "
+        f"scratch entrie(s) and {report['archives_removed']} archive(s), {report['bytes_reclaimed']} bytes reclaimed"
+    )
+    return report
+
+def _janitor_loop():
+    # Every worker wakes up; the lock and the last run time leave one pass per interval per node
+    while True:
+        time.sleep(min(JANITOR_INTERVAL, 300))
+        try:
+            run_janitor()
+        except Exception as e:
+            logger.error(f"[JANITOR] Error: {str(e)}")
+
+_janitor_started = False
+
+def start_janitor():
+    """Start the background janitor thread of this worker (JANITOR_ENABLED)."""
+    global _janitor_started
+    if _janitor_started or not JANITOR_ENABLED or JANITOR_INTERVAL <= 0:
+        return
+    _janitor_started = True
+    threading.Thread(target=_janitor_loop, name="janitor", daemon=True).start()
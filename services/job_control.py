@@ -0,0 +1,458 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import glob
+import time
+import shutil
+import signal
+import subprocess
+import threading
+import logging
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from config import LOCAL_STORAGE_PATH
+from services.job_progress import FFmpegProgress, is_ffmpeg_command, clear_progress
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled or ran out of time."""
+
+class JobControl:
+    """Cancellation state, deadline and child processes of one running job."""
+
+    def __init__(self, job_id, max_runtime=None, endpoint=None, cost=None):
+        self.job_id = job_id
+        self.endpoint = endpoint
+        self.cost = cost or {}
+        self.started_at = time.time()
+        self.deadline = self.started_at + max_runtime if max_runtime else None
+        self.cancelled = threading.Event()
+        self.reason = None
+        self.timed_out = False
+        self.processes = set()
+        self.files = set()
+        # stage name -> (seconds, count), see stage()
+        self.stages = {}
+        # Network transfers in progress, see transfer()
+        self.transfers = set()
+        # Snapshots taken by the slow-job watchdog (services.watchdog)
+        self.diagnostics = []
+        # Open scratch workspaces (services.workspace), checked against their quota
+        self.workspaces = set()
+        self.thread_id = threading.get_ident()
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        """Seconds left before the deadline, or None when there is none."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+class Transfer:
+    """Bytes moved so far by one download or upload of a job."""
+
+    def __init__(self, url, direction, total=None):
+        self.url = url
+        self.direction = direction
+        self.total = total
+        self.bytes = 0
+        self.started_at = self.last_activity = time.time()
+
+    def add(self, nbytes):
+        self.bytes += nbytes
+        self.last_activity = time.time()
+
+    def snapshot(self, now=None):
+        now = now or time.time()
+        # Query strings often carry signatures or tokens
+        parts = urlsplit(self.url)
+        return {
+            "url": parts._replace(query="", fragment="").geturl() if parts.scheme else self.url,
+            "direction": self.direction,
+            "bytes": self.bytes,
+            "total": self.total,
+            "seconds": round(now - self.started_at, 1),
+            "idle_seconds": round(now - self.last_activity, 1)
+        }
+
+SUBPROCESS_STAGES = {"ffmpeg": "encode", "ffprobe": "probe"}
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_current = threading.local()
+
+def cancel_marker_path(job_id):
+    """Marker file used to cancel a job running in another worker process."""
+    return os.path.join(LOCAL_STORAGE_PATH, 'jobs', f"{job_id}.cancel")
+
+def job_files_path(job_id):
+    """
+    Manifest of the scratch paths a job registered with track_job_file, one
+    per line. It outlives the job so the janitor of any worker can tell which
+    paths are in use and which ones this app left behind.
+    """
+    return os.path.join(LOCAL_STORAGE_PATH, 'jobs', f"{job_id}.files")
+
+def registered_job_files():
+    """{job_id: set of paths} of every job manifest on the node."""
+    jobs_dir = os.path.join(LOCAL_STORAGE_PATH, 'jobs')
+    manifests = {}
+    for path in glob.glob(os.path.join(jobs_dir, "*.files")):
+        try:
+            with open(path, 'r') as f:
+                manifests[os.path.basename(path)[:-len(".files")]] = {line.rstrip("\n") for line in f if line.strip()}
+        except OSError:
+            continue
+    return manifests
+
+def start_job(job_id, max_runtime=None, endpoint=None, cost=None):
+    """Register the job run by the calling thread."""
+    control = JobControl(job_id, max_runtime, endpoint, cost)
+    with _jobs_lock:
+        _jobs[job_id] = control
+    _current.job_id = job_id
+    return control
+
+def finish_job(job_id):
+    """Unregister a job and drop its cancel marker and progress."""
+    with _jobs_lock:
+        control = _jobs.pop(job_id, None)
+    if getattr(_current, "job_id", None) == job_id:
+        _current.job_id = None
+    try:
+        os.remove(cancel_marker_path(job_id))
+    except FileNotFoundError:
+        pass
+    clear_progress(job_id)
+    return control
+
+def bind_job(job_id):
+    """Attach a helper thread to an already running job."""
+    _current.job_id = job_id
+
+def current_job_id():
+    return getattr(_current, "job_id", None)
+
+def get_job_control(job_id=None):
+    job_id = job_id or current_job_id()
+    if not job_id:
+        return None
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def running_job_ids():
+    with _jobs_lock:
+        return list(_jobs)
+
+def running_jobs():
+    with _jobs_lock:
+        return list(_jobs.values())
+
+def while_running(control, func):
+    """
+    Call func() only if the job of `control` has not finished in this
+    process. finish_job() waits for it, so func() can safely update the
+    record of a running job before the final one is written.
+    """
+    with _jobs_lock:
+        if _jobs.get(control.job_id) is not control:
+            return False
+        func()
+        return True
+
+def check_cancelled():
+    """Raise JobCancelled if the job of the calling thread was cancelled."""
+    control = get_job_control()
+    if control is not None and control.cancelled.is_set():
+        raise JobCancelled(control.reason or "Job cancelled")
+
+def track_job_file(path):
+    """
+    Remember a scratch file so it can be removed if the job is cancelled,
+    and list it in the job manifest so no janitor removes it while the job runs.
+    """
+    control = get_job_control()
+    if control is not None:
+        with control.lock:
+            if path in control.files:
+                return
+            control.files.add(path)
+            manifest = job_files_path(control.job_id)
+            try:
+                os.makedirs(os.path.dirname(manifest), exist_ok=True)
+                with open(manifest, 'a') as f:
+                    f.write(os.path.abspath(path) + "\n")
+            except OSError as e:
+                logger.warning(f"Job {control.job_id}: Could not register scratch path {path}: {str(e)}")
+
+def record_stage(control, name, seconds):
+    with control.lock:
+        total, count = control.stages.get(name, (0.0, 0))
+        control.stages[name] = (total + seconds, count + 1)
+
+@contextmanager
+def stage(name):
+    """
+    Time a stage of the current job (download, probe, encode, transcribe,
+    upload, webhook...). Repeated and concurrent stages add up.
+    """
+    control = get_job_control()
+    started = time.time()
+    try:
+        yield
+    finally:
+        if control is not None:
+            record_stage(control, name, time.time() - started)
+
+@contextmanager
+def transfer(url, direction="download", total=None):
+    """Register a network transfer of the current job; call add(nbytes) on the yielded Transfer."""
+    control = get_job_control()
+    item = Transfer(url, direction, total)
+    if control is not None:
+        with control.lock:
+            control.transfers.add(item)
+    try:
+        yield item
+    finally:
+        if control is not None:
+            with control.lock:
+                control.transfers.discard(item)
+
+def stage_timings(control):
+    """{stage: {"seconds": total, "count": runs}} of a job."""
+    if control is None:
+        return {}
+    with control.lock:
+        return {name: {"seconds": round(total, 3), "count": count} for name, (total, count) in control.stages.items()}
+
+def _kill_process_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    except Exception as e:
+        logger.warning(f"Could not kill process group {process.pid}: {str(e)}")
+
+def cancel_job(job_id, reason="Job cancelled by request", timed_out=False):
+    """
+    Cancel a job running in this process.
+
+    Kills the whole process group of every FFmpeg/ffprobe child the job
+    started and flags the job so cooperative checks raise JobCancelled.
+
+    Returns:
+        bool: True if the job was running in this process
+    """
+    control = get_job_control(job_id)
+    if control is None:
+        return False
+    with control.lock:
+        if not control.cancelled.is_set():
+            control.reason = reason
+            control.timed_out = timed_out
+            control.cancelled.set()
+        processes = list(control.processes)
+    logger.warning(f"Job {job_id}: [CANCEL] {reason} | Killing {len(processes)} child process group(s)")
+    for process in processes:
+        _kill_process_group(process)
+    return True
+
+def request_cancel(job_id):
+    """Ask whichever worker process runs the job to cancel it."""
+    marker = cancel_marker_path(job_id)
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    with open(marker, 'w') as f:
+        f.write(str(time.time()))
+    return cancel_job(job_id)
+
+def is_cancel_requested(job_id):
+    return os.path.exists(cancel_marker_path(job_id))
+
+def cleanup_job_files(job_id, control=None):
+    """
+    Remove the scratch files of a job.
+
+    Deletes the files tracked for the job plus everything named after its
+    job_id in LOCAL_STORAGE_PATH and /tmp.
+
+    Returns:
+        int: Number of bytes freed
+    """
+    paths = set(control.files) if control is not None else set()
+    for base in {LOCAL_STORAGE_PATH, "/tmp"}:
+        paths.update(glob.glob(os.path.join(base, f"{job_id}*")))
+    freed = 0
+    for path in paths:
+        try:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    freed += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                freed += os.path.getsize(path)
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Job {job_id}: Could not remove scratch path {path}: {str(e)}")
+    if freed:
+        logger.info(f"Job {job_id}: [CLEANUP] Freed {freed} bytes of scratch files")
+    return freed
+
+def _probe_input_duration(job_id, path):
+    """Duration of a local FFmpeg input, for the progress reader thread of the job."""
+    if not os.path.isfile(path):
+        return None
+    bind_job(job_id)
+    try:
+        cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', path]
+        return float(run_subprocess(cmd, timeout=10, capture_output=True, text=True).stdout.strip())
+    except (JobCancelled, subprocess.SubprocessError, OSError, ValueError):
+        return None
+    finally:
+        bind_job(None)
+
+def run_subprocess(cmd, timeout=None, check=False, **kwargs):
+    """
+    Drop-in replacement for subprocess.run for FFmpeg/ffprobe calls.
+
+    The child runs in its own process group and is registered with the job of
+    the calling thread, so cancelling the job or reaching its max runtime
+    kills the child and everything it spawned. The effective timeout is the
+    smaller of `timeout` and the time left before the job deadline. FFmpeg
+    commands run by a job also publish their progress.
+
+    Raises:
+        JobCancelled: If the job was cancelled or timed out while running
+        subprocess.TimeoutExpired: If `timeout` expired
+        subprocess.CalledProcessError: If check=True and the command failed
+    """
+    check_cancelled()
+    control = get_job_control()
+    if kwargs.pop("capture_output", False):
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+    input_data = kwargs.pop("input", None)
+    if input_data is not None:
+        kwargs["stdin"] = subprocess.PIPE
+
+    # FFmpeg runs of a job report their progress (see services.job_progress)
+    progress = None
+    if control is not None and is_ffmpeg_command(cmd):
+        progress = FFmpegProgress(control.job_id, cmd, probe=lambda path: _probe_input_duration(control.job_id, path))
+    if progress is not None:
+        cmd = progress.cmd
+        kwargs["pass_fds"] = tuple(kwargs.get("pass_fds", ())) + (progress.write_fd,)
+
+    # FFmpeg runs count as "encode" and ffprobe runs as "probe" in stage timings
+    stage_name = SUBPROCESS_STAGES.get(os.path.basename(str(cmd[0])), "subprocess")
+    started = time.time()
+    try:
+        process = subprocess.Popen(cmd, start_new_session=True, **kwargs)
+    except BaseException:
+        if progress is not None:
+            progress.close()
+        raise
+    if progress is not None:
+        progress.started()
+    if control is not None:
+        with control.lock:
+            control.processes.add(process)
+    try:
+        limits = [t for t in (timeout, control.remaining() if control else None) if t is not None]
+        try:
+            stdout, stderr = process.communicate(input=input_data, timeout=min(limits) if limits else None)
+        except subprocess.TimeoutExpired:
+            _kill_process_group(process)
+            stdout, stderr = process.communicate()
+            if control is not None and (control.remaining() == 0 or control.cancelled.is_set()):
+                cancel_job(control.job_id, f"Max runtime exceeded while running {cmd[0]}", timed_out=True)
+                raise JobCancelled(control.reason)
+            raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+        except BaseException:
+            _kill_process_group(process)
+            process.wait()
+            raise
+    finally:
+        if control is not None:
+            with control.lock:
+                control.processes.discard(process)
+        if progress is not None:
+            progress.close()
+        if control is not None:
+            record_stage(control, stage_name, time.time() - started)
+
+    if control is not None and control.cancelled.is_set():
+        raise JobCancelled(control.reason or "Job cancelled")
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+def run_ffmpeg(stream, capture_stdout=False, capture_stderr=False, overwrite_output=False):
+    """
+    Drop-in replacement for ffmpeg-python's stream.run() through run_subprocess.
+
+    Raises:
+        ffmpeg.Error: If FFmpeg exits with an error
+    """
+    import ffmpeg
+    cmd = ffmpeg.compile(stream, overwrite_output=overwrite_output)
+    result = run_subprocess(
+        cmd,
+        stdout=subprocess.PIPE if capture_stdout else None,
+        stderr=subprocess.PIPE if capture_stderr else None
+    )
+    if result.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', result.stdout, result.stderr)
+    return result.stdout, result.stderr
+
+def _monitor_loop(interval):
+    while True:
+        time.sleep(interval)
+        now = time.time()
+        with _jobs_lock:
+            controls = list(_jobs.values())
+        for control in controls:
+            if control.cancelled.is_set():
+                continue
+            try:
+                if control.deadline is not None and now >= control.deadline:
+                    cancel_job(control.job_id, f"Max runtime of {int(control.deadline - control.started_at)}s exceeded", timed_out=True)
+                elif is_cancel_requested(control.job_id):
+                    cancel_job(control.job_id)
+                else:
+                    with control.lock:
+                        workspaces = list(control.workspaces)
+                    for workspace in workspaces:
+                        reason = workspace.over_quota(now)
+                        if reason:
+                            cancel_job(control.job_id, reason)
+                            break
+            except Exception as e:
+                logger.error(f"Job {control.job_id}: [CANCEL] Monitor error: {str(e)}")
+
+_monitor_started = False
+
+def start_monitor(interval=1.0):
+    """Start the thread that enforces deadlines, cross-process cancels and workspace quotas."""
+    global _monitor_started
+    if _monitor_started:
+        return
+    _monitor_started = True
+    threading.Thread(target=_monitor_loop, args=(interval,), name="job-control-monitor", daemon=True).start()
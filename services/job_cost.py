@@ -0,0 +1,306 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import shutil
+import subprocess
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import LOCAL_STORAGE_PATH, NODE_MIN_FREE_RAM_MB, NODE_MIN_FREE_DISK_MB, COST_PROBE_TIMEOUT, DEFAULT_RESOURCE_CLASS
+from services.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+# Cost profile per resource class. cpu_per_second is the CPU-seconds spent per
+# second of 1080p input media; ram_mb_per_mpx scales memory with the frame
+# size; disk_factor is the scratch space needed as a multiple of input size.
+COST_PROFILES = {
+    "io-light": {"cpu_base": 1, "cpu_per_second": 0.0, "ram_mb": 128, "ram_mb_per_mpx": 0, "disk_factor": 1.0},
+    "browser": {"cpu_base": 5, "cpu_per_second": 0.0, "ram_mb": 600, "ram_mb_per_mpx": 0, "disk_factor": 0.0},
+    "ffmpeg-encode": {"cpu_base": 2, "cpu_per_second": 2.0, "ram_mb": 300, "ram_mb_per_mpx": 150, "disk_factor": 3.0},
+    "whisper": {"cpu_base": 10, "cpu_per_second": 1.5, "ram_mb": 1500, "ram_mb_per_mpx": 0, "disk_factor": 2.0},
+}
+
+# Endpoints whose cost differs a lot from their resource class
+ENDPOINT_COST_PROFILES = {
+    "/v1/video/caption": {"cpu_base": 10, "cpu_per_second": 3.5, "ram_mb": 1800, "ram_mb_per_mpx": 150, "disk_factor": 3.0},
+    "/v1/video/thumbnail": {"cpu_base": 1, "cpu_per_second": 0.0, "ram_mb": 200, "ram_mb_per_mpx": 50, "disk_factor": 0.0},
+    "/v1/media/metadata": {"cpu_base": 1, "cpu_per_second": 0.0, "ram_mb": 100, "ram_mb_per_mpx": 0, "disk_factor": 0.0},
+    "/v1/media/silence": {"cpu_base": 1, "cpu_per_second": 0.2, "ram_mb": 200, "ram_mb_per_mpx": 0, "disk_factor": 1.0},
+    "/v1/media/convert/mp3": {"cpu_base": 1, "cpu_per_second": 0.3, "ram_mb": 200, "ram_mb_per_mpx": 0, "disk_factor": 1.5},
+}
+
+# Fallbacks used when the input cannot be probed
+DEFAULT_MEDIA_DURATION = 300.0
+DEFAULT_MEGAPIXELS = 1920 * 1080 / 1e6
+DEFAULT_INPUT_MB = 100.0
+
+# Endpoint whose payload lists sub-jobs, each costed with its own profile
+BATCH_ENDPOINT = "/v1/batch"
+
+# Payload keys that hold input media URLs
+MEDIA_URL_KEYS = ("video_url", "media_url", "file_url", "audio_url", "image_url")
+
+_probe_cache = OrderedDict()
+_probe_cache_lock = threading.Lock()
+_PROBE_CACHE_SIZE = 256
+_PROBE_WORKERS = 8
+
+def find_media_urls(data):
+    """Collect input media URLs from a request payload, including nested lists."""
+    urls = []
+
+    def visit(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key in MEDIA_URL_KEYS and isinstance(item, str) and item.startswith(("http://", "https://")):
+                    urls.append(item)
+                elif isinstance(item, (dict, list)):
+                    visit(item)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item)
+
+    visit(data or {})
+    return urls
+
+def probe_media(url, need_stream_info=True):
+    """
+    Cheaply inspect a remote input.
+
+    Uses the Content-Length of a HEAD request and, when stream info is needed,
+    an ffprobe of the URL (which only reads the container header).
+
+    Returns:
+        dict: size_mb, duration and megapixels, each None when unknown
+    """
+    with _probe_cache_lock:
+        cached = _probe_cache.get(url)
+        if cached is not None and (cached["duration"] is not None or not need_stream_info):
+            _probe_cache.move_to_end(url)
+            return cached
+
+    info = {"size_mb": None, "duration": None, "megapixels": None}
+    try:
+        head = get_session().head(url, allow_redirects=True, timeout=COST_PROBE_TIMEOUT)
+        length = head.headers.get("content-length")
+        if length and length.isdigit():
+            info["size_mb"] = int(length) / (1024 * 1024)
+    except Exception as e:
+        logger.debug(f"Cost probe HEAD failed for {url}: {str(e)}")
+
+    if need_stream_info:
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-rw_timeout", str(int(COST_PROBE_TIMEOUT * 1e6)),
+            "-show_entries", "format=duration,size:stream=width,height",
+            "-of", "json", url
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=COST_PROBE_TIMEOUT + 5)
+            probe = json.loads(result.stdout or "{}")
+            fmt = probe.get("format", {})
+            if fmt.get("duration") not in (None, "N/A"):
+                info["duration"] = float(fmt["duration"])
+            if info["size_mb"] is None and fmt.get("size") not in (None, "N/A"):
+                info["size_mb"] = int(fmt["size"]) / (1024 * 1024)
+            pixels = [
+                s.get("width", 0) * s.get("height", 0)
+                for s in probe.get("streams", []) if s.get("width") and s.get("height")
+            ]
+            if pixels:
+                info["megapixels"] = max(pixels) / 1e6
+        except Exception as e:
+            logger.debug(f"Cost probe ffprobe failed for {url}: {str(e)}")
+
+    with _probe_cache_lock:
+        _probe_cache[url] = info
+        _probe_cache.move_to_end(url)
+        while len(_probe_cache) > _PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    return info
+
+def probe_inputs(urls, need_stream_info=True, budget=None):
+    """
+    Probe several inputs concurrently within one overall time budget.
+
+    Probes still running when the budget (COST_PROBE_TIMEOUT by default) is
+    spent are left to finish in the background, where they only fill the
+    probe cache; their inputs are reported as unknown.
+
+    Returns:
+        list: probe_media results, in the order of `urls`
+    """
+    unknown = {"size_mb": None, "duration": None, "megapixels": None}
+    if not urls:
+        return []
+    budget = COST_PROBE_TIMEOUT if budget is None else budget
+    pool = ThreadPoolExecutor(max_workers=min(_PROBE_WORKERS, len(urls)), thread_name_prefix="cost-probe")
+    try:
+        futures = {url: pool.submit(probe_media, url, need_stream_info) for url in dict.fromkeys(urls)}
+        done, pending = wait(futures.values(), timeout=budget)
+        if pending:
+            logger.info(f"Cost probe budget of {budget}s spent, {len(pending)} input(s) estimated from defaults")
+    finally:
+        pool.shutdown(wait=False)
+    results = []
+    for url in urls:
+        future = futures[url]
+        results.append(future.result() if future in done and future.exception() is None else unknown)
+    return results
+
+def _cost_profile(endpoint, resource_class):
+    return ENDPOINT_COST_PROFILES.get(endpoint) or COST_PROFILES.get(resource_class) or COST_PROFILES["ffmpeg-encode"]
+
+def _needs_stream_info(profile):
+    return profile["cpu_per_second"] > 0 or profile["ram_mb_per_mpx"] > 0
+
+def _cost_from_probes(profile, infos):
+    duration = 0.0
+    size_mb = 0.0
+    megapixels = 0.0
+    probed = False
+    for info in infos:
+        probed = probed or any(v is not None for v in info.values())
+        duration += info["duration"] if info["duration"] is not None else DEFAULT_MEDIA_DURATION
+        size_mb += info["size_mb"] if info["size_mb"] is not None else DEFAULT_INPUT_MB
+        megapixels = max(megapixels, info["megapixels"] if info["megapixels"] is not None else DEFAULT_MEGAPIXELS)
+    if not infos:
+        megapixels = DEFAULT_MEGAPIXELS
+
+    # Encoding cost grows with the frame size; audio-only inputs count as a small frame
+    resolution_factor = max(0.25, megapixels / DEFAULT_MEGAPIXELS) if megapixels else 0.25
+    cpu_seconds = profile["cpu_base"] + profile["cpu_per_second"] * duration * resolution_factor
+    ram_mb = profile["ram_mb"] + profile["ram_mb_per_mpx"] * megapixels
+    disk_mb = profile["disk_factor"] * size_mb
+
+    return {
+        "cpu_seconds": round(cpu_seconds, 1),
+        "ram_mb": round(ram_mb),
+        "disk_mb": round(disk_mb),
+        "input_duration": round(duration, 3),
+        "input_mb": round(size_mb, 1),
+        "megapixels": round(megapixels, 2),
+        "probed": probed
+    }
+
+def _sub_job_lane(endpoint, default):
+    """Lane of a batch sub-job's endpoint; needs the Flask app context."""
+    try:
+        from app_utils import resolve_job_options
+        options = resolve_job_options(endpoint)
+    except Exception:
+        return default
+    return (options or {}).get("resource_class") or DEFAULT_RESOURCE_CLASS
+
+def estimate_batch_cost(data, resource_class, probe=True, budget=None):
+    """
+    Estimate a batch as the sum of its sub-jobs, each costed with the
+    profile of its own endpoint and lane. The inputs of all sub-jobs are
+    probed together under one budget.
+    """
+    sub_jobs = []
+    for job in (data or {}).get("jobs") or []:
+        endpoint = job.get("endpoint")
+        profile = _cost_profile(endpoint, _sub_job_lane(endpoint, resource_class))
+        sub_jobs.append((profile, find_media_urls(job.get("payload") or {})))
+
+    unknown = {"size_mb": None, "duration": None, "megapixels": None}
+    infos = {}
+    urls = list(dict.fromkeys(url for _, job_urls in sub_jobs for url in job_urls))
+    if probe and urls:
+        need_stream_info = any(_needs_stream_info(profile) for profile, _ in sub_jobs)
+        infos = dict(zip(urls, probe_inputs(urls, need_stream_info, budget)))
+
+    total = {"cpu_seconds": 0, "ram_mb": 0, "disk_mb": 0, "input_duration": 0, "input_mb": 0, "megapixels": 0, "probed": False}
+    for profile, job_urls in sub_jobs:
+        cost = _cost_from_probes(profile, [infos.get(url, unknown) for url in job_urls])
+        for key in ("cpu_seconds", "ram_mb", "disk_mb", "input_duration", "input_mb"):
+            total[key] += cost[key]
+        total["megapixels"] = max(total["megapixels"], cost["megapixels"])
+        total["probed"] = total["probed"] or cost["probed"]
+    total["cpu_seconds"] = round(total["cpu_seconds"], 1)
+    total["input_duration"] = round(total["input_duration"], 3)
+    total["input_mb"] = round(total["input_mb"], 1)
+    return total
+
+def estimate_job_cost(endpoint, resource_class, data, probe=True, budget=None):
+    """
+    Estimate the resources a job will use before it is queued.
+
+    Args:
+        endpoint (str): Request path of the job
+        resource_class (str): Lane the job runs in
+        data (dict): Request payload
+        probe (bool): Inspect the inputs (HEAD + ffprobe); when False the
+            profile defaults are used
+        budget (float, optional): Seconds all probes together may take
+            (COST_PROBE_TIMEOUT by default); inputs not probed in time get
+            the profile defaults
+
+    Returns:
+        dict: cpu_seconds, ram_mb, disk_mb and the signals used
+    """
+    if endpoint == BATCH_ENDPOINT:
+        return estimate_batch_cost(data, resource_class, probe, budget)
+    profile = _cost_profile(endpoint, resource_class)
+    urls = find_media_urls(data)
+    if probe:
+        infos = probe_inputs(urls, _needs_stream_info(profile), budget)
+    else:
+        infos = [{"size_mb": None, "duration": None, "megapixels": None} for _ in urls]
+    return _cost_from_probes(profile, infos)
+
+def backlog_wait_seconds(cpu_seconds):
+    """Wall-clock seconds needed to burn a CPU-seconds backlog on this node."""
+    return cpu_seconds / max(1, os.cpu_count() or 1)
+
+def node_headroom():
+    """Free RAM and scratch disk (MB) above the configured safety margins."""
+    import psutil
+    available_ram = psutil.virtual_memory().available / (1024 * 1024)
+    free_disk = shutil.disk_usage(LOCAL_STORAGE_PATH).free / (1024 * 1024)
+    return {
+        "ram_mb": available_ram - NODE_MIN_FREE_RAM_MB,
+        "disk_mb": free_disk - NODE_MIN_FREE_DISK_MB
+    }
+
+def has_headroom(cost, reserved=None):
+    """
+    Check whether the node can start a job now.
+
+    Args:
+        cost (dict): Estimate returned by estimate_job_cost
+        reserved (dict, optional): RAM/disk (MB) already promised to jobs that
+            started recently and may not have allocated it yet
+    """
+    if not cost:
+        return True
+    reserved = reserved or {}
+    try:
+        headroom = node_headroom()
+    except Exception as e:
+        logger.warning(f"Could not read node resources: {str(e)}")
+        return True
+    return (
+        cost.get("ram_mb", 0) <= headroom["ram_mb"] - reserved.get("ram_mb", 0)
+        and cost.get("disk_mb", 0) <= headroom["disk_mb"] - reserved.get("disk_mb", 0)
+    )
@@ -0,0 +1,183 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import time
+import heapq
+import threading
+import logging
+from statistics import median
+from config import ETA_HISTORY_SECONDS
+from services.job_progress import read_progress
+from services.job_status_store import get_job_status_store
+
+logger = logging.getLogger(__name__)
+
+# Endpoint models are rebuilt from the status store at most this often
+MODEL_REFRESH_SECONDS = 300
+MODEL_SAMPLES = 500
+
+_models = {}
+_models_lock = threading.Lock()
+
+def _build_model(endpoint):
+    jobs, _ = get_job_status_store().query(
+        status=["done"], endpoint=endpoint, updated_after=time.time() - ETA_HISTORY_SECONDS,
+        limit=MODEL_SAMPLES, include_record=True
+    )
+    run_times, ratios = [], []
+    for job in jobs:
+        response = job["record"].get("response")
+        if not isinstance(response, dict) or response.get("code") != 200 or response.get("cached") \
+                or response.get("run_time") is None:
+            continue
+        run_times.append(response["run_time"])
+        cpu_seconds = (response.get("estimated_cost") or {}).get("cpu_seconds")
+        if cpu_seconds:
+            ratios.append(response["run_time"] / cpu_seconds)
+    return {
+        "samples": len(run_times),
+        "run_time_p50": median(run_times) if run_times else None,
+        "seconds_per_cpu": median(ratios) if ratios else None
+    }
+
+def endpoint_model(endpoint):
+    """
+    Run time model of an endpoint learned from its recent successful jobs:
+    median wall-clock seconds per estimated CPU-second (see
+    services.job_cost) and median run time.
+    """
+    now = time.time()
+    with _models_lock:
+        cached = _models.get(endpoint)
+    if cached and now - cached[0] < MODEL_REFRESH_SECONDS:
+        return cached[1]
+    try:
+        model = _build_model(endpoint)
+    except Exception as e:
+        logger.warning(f"Could not build ETA model for {endpoint}: {str(e)}")
+        model = cached[1] if cached else {"samples": 0, "run_time_p50": None, "seconds_per_cpu": None}
+    with _models_lock:
+        _models[endpoint] = (now, model)
+    return model
+
+def estimate_run_seconds(endpoint, cpu_seconds):
+    """
+    Expected run time of a job.
+
+    Returns:
+        tuple: (seconds, basis) where basis is "history" when the endpoint has
+        finished jobs to learn from and "cost-model" when only the CPU-seconds
+        estimate is known (taken as one busy core)
+    """
+    model = endpoint_model(endpoint) if endpoint else None
+    if model and model["seconds_per_cpu"] and cpu_seconds:
+        return model["seconds_per_cpu"] * cpu_seconds, "history"
+    if model and model["run_time_p50"] is not None:
+        return model["run_time_p50"], "history"
+    return float(cpu_seconds or 0), "cost-model"
+
+def queue_estimate(snapshot, job_id=None, endpoint=None, cpu_seconds=0, now=None):
+    """
+    Queue position and estimated start/finish of a job of a lane.
+
+    Replays the lane in run order: each pending job takes the job slot that
+    frees up first, running jobs hold their slot for the rest of their
+    estimated run time.
+
+    Args:
+        snapshot (dict): JobExecutor.lane_snapshot() of the lane
+        job_id (str, optional): Pending job to estimate. When None, a new job
+            of `endpoint` costing `cpu_seconds` is appended to the lane
+
+    Returns:
+        dict: The estimate, or None when job_id is not pending in the lane
+    """
+    now = now or time.time()
+    free_at = []
+    for entry in snapshot["running"]:
+        run_seconds, _ = estimate_run_seconds(entry["endpoint"], entry["cost_cpu"])
+        elapsed = now - (entry["started_at"] or now)
+        free_at.append(now + max(0.0, run_seconds - elapsed))
+    free_at += [now] * max(0, snapshot["slots"] - len(free_at))
+    heapq.heapify(free_at)
+
+    pending = snapshot["pending"]
+    if job_id is None:
+        pending = pending + [{"job_id": None, "endpoint": endpoint, "cost_cpu": cpu_seconds}]
+    for position, entry in enumerate(pending, 1):
+        run_seconds, basis = estimate_run_seconds(entry["endpoint"], entry["cost_cpu"])
+        start = heapq.heappop(free_at)
+        heapq.heappush(free_at, start + run_seconds)
+        if entry["job_id"] == job_id:
+            return {
+                "lane": snapshot["lane"],
+                "queue_position": position,
+                "jobs_ahead": position - 1,
+                "jobs_running": len(snapshot["running"]),
+                "estimated_run_seconds": round(run_seconds, 1),
+                "estimated_wait_seconds": round(start - now, 1),
+                "estimated_start": round(start, 3),
+                "estimated_finish": round(start + run_seconds, 3),
+                "basis": basis
+            }
+    return None
+
+def running_estimate(endpoint, cpu_seconds, started_at, progress=None, now=None):
+    """Estimated finish of a running job, never earlier than the ETA of its current FFmpeg step."""
+    now = now or time.time()
+    run_seconds, basis = estimate_run_seconds(endpoint, cpu_seconds)
+    finish = started_at + run_seconds
+    if progress and progress.get("state") != "end" and progress.get("eta_seconds") is not None:
+        finish = max(finish, now + progress["eta_seconds"])
+    finish = max(finish, now)
+    return {
+        "estimated_run_seconds": round(run_seconds, 1),
+        "estimated_remaining_seconds": round(finish - now, 1),
+        "estimated_start": round(started_at, 3),
+        "estimated_finish": round(finish, 3),
+        "basis": basis
+    }
+
+def estimate_new_job(executor, lane, endpoint, cost):
+    """Estimate of a job about to be queued in `lane`, or None if it cannot be computed."""
+    try:
+        return queue_estimate(executor.lane_snapshot(lane), endpoint=endpoint, cpu_seconds=(cost or {}).get("cpu_seconds", 0))
+    except Exception as e:
+        logger.warning(f"Could not estimate queue wait for {endpoint}: {str(e)}")
+        return None
+
+def job_eta(executor, job_id, record):
+    """
+    Live estimate of a queued or running job from its status record, or
+    None for finished jobs.
+
+    A job queued in the memory queue of another worker process is not
+    visible here; it keeps the estimate made when it was accepted.
+    """
+    status = record.get("job_status")
+    cpu_seconds = (record.get("estimated_cost") or {}).get("cpu_seconds", 0)
+    try:
+        if status == "queued":
+            estimate = queue_estimate(executor.lane_snapshot(record.get("resource_class")), job_id)
+            return estimate or record.get("eta")
+        if status == "running" and record.get("started_at"):
+            return running_estimate(record.get("endpoint"), cpu_seconds, record["started_at"], read_progress(job_id))
+    except Exception as e:
+        logger.warning(f"Could not estimate ETA of job {job_id}: {str(e)}")
+        return record.get("eta")
+    return None
@@ -0,0 +1,308 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from services.job_queue import MemoryJobQueue
+
+logger = logging.getLogger(__name__)
+
+class JobExecutor:
+    """
+    Pool of worker threads that drains the job queue.
+
+    Jobs are routed to resource-class lanes. Every lane has its own FIFO, a
+    per-process concurrency cap and a priority: when a worker thread frees up
+    it takes the oldest job of the highest-priority lane that is below its
+    cap. Queued jobs are kept in a queue backend (see services.job_queue),
+    either in memory or in a SQLite database shared by all workers of the
+    node.
+
+    Each job is a dict with at least job_id, data, task_func and
+    queue_start_time, plus an optional resource_class. The handler receives
+    the job and is responsible for running task_func and reporting its result.
+
+    When an admit callable is given, a claimed job only starts if
+    admit(job, reserved) returns True, where reserved holds the RAM/disk
+    estimates of jobs this process started in the last reservation_window
+    seconds. Otherwise the job goes back to the queue until resources free
+    up; it always starts when nothing else is running here, so an oversized
+    job cannot starve.
+
+    processes is the number of worker processes of the node; with a shared
+    queue each of them runs up to the lane caps, which the queue estimates
+    in lane_snapshot take into account.
+    """
+
+    def __init__(self, handler, lanes, workers=1, default_lane=None, queue=None,
+                 poll_interval=1.0, on_abandoned=None, admit=None,
+                 reservation_window=30.0, name="job-worker", processes=1):
+        self.handler = handler
+        self.processes = max(1, int(processes))
+        self.admit = admit
+        self.reservation_window = reservation_window
+        self.workers = max(1, int(workers))
+        self.name = name
+        self.queue = queue if queue is not None else MemoryJobQueue()
+        self.poll_interval = poll_interval
+        self.on_abandoned = on_abandoned
+        self.lanes = {
+            lane_name: {
+                "concurrency": max(1, int(settings.get("concurrency", 1))),
+                "priority": int(settings.get("priority", 0)),
+                "max_runtime": int(settings.get("max_runtime", 0)),
+                "running": 0
+            }
+            for lane_name, settings in lanes.items()
+        }
+        self.default_lane = default_lane if default_lane in self.lanes else next(iter(self.lanes))
+        # Lane names ordered by priority, highest first
+        self._lane_order = sorted(self.lanes, key=lambda n: self.lanes[n]["priority"], reverse=True)
+        self._cond = threading.Condition()
+        self._active = {}
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        if self._threads:
+            return
+        self.queue.recover(self.on_abandoned)
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"{self.name}-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        if self.queue.shared:
+            threading.Thread(target=self._recovery_loop, name=f"{self.name}-recovery", daemon=True).start()
+        lanes = ", ".join(
+            f"{n}(cap={self.lanes[n]['concurrency']}, prio={self.lanes[n]['priority']})"
+            for n in self._lane_order
+        )
+        logger.info(f"PID {os.getpid()} Job executor started with {self.workers} worker(s) | "
+                    f"Queue: {type(self.queue).__name__} | Lanes: {lanes}")
+
+    def resolve_lane(self, resource_class):
+        """Return the lane name used for a resource class."""
+        if resource_class in self.lanes:
+            return resource_class
+        if resource_class:
+            logger.warning(f"Unknown resource class '{resource_class}', using '{self.default_lane}'")
+        return self.default_lane
+
+    def submit(self, job):
+        """Add a job to the queue of its resource-class lane."""
+        lane = self.resolve_lane(job.get("resource_class"))
+        job["resource_class"] = lane
+        self.queue.put(job, priority=self.lanes[lane]["priority"])
+        with self._cond:
+            self._cond.notify()
+
+    def cancel_queued(self, job_id):
+        """Remove a job that has not started yet. Returns the job or None."""
+        return self.queue.remove(job_id)
+
+    def max_runtime(self, lane):
+        """Max runtime (seconds) of a lane, or None when unlimited."""
+        return self.lanes[self.resolve_lane(lane)]["max_runtime"] or None
+
+    def qsize(self, lane=None):
+        """Number of jobs waiting to run, in one lane or in all of them."""
+        if lane is not None:
+            return self.queue.qsize(self.resolve_lane(lane))
+        return self.queue.qsize()
+
+    def active_count(self):
+        """Number of jobs currently running in this process."""
+        with self._cond:
+            return len(self._active)
+
+    def active_jobs(self):
+        """Snapshot of the jobs running in this process as {job_id: run_start_time}."""
+        with self._cond:
+            return {job_id: entry["started_at"] for job_id, entry in self._active.items()}
+
+    def stats(self):
+        """Per-lane queue length, running count, cap and priority."""
+        with self._cond:
+            running = {name: lane["running"] for name, lane in self.lanes.items()}
+        return {
+            lane_name: {
+                "queued": self.queue.qsize(lane_name),
+                "running": running[lane_name],
+                "concurrency": lane["concurrency"],
+                "priority": lane["priority"]
+            }
+            for lane_name, lane in self.lanes.items()
+        }
+
+    def lane_snapshot(self, lane):
+        """
+        Pending jobs of a lane in run order, the jobs running in it (with
+        started_at) and the number of job slots of the lane on this node.
+        """
+        lane = self.resolve_lane(lane)
+        pending, running = self.queue.lane_jobs(lane)
+        if self.queue.shared:
+            running = [dict(entry, started_at=entry.pop("claimed_at")) for entry in running]
+            slots = self.lanes[lane]["concurrency"] * self.processes
+        else:
+            with self._cond:
+                running = [
+                    {
+                        "job_id": job_id,
+                        "endpoint": entry["endpoint"],
+                        "cost_cpu": entry["cost"].get("cpu_seconds", 0),
+                        "started_at": entry["started_at"]
+                    }
+                    for job_id, entry in self._active.items() if entry["lane"] == lane
+                ]
+            slots = self.lanes[lane]["concurrency"]
+        return {"lane": lane, "pending": pending, "running": running, "slots": slots}
+
+    @contextmanager
+    def lane_slot(self, resource_class, check=None):
+        """
+        Hold a slot of a lane for work that runs outside the queue (the
+        sub-jobs of a batch), waiting like queued jobs do until the lane is
+        below its cap. check() is called while waiting and may raise to give up.
+        """
+        lane = self.resolve_lane(resource_class)
+        with self._cond:
+            while self.lanes[lane]["running"] >= self.lanes[lane]["concurrency"]:
+                if check is not None:
+                    check()
+                self._cond.wait(self.poll_interval)
+            self.lanes[lane]["running"] += 1
+        try:
+            yield lane
+        finally:
+            with self._cond:
+                self.lanes[lane]["running"] -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def lend_slot(self, job_id):
+        """
+        Free the lane slot of a running job while it only waits on work that
+        holds slots of its own (a batch waiting on its sub-jobs), so that
+        work cannot deadlock on the slot of its parent. The job keeps its
+        cost reservation and takes its slot back afterwards.
+        """
+        with self._cond:
+            entry = self._active.get(job_id)
+            if entry is not None:
+                self.lanes[entry["lane"]]["running"] -= 1
+                self._cond.notify_all()
+        try:
+            yield
+        finally:
+            if entry is not None:
+                with self._cond:
+                    self.lanes[entry["lane"]]["running"] += 1
+
+    def _take_next_job(self):
+        """Block until a job is runnable and claim a slot in its lane."""
+        with self._cond:
+            while True:
+                eligible = [
+                    name for name in self._lane_order
+                    if self.lanes[name]["running"] < self.lanes[name]["concurrency"]
+                ]
+                job = None
+                if eligible:
+                    try:
+                        job = self.queue.claim(eligible)
+                    except Exception as e:
+                        logger.error(f"[EXECUTOR] Failed to claim job from queue: {str(e)}")
+                if job is not None and self.admit and self._active and not self._admit(job):
+                    logger.info(f"Job {job['job_id']}: [EXECUTOR] Not enough node headroom, deferring")
+                    self.queue.release(job)
+                    self._cond.wait(self.poll_interval)
+                    continue
+                if job is not None:
+                    self.lanes[job["resource_class"]]["running"] += 1
+                    self._active[job["job_id"]] = {
+                        "lane": job["resource_class"],
+                        "started_at": time.time(),
+                        "endpoint": job.get("endpoint"),
+                        "cost": job.get("cost") or {}
+                    }
+                    return job
+                # A shared queue can receive jobs from other workers without
+                # notifying us, so poll it periodically
+                self._cond.wait(self.poll_interval if self.queue.shared else None)
+
+    def _admit(self, job):
+        now = time.time()
+        reserved = {"ram_mb": 0, "disk_mb": 0}
+        for entry in self._active.values():
+            if now - entry["started_at"] < self.reservation_window:
+                reserved["ram_mb"] += entry["cost"].get("ram_mb", 0)
+                reserved["disk_mb"] += entry["cost"].get("disk_mb", 0)
+        try:
+            return self.admit(job, reserved)
+        except Exception as e:
+            logger.warning(f"Job {job['job_id']}: [EXECUTOR] Admission check failed: {str(e)}")
+            return True
+
+    def estimated_backlog(self):
+        """Estimated CPU-seconds of queued and running jobs."""
+        backlog = self.queue.backlog_cpu_seconds()
+        if not self.queue.shared:
+            # The shared queue keeps running jobs until they finish
+            with self._cond:
+                backlog += sum(entry["cost"].get("cpu_seconds", 0) for entry in self._active.values())
+        return backlog
+
+    def _release(self, job):
+        try:
+            self.queue.done(job)
+        except Exception as e:
+            logger.error(f"Job {job['job_id']}: [EXECUTOR] Failed to remove job from queue: {str(e)}")
+        with self._cond:
+            self.lanes[job["resource_class"]]["running"] -= 1
+            self._active.pop(job["job_id"], None)
+            # A freed lane slot may unblock jobs that other workers skipped
+            self._cond.notify_all()
+
+    def _worker_loop(self):
+        while True:
+            job = self._take_next_job()
+            try:
+                self.handler(job)
+            except Exception as e:
+                # Never let a failing job take the worker thread down with it
+                logger.error(f"Job {job['job_id']}: [EXECUTOR] Unhandled error in worker: {str(e)}", exc_info=True)
+            finally:
+                self._release(job)
+
+    def _recovery_loop(self):
+        while True:
+            time.sleep(60)
+            try:
+                if self.queue.recover(self.on_abandoned):
+                    with self._cond:
+                        self._cond.notify_all()
+            except Exception as e:
+                logger.error(f"[EXECUTOR] Queue recovery failed: {str(e)}")
@@ -0,0 +1,209 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from config import LOCAL_STORAGE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two progress writes of a job
+PUBLISH_INTERVAL = 0.5
+
+_steps = {}
+_steps_lock = threading.Lock()
+
+# Durations of local inputs already probed, keyed by (path, size, mtime)
+_durations = OrderedDict()
+_durations_lock = threading.Lock()
+_DURATIONS_SIZE = 256
+
+def progress_path(job_id):
+    """Progress file of a running job, readable by every worker of the node."""
+    return os.path.join(LOCAL_STORAGE_PATH, 'jobs', f"{job_id}.progress")
+
+def read_progress(job_id):
+    try:
+        with open(progress_path(job_id), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def publish_progress(job_id, progress):
+    path = progress_path(job_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(progress, f)
+    os.replace(tmp_file, path)
+
+def clear_progress(job_id):
+    with _steps_lock:
+        _steps.pop(job_id, None)
+    try:
+        os.remove(progress_path(job_id))
+    except FileNotFoundError:
+        pass
+
+def _seconds(value):
+    """FFmpeg duration ("90", "1:30", "00:01:30.5") in seconds."""
+    try:
+        return sum(float(part) * 60 ** i for i, part in enumerate(reversed(str(value).split(':'))))
+    except ValueError:
+        return None
+
+def _input_duration(path, probe):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _durations_lock:
+        if key in _durations:
+            _durations.move_to_end(key)
+            return _durations[key]
+    duration = probe(path)
+    if duration is not None:
+        with _durations_lock:
+            _durations[key] = duration
+            while len(_durations) > _DURATIONS_SIZE:
+                _durations.popitem(last=False)
+    return duration
+
+def expected_duration(cmd, probe=None):
+    """
+    Seconds of media an FFmpeg command writes: from -t/-to/-ss, else the
+    duration of the first local input as returned by probe(path), if given.
+    """
+    inputs = [i for i, arg in enumerate(cmd) if arg == '-i' and i + 1 < len(cmd)]
+    last_input = inputs[-1] if inputs else len(cmd)
+    input_options, output_options = {}, {}
+    for i, arg in enumerate(cmd[:-1]):
+        if arg in ('-t', '-to', '-ss'):
+            (output_options if i > last_input else input_options)[arg] = _seconds(cmd[i + 1])
+
+    duration = output_options.get('-t') or input_options.get('-t')
+    if duration:
+        return duration
+    start = output_options.get('-ss') or input_options.get('-ss') or 0
+    end = output_options.get('-to') or input_options.get('-to')
+    if end is None and inputs and probe is not None:
+        end = _input_duration(cmd[inputs[0] + 1], probe)
+    if end is None:
+        return None
+    return max(0.0, end - start)
+
+def is_ffmpeg_command(cmd):
+    return bool(cmd) and os.path.basename(str(cmd[0])) == 'ffmpeg' and '-progress' not in cmd
+
+class FFmpegProgress:
+    """
+    Machine-readable progress of one FFmpeg run of a job.
+
+    The command gets "-progress pipe:N" on a private pipe (stdout and stderr
+    stay with the caller). A reader thread turns the key=value blocks FFmpeg
+    writes about twice a second into percent, fps, speed and ETA, and
+    publishes them for the job.
+
+    When the command does not tell its duration, the reader thread gets it
+    from probe(path) of the first input once FFmpeg is running, so the run
+    never waits for it.
+    """
+
+    def __init__(self, job_id, cmd, probe=None):
+        self.job_id = job_id
+        self.duration = expected_duration(cmd)
+        self._probe = (lambda: expected_duration(cmd, probe)) if self.duration is None and probe is not None else None
+        with _steps_lock:
+            self.step = _steps[job_id] = _steps.get(job_id, 0) + 1
+        self.read_fd, self.write_fd = os.pipe()
+        self.cmd = [cmd[0], '-progress', f'pipe:{self.write_fd}'] + list(cmd[1:])
+        self._thread = None
+        self._last_publish = 0
+
+    def started(self):
+        """Call once the FFmpeg process holds the write end of the pipe."""
+        os.close(self.write_fd)
+        self.write_fd = None
+        self._thread = threading.Thread(target=self._read, name=f"ffmpeg-progress-{self.job_id}", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self.write_fd is not None:
+            # The process never started
+            os.close(self.write_fd)
+            os.close(self.read_fd)
+            self.write_fd = None
+        elif self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _read(self):
+        values = {}
+        try:
+            if self._probe is not None:
+                self.duration = self._probe()
+            with os.fdopen(self.read_fd, 'r', errors='replace') as pipe:
+                for line in pipe:
+                    key, _, value = line.strip().partition('=')
+                    if key != 'progress':
+                        values[key] = value
+                        continue
+                    now = time.time()
+                    if value == 'end' or now - self._last_publish >= PUBLISH_INTERVAL:
+                        self._last_publish = now
+                        publish_progress(self.job_id, self._snapshot(values, value, now))
+        except Exception as e:
+            logger.warning(f"Job {self.job_id}: [PROGRESS] Reader stopped: {str(e)}")
+
+    def _snapshot(self, values, state, now):
+        try:
+            out_time = int(values.get('out_time_us') or values.get('out_time_ms') or 0) / 1e6
+        except ValueError:
+            out_time = 0.0
+        try:
+            speed = float(values.get('speed', '').rstrip('x'))
+        except ValueError:
+            speed = None
+        try:
+            fps = float(values.get('fps', ''))
+        except ValueError:
+            fps = None
+
+        percent = eta = None
+        if self.duration:
+            percent = 100.0 if state == 'end' else round(min(100.0, out_time * 100 / self.duration), 1)
+            if speed:
+                eta = round(max(0.0, self.duration - out_time) / speed, 1)
+        return {
+            "job_id": self.job_id,
+            "step": self.step,
+            "state": state,
+            "percent": percent,
+            "out_time": round(out_time, 3),
+            "duration": self.duration,
+            "fps": fps,
+            "speed": speed,
+            "frame": int(values['frame']) if values.get('frame', '').isdigit() else None,
+            "total_size": int(values['total_size']) if values.get('total_size', '').isdigit() else None,
+            "eta_seconds": eta,
+            "updated_at": now
+        }
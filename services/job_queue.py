@@ -0,0 +1,359 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Endpoint functions that can be run from a queued job, keyed by
+# "<module>.<qualname>". Every gunicorn worker imports all routes, so a job
+# enqueued by one worker can be rebuilt and executed by any other.
+job_functions = {}
+
+def job_function_key(f):
+    return f"{f.__module__}.{f.__qualname__}"
+
+def register_job_function(f):
+    """Register an endpoint function so queued jobs can refer to it by key."""
+    job_functions[job_function_key(f)] = f
+    return f
+
+def build_task_func(function_key, job_id, data):
+    """Rebuild the callable of a queued job from its function key."""
+    f = job_functions.get(function_key)
+    if f is None:
+        def missing():
+            raise RuntimeError(f"Job function not registered in this worker: {function_key}")
+        return missing
+    return lambda: f(job_id=job_id, data=data)
+
+class MemoryJobQueue:
+    """In-process FIFO per lane. Jobs are lost when the worker exits."""
+
+    shared = False
+
+    def __init__(self):
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def put(self, job, priority=0):
+        with self._lock:
+            self._lanes.setdefault(job["resource_class"], deque()).append(job)
+
+    def claim(self, lanes):
+        """Pop the oldest job of the first lane in `lanes` that has one."""
+        with self._lock:
+            for lane in lanes:
+                queue = self._lanes.get(lane)
+                if queue:
+                    return queue.popleft()
+        return None
+
+    def remove(self, job_id):
+        """Remove a pending job. Returns the job, or None if it is not queued."""
+        with self._lock:
+            for queue in self._lanes.values():
+                for job in queue:
+                    if job["job_id"] == job_id:
+                        queue.remove(job)
+                        return job
+        return None
+
+    def release(self, job):
+        """Put a claimed job back at the head of its lane."""
+        with self._lock:
+            self._lanes.setdefault(job["resource_class"], deque()).appendleft(job)
+
+    def done(self, job):
+        pass
+
+    def backlog_cpu_seconds(self):
+        """Estimated CPU-seconds of the pending jobs."""
+        with self._lock:
+            return sum(
+                (job.get("cost") or {}).get("cpu_seconds", 0)
+                for queue in self._lanes.values() for job in queue
+            )
+
+    def qsize(self, lane=None):
+        with self._lock:
+            if lane is not None:
+                return len(self._lanes.get(lane, ()))
+            return sum(len(q) for q in self._lanes.values())
+
+    def lane_jobs(self, lane):
+        """
+        Pending jobs of a lane in run order and the jobs running in it, as
+        dicts with job_id, endpoint, cost_cpu and queue_start_time/claimed_at.
+        Running jobs are only known to the executor of this process.
+        """
+        with self._lock:
+            pending = [
+                {
+                    "job_id": job["job_id"],
+                    "endpoint": job.get("endpoint"),
+                    "cost_cpu": (job.get("cost") or {}).get("cpu_seconds", 0),
+                    "queue_start_time": job["queue_start_time"]
+                }
+                for job in self._lanes.get(lane, ())
+            ]
+        return pending, []
+
+    def recover(self, on_abandoned=None):
+        return 0
+
+class SQLiteJobQueue:
+    """
+    Node-local durable queue shared by all workers of the host.
+
+    Jobs live in a SQLite database in WAL mode. Workers claim pending rows
+    atomically, so idle workers pick up jobs accepted by busy ones, and
+    pending jobs survive a worker restart. Jobs whose worker died while
+    running them are re-queued up to max_attempts times.
+    """
+
+    shared = True
+
+    def __init__(self, db_path, max_attempts=2):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS job_queue (
+                job_id TEXT PRIMARY KEY,
+                lane TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'pending',
+                function_key TEXT NOT NULL,
+                endpoint TEXT,
+                data TEXT NOT NULL,
+                queue_start_time REAL NOT NULL,
+                claimed_by INTEGER,
+                claimed_start REAL,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_queue_claim
+                ON job_queue (state, lane, priority DESC, queue_start_time);
+        """)
+        # Columns added after the first release of the table
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(job_queue)")}
+        if "cost" not in columns:
+            conn.execute("ALTER TABLE job_queue ADD COLUMN cost TEXT")
+        if "cost_cpu" not in columns:
+            conn.execute("ALTER TABLE job_queue ADD COLUMN cost_cpu REAL NOT NULL DEFAULT 0")
+        if "max_runtime" not in columns:
+            conn.execute("ALTER TABLE job_queue ADD COLUMN max_runtime REAL")
+        if "cache_key" not in columns:
+            conn.execute("ALTER TABLE job_queue ADD COLUMN cache_key TEXT")
+
+    def _conn(self):
+        # sqlite3 connections must not cross threads or forked processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def put(self, job, priority=0):
+        cost = job.get("cost") or {}
+        self._conn().execute(
+            "INSERT INTO job_queue (job_id, lane, priority, function_key, endpoint, data, queue_start_time, "
+            "cost, cost_cpu, max_runtime, cache_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job["job_id"], job["resource_class"], priority, job["function_key"],
+                job.get("endpoint"), json.dumps(job["data"]), job["queue_start_time"],
+                json.dumps(cost), cost.get("cpu_seconds", 0), job.get("max_runtime"), job.get("cache_key")
+            )
+        )
+
+    def claim(self, lanes):
+        if not lanes:
+            return None
+        conn = self._conn()
+        placeholders = ",".join("?" for _ in lanes)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT * FROM job_queue WHERE state = 'pending' AND lane IN ({placeholders}) "
+                "ORDER BY priority DESC, queue_start_time ASC LIMIT 1",
+                list(lanes)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE job_queue SET state = 'running', claimed_by = ?, claimed_start = ?, claimed_at = ?, "
+                "attempts = attempts + 1 WHERE job_id = ?",
+                (os.getpid(), _process_start_time(os.getpid()), time.time(), row["job_id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        data = json.loads(row["data"])
+        return {
+            "job_id": row["job_id"],
+            "data": data,
+            "task_func": build_task_func(row["function_key"], row["job_id"], data),
+            "function_key": row["function_key"],
+            "queue_start_time": row["queue_start_time"],
+            "endpoint": row["endpoint"],
+            "resource_class": row["lane"],
+            "cost": json.loads(row["cost"]) if row["cost"] else None,
+            "max_runtime": row["max_runtime"],
+            "cache_key": row["cache_key"],
+            "attempts": row["attempts"] + 1
+        }
+
+    def remove(self, job_id):
+        """Remove a pending job. Returns the job, or None if it is not queued."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT job_id, data, endpoint, lane FROM job_queue WHERE job_id = ? AND state = 'pending'", (job_id,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM job_queue WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return {
+            "job_id": row["job_id"],
+            "data": json.loads(row["data"]),
+            "endpoint": row["endpoint"],
+            "resource_class": row["lane"]
+        }
+
+    def release(self, job):
+        """Return a claimed job to the pending state without counting the attempt."""
+        self._conn().execute(
+            "UPDATE job_queue SET state = 'pending', claimed_by = NULL, claimed_start = NULL, claimed_at = NULL, "
+            "attempts = attempts - 1 "
+            "WHERE job_id = ? AND state = 'running'",
+            (job["job_id"],)
+        )
+
+    def done(self, job):
+        self._conn().execute("DELETE FROM job_queue WHERE job_id = ?", (job["job_id"],))
+
+    def backlog_cpu_seconds(self):
+        """Estimated CPU-seconds of all pending and running jobs of the node."""
+        row = self._conn().execute("SELECT COALESCE(SUM(cost_cpu), 0) FROM job_queue").fetchone()
+        return row[0]
+
+    def qsize(self, lane=None):
+        if lane is not None:
+            row = self._conn().execute(
+                "SELECT COUNT(*) FROM job_queue WHERE state = 'pending' AND lane = ?", (lane,)
+            ).fetchone()
+        else:
+            row = self._conn().execute("SELECT COUNT(*) FROM job_queue WHERE state = 'pending'").fetchone()
+        return row[0]
+
+    def lane_jobs(self, lane):
+        """Pending jobs of a lane in run order and the jobs running in it, on any worker of the node."""
+        conn = self._conn()
+        pending = conn.execute(
+            "SELECT job_id, endpoint, cost_cpu, queue_start_time FROM job_queue "
+            "WHERE state = 'pending' AND lane = ? ORDER BY priority DESC, queue_start_time ASC",
+            (lane,)
+        ).fetchall()
+        running = conn.execute(
+            "SELECT job_id, endpoint, cost_cpu, claimed_at FROM job_queue WHERE state = 'running' AND lane = ?",
+            (lane,)
+        ).fetchall()
+        return [dict(row) for row in pending], [dict(row) for row in running]
+
+    def recover(self, on_abandoned=None):
+        """
+        Re-queue jobs claimed by workers that no longer exist.
+
+        Args:
+            on_abandoned (callable, optional): Called with (job_id, data) for
+                jobs dropped after max_attempts interrupted runs
+
+        Returns:
+            int: Number of jobs put back in the queue
+        """
+        conn = self._conn()
+        recovered = 0
+        rows = conn.execute(
+            "SELECT job_id, claimed_by, claimed_start, attempts, data FROM job_queue WHERE state = 'running'"
+        ).fetchall()
+        for row in rows:
+            if _claimant_alive(row["claimed_by"], row["claimed_start"]):
+                continue
+            if row["attempts"] >= self.max_attempts:
+                logger.warning(f"Job {row['job_id']}: [QUEUE] Dropping job after {row['attempts']} interrupted attempt(s)")
+                conn.execute("DELETE FROM job_queue WHERE job_id = ?", (row["job_id"],))
+                if on_abandoned:
+                    on_abandoned(row["job_id"], json.loads(row["data"]))
+                continue
+            conn.execute(
+                "UPDATE job_queue SET state = 'pending', claimed_by = NULL, claimed_start = NULL, claimed_at = NULL "
+                "WHERE job_id = ? AND state = 'running'",
+                (row["job_id"],)
+            )
+            recovered += 1
+        if recovered:
+            logger.info(f"PID {os.getpid()} Re-queued {recovered} job(s) left behind by a dead worker")
+        return recovered
+
+def _process_start_time(pid):
+    """Start time of a process (epoch seconds), or None if it does not exist."""
+    import psutil
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.NoSuchProcess:
+        return None
+
+def _claimant_alive(pid, start_time):
+    """
+    Whether the worker that claimed a job still runs. A PID alone is not
+    enough: after a container restart the new workers get the same small
+    PIDs, so the process start time recorded with the claim must match too.
+    """
+    if not pid or start_time is None:
+        return False
+    current = _process_start_time(pid)
+    # create_time() is derived from the boot time and may drift by a few ms
+    return current is not None and abs(current - start_time) < 1.0
+
+def create_job_queue(backend, db_path=None):
+    """Create the queue backend selected by JOB_QUEUE_BACKEND."""
+    if backend == "sqlite":
+        logger.info(f"Using SQLite job queue at {db_path}")
+        return SQLiteJobQueue(db_path)
+    return MemoryJobQueue()
@@ -0,0 +1,102 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import time
+import logging
+from services.job_status_store import get_job_status_store, TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the records read for one report
+MAX_REPORT_JOBS = 20000
+PAGE_SIZE = 500
+
+def percentile(sorted_values, p):
+    """Linearly interpolated p-th percentile (0-100) of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 3) if values else None,
+        "p95": round(percentile(values, 95), 3) if values else None,
+        "p99": round(percentile(values, 99), 3) if values else None,
+        "max": round(values[-1], 3) if values else None
+    }
+
+def latency_report(window_seconds, endpoint=None, max_jobs=MAX_REPORT_JOBS):
+    """
+    Latency percentiles of the jobs finished in the last `window_seconds`,
+    per endpoint and per stage (see services.job_control.stage).
+
+    A stage's "share" is its total time over the total run time of the
+    endpoint's jobs, which shows whether e.g. download or encode dominates.
+    """
+    since = time.time() - window_seconds
+    store = get_job_status_store()
+    endpoints = {}
+    cursor = None
+    read = 0
+    while True:
+        jobs, cursor = store.query(
+            status=list(TERMINAL_STATUSES), endpoint=endpoint, updated_after=since,
+            limit=PAGE_SIZE, cursor=cursor, include_record=True
+        )
+        read += len(jobs)
+        for job in jobs:
+            record = job["record"]
+            response = record.get("response") if isinstance(record.get("response"), dict) else {}
+            if response.get("run_time") is None:
+                # Rejected before running (queue full, backlog)
+                continue
+            stats = endpoints.setdefault(job["endpoint"] or "unknown", {"run_time": [], "queue_time": [], "errors": 0, "stages": {}})
+            stats["run_time"].append(response["run_time"])
+            stats["queue_time"].append(response.get("queue_time") or 0)
+            if response.get("code") != 200:
+                stats["errors"] += 1
+            for name, timing in (record.get("stage_timings") or {}).items():
+                stats["stages"].setdefault(name, []).append(timing.get("seconds", 0))
+        if not cursor or read >= max_jobs:
+            break
+
+    report = {}
+    for name, stats in sorted(endpoints.items()):
+        total_run_time = sum(stats["run_time"]) or None
+        stages = {}
+        for stage_name, values in sorted(stats["stages"].items()):
+            stages[stage_name] = summarize(values)
+            stages[stage_name]["share"] = round(sum(values) / total_run_time, 3) if total_run_time else None
+        report[name] = {
+            "jobs": len(stats["run_time"]),
+            "errors": stats["errors"],
+            "run_time": summarize(stats["run_time"]),
+            "queue_time": summarize(stats["queue_time"]),
+            "stages": stages
+        }
+    return {
+        "window_seconds": window_seconds,
+        "jobs_read": read,
+        "truncated": cursor is not None,
+        "endpoints": report
+    }
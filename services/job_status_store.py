@@ -0,0 +1,486 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+import atexit
+import logging
+from collections import OrderedDict
+from config import LOCAL_STORAGE_PATH, JOB_STATUS_BACKEND, JOB_STATUS_DB, JOB_STATUS_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a job record no longer changes
+TERMINAL_STATUSES = ("done", "failed", "cancelled")
+# Jobs remembered as already written by CachedJobStatusStore; forgetting one
+# only costs a synchronous write of its next update
+STORED_IDS_MAX = 10000
+
+def _record_fields(record):
+    """Indexed fields of a status record: endpoint and client id live in the response once it exists."""
+    response = record.get("response") if isinstance(record.get("response"), dict) else {}
+    return {
+        "status": record.get("job_status"),
+        "endpoint": record.get("endpoint") or response.get("endpoint"),
+        "client_id": record.get("id") or response.get("id")
+    }
+
+def encode_cursor(updated_at, job_id):
+    return base64.urlsafe_b64encode(json.dumps([updated_at, job_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    """(updated_at, job_id) of a cursor returned by query(); ValueError if malformed."""
+    try:
+        updated_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(updated_at), str(job_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _summary(job_id, fields, created_at, updated_at):
+    return {
+        "job_id": job_id,
+        "job_status": fields["status"],
+        "endpoint": fields["endpoint"],
+        "id": fields["client_id"],
+        "created_at": created_at,
+        "updated_at": updated_at
+    }
+
+class FileJobStatusStore:
+    """One JSON file per job in LOCAL_STORAGE_PATH/jobs (original layout)."""
+
+    def __init__(self, jobs_dir):
+        self.jobs_dir = jobs_dir
+
+    def _ensure_dir(self):
+        # Validação humanizada: verificar se o diretório pai existe
+        parent_dir = os.path.dirname(self.jobs_dir)
+        if parent_dir and not os.path.exists(parent_dir):
+            try:
+                logger.info(f"📁 Criando diretório pai: {parent_dir}")
+                os.makedirs(parent_dir, exist_ok=True)
+            except PermissionError as e:
+                logger.error(f"❌ Erro de permissão ao criar diretório {parent_dir}: {e}")
+                logger.error(f"💡 Solução: Verifique as permissões ou altere LOCAL_STORAGE_PATH para um diretório acessível")
+                raise PermissionError(f"Não foi possível criar o diretório {parent_dir}. Verifique as permissões ou altere LOCAL_STORAGE_PATH no EasyPanel.") from e
+
+        # Validação humanizada: criar diretório de jobs
+        if not os.path.exists(self.jobs_dir):
+            try:
+                logger.info(f"📁 Criando diretório de jobs: {self.jobs_dir}")
+                os.makedirs(self.jobs_dir, exist_ok=True)
+            except PermissionError as e:
+                logger.error(f"❌ Erro de permissão ao criar diretório de jobs {self.jobs_dir}: {e}")
+                logger.error(f"💡 Solução: Verifique se LOCAL_STORAGE_PATH={LOCAL_STORAGE_PATH} está correto e tem permissões de escrita")
+                raise PermissionError(f"Não foi possível criar o diretório de jobs {self.jobs_dir}. Verifique LOCAL_STORAGE_PATH no EasyPanel.") from e
+
+    def put(self, job_id, record, durable=False, updated_at=None):
+        self._ensure_dir()
+        job_file = os.path.join(self.jobs_dir, f"{job_id}.json")
+        try:
+            # Readers never see a half-written file
+            tmp_file = f"{job_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(record, f, indent=2)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if updated_at:
+                os.utime(tmp_file, (updated_at, updated_at))
+            os.replace(tmp_file, job_file)
+        except PermissionError as e:
+            logger.error(f"❌ Erro de permissão ao escrever arquivo {job_file}: {e}")
+            raise PermissionError(f"Não foi possível escrever o arquivo de status do job. Verifique as permissões do diretório {self.jobs_dir}.") from e
+
+    def get(self, job_id):
+        job_file = os.path.join(self.jobs_dir, f"{job_id}.json")
+        try:
+            with open(job_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def statuses_since(self, since):
+        """{job_id: job_status} of the jobs updated at or after `since` (None without a jobs directory)."""
+        if not os.path.exists(self.jobs_dir):
+            return None
+        statuses = {}
+        for entry in os.scandir(self.jobs_dir):
+            if not entry.name.endswith('.json') or entry.stat().st_mtime < since:
+                continue
+            try:
+                with open(entry.path, 'r') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if "job_status" in record:
+                statuses[entry.name[:-len('.json')]] = record["job_status"]
+        return statuses
+
+    def query(self, status=None, endpoint=None, client_id=None, updated_after=None, updated_before=None,
+              limit=100, cursor=None, include_record=False):
+        """Same contract as SQLiteJobStatusStore.query, answered with a directory scan."""
+        after = decode_cursor(cursor) if cursor else None
+        matches = []
+        if os.path.exists(self.jobs_dir):
+            for entry in os.scandir(self.jobs_dir):
+                if not entry.name.endswith('.json'):
+                    continue
+                job_id, mtime = entry.name[:-len('.json')], entry.stat().st_mtime
+                if (updated_after is not None and mtime < updated_after) or (updated_before is not None and mtime >= updated_before):
+                    continue
+                if after and (mtime, job_id) >= after:
+                    continue
+                matches.append((mtime, job_id))
+        jobs = []
+        for mtime, job_id in sorted(matches, reverse=True):
+            record = self.get(job_id) or {}
+            fields = _record_fields(record)
+            if (status and fields["status"] not in status) or (endpoint and fields["endpoint"] != endpoint) \
+                    or (client_id and fields["client_id"] != client_id):
+                continue
+            item = _summary(job_id, fields, None, mtime)
+            if include_record:
+                item["record"] = record
+            jobs.append(item)
+            if len(jobs) > limit:
+                break
+        next_cursor = encode_cursor(jobs[limit - 1]["updated_at"], jobs[limit - 1]["job_id"]) if len(jobs) > limit else None
+        return jobs[:limit], next_cursor
+
+    def expired(self, before, limit=500):
+        """Up to `limit` (job_id, updated_at, record) not updated since `before`, oldest first."""
+        if not os.path.exists(self.jobs_dir):
+            return []
+        old = []
+        for entry in os.scandir(self.jobs_dir):
+            if entry.name.endswith('.json'):
+                mtime = entry.stat().st_mtime
+                if mtime < before:
+                    old.append((mtime, entry.name[:-len('.json')]))
+        result = []
+        for mtime, job_id in sorted(old)[:limit]:
+            try:
+                result.append((job_id, mtime, self.get(job_id)))
+            except (OSError, ValueError):
+                result.append((job_id, mtime, None))
+        return result
+
+    def delete(self, job_ids):
+        """Remove records; returns the bytes freed."""
+        freed = 0
+        for job_id in job_ids:
+            job_file = os.path.join(self.jobs_dir, f"{job_id}.json")
+            try:
+                freed += os.path.getsize(job_file)
+                os.remove(job_file)
+            except FileNotFoundError:
+                pass
+        return freed
+
+class SQLiteJobStatusStore:
+    """
+    Job status records in a node-local SQLite database (WAL mode).
+
+    Status, endpoint, client id and updated_at are indexed columns, so
+    lookups and time-window listings do not scan every record. Records
+    written by the file store before the switch are still found by get().
+    """
+
+    def __init__(self, db_path, legacy_dir=None):
+        self.db_path = db_path
+        self.legacy = FileJobStatusStore(legacy_dir) if legacy_dir else None
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS job_status (
+                job_id TEXT PRIMARY KEY,
+                status TEXT,
+                endpoint TEXT,
+                client_id TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_status_by_status ON job_status (status, updated_at, job_id);
+            CREATE INDEX IF NOT EXISTS idx_job_status_by_endpoint ON job_status (endpoint, updated_at, job_id);
+            CREATE INDEX IF NOT EXISTS idx_job_status_by_client ON job_status (client_id, updated_at, job_id);
+            CREATE INDEX IF NOT EXISTS idx_job_status_by_time ON job_status (updated_at, job_id);
+        """)
+
+    def _conn(self):
+        # sqlite3 connections must not cross threads or forked processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def put(self, job_id, record, durable=False, updated_at=None):
+        fields = _record_fields(record)
+        now = updated_at or time.time()
+        conn = self._conn()
+        # WAL with synchronous=NORMAL may lose the last commits on power loss;
+        # terminal records are committed with a full sync
+        if durable:
+            conn.execute("PRAGMA synchronous=FULL")
+        # Early records (queued/running) carry no endpoint or client id yet; keep the known ones
+        conn.execute(
+            "INSERT INTO job_status (job_id, status, endpoint, client_id, created_at, updated_at, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, "
+            "endpoint = COALESCE(excluded.endpoint, job_status.endpoint), "
+            "client_id = COALESCE(excluded.client_id, job_status.client_id), "
+            "updated_at = excluded.updated_at, record = excluded.record",
+            (job_id, fields["status"], fields["endpoint"], fields["client_id"], now, now, json.dumps(record))
+        )
+        if durable:
+            conn.execute("PRAGMA synchronous=NORMAL")
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT record FROM job_status WHERE job_id = ?", (job_id,)).fetchone()
+        if row is not None:
+            return json.loads(row["record"])
+        return self.legacy.get(job_id) if self.legacy else None
+
+    def statuses_since(self, since):
+        rows = self._conn().execute(
+            "SELECT job_id, status FROM job_status WHERE updated_at >= ? AND status IS NOT NULL", (since,)
+        ).fetchall()
+        return {row["job_id"]: row["status"] for row in rows}
+
+    def query(self, status=None, endpoint=None, client_id=None, updated_after=None, updated_before=None,
+              limit=100, cursor=None, include_record=False):
+        """
+        Jobs matching the filters, most recently updated first.
+
+        Keyset pagination on (updated_at, job_id) over the indexes, so the
+        cost depends on `limit`, not on the number of stored jobs.
+
+        Args:
+            status (list): Job statuses to include
+            endpoint (str): Endpoint of the job
+            client_id (str): Client-supplied "id" of the request
+            updated_after / updated_before (float): Time range (epoch seconds)
+            limit (int): Page size
+            cursor (str): next_cursor of the previous page
+            include_record (bool): Add the full status record (with the response)
+
+        Returns:
+            tuple: (list of jobs, next_cursor or None)
+        """
+        where, params = [], []
+        if endpoint:
+            where.append("endpoint = ?")
+            params.append(endpoint)
+        if client_id:
+            where.append("client_id = ?")
+            params.append(client_id)
+        if updated_after is not None:
+            where.append("updated_at >= ?")
+            params.append(updated_after)
+        if updated_before is not None:
+            where.append("updated_at < ?")
+            params.append(updated_before)
+        if cursor:
+            cursor_time, cursor_job = decode_cursor(cursor)
+            where.append("(updated_at < ? OR (updated_at = ? AND job_id < ?))")
+            params += [cursor_time, cursor_time, cursor_job]
+
+        columns = "job_id, status, endpoint, client_id, created_at, updated_at" + (", record" if include_record else "")
+        order = " ORDER BY updated_at DESC, job_id DESC LIMIT ?"
+
+        def page(extra=None):
+            conditions = where + ([extra] if extra else [])
+            sql = f"SELECT {columns} FROM job_status"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            return sql + order
+
+        if not status or len(status) == 1:
+            sql = page("status = ?" if status else None)
+            args = params + ([status[0]] if status else []) + [limit + 1]
+        else:
+            # One index range per status, merged: sorting all rows of a
+            # multi-status IN () would grow with the number of jobs
+            parts = [f"SELECT * FROM ({page('status = ?')})" for _ in status]
+            sql = f"SELECT * FROM ({' UNION ALL '.join(parts)}){order}"
+            args = [arg for value in status for arg in params + [value, limit + 1]] + [limit + 1]
+        rows = self._conn().execute(sql, args).fetchall()
+
+        jobs = []
+        for row in rows[:limit]:
+            fields = {"status": row["status"], "endpoint": row["endpoint"], "client_id": row["client_id"]}
+            item = _summary(row["job_id"], fields, row["created_at"], row["updated_at"])
+            if include_record:
+                item["record"] = json.loads(row["record"])
+            jobs.append(item)
+        next_cursor = encode_cursor(jobs[-1]["updated_at"], jobs[-1]["job_id"]) if len(rows) > limit else None
+        return jobs, next_cursor
+
+    def expired(self, before, limit=500):
+        rows = self._conn().execute(
+            "SELECT job_id, updated_at, record FROM job_status WHERE updated_at < ? ORDER BY updated_at LIMIT ?",
+            (before, limit)
+        ).fetchall()
+        result = [(row["job_id"], row["updated_at"], json.loads(row["record"])) for row in rows]
+        # Files left by the file backend age out too
+        if self.legacy and len(result) < limit:
+            result += self.legacy.expired(before, limit - len(result))
+        return result
+
+    def delete(self, job_ids):
+        job_ids = list(job_ids)
+        if not job_ids:
+            return 0
+        conn = self._conn()
+        placeholders = ",".join("?" * len(job_ids))
+        freed = conn.execute(
+            f"SELECT COALESCE(SUM(LENGTH(record)), 0) FROM job_status WHERE job_id IN ({placeholders})", job_ids
+        ).fetchone()[0]
+        conn.execute(f"DELETE FROM job_status WHERE job_id IN ({placeholders})", job_ids)
+        if self.legacy:
+            freed += self.legacy.delete(job_ids)
+        return freed
+
+class CachedJobStatusStore:
+    """
+    Write-behind cache in front of a status store.
+
+    Updates are kept in memory and written by a background thread every
+    flush_interval seconds; several updates of a job in between cost one
+    write. The first record of a job (so other workers can find it as soon
+    as its id is returned) and terminal records are written synchronously
+    and durably. Pending records are served from memory; flushed ones are
+    read from the backing store, which other workers may have updated.
+    """
+
+    def __init__(self, backing, flush_interval):
+        self.backing = backing
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # job_id -> (record, updated_at) not yet written
+        self._pending = {}
+        # Jobs whose first record was written, least recently updated first.
+        # Another worker may finish a job, so this is bounded rather than
+        # relying on the terminal record to drop it
+        self._stored = OrderedDict()
+        self._thread = threading.Thread(target=self._run, name="job-status-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def put(self, job_id, record):
+        status = record.get("job_status")
+        with self._lock:
+            write_now = status in TERMINAL_STATUSES or job_id not in self._stored
+            if not write_now:
+                self._stored.move_to_end(job_id)
+                self._pending[job_id] = (record, time.time())
+                return
+        # Holding the flush lock keeps an older pending record from landing after this one
+        with self._flush_lock:
+            with self._lock:
+                self._pending.pop(job_id, None)
+            self.backing.put(job_id, record, durable=status in TERMINAL_STATUSES)
+        with self._lock:
+            if status in TERMINAL_STATUSES:
+                self._stored.pop(job_id, None)
+            else:
+                self._stored[job_id] = True
+                self._stored.move_to_end(job_id)
+                while len(self._stored) > STORED_IDS_MAX:
+                    self._stored.popitem(last=False)
+
+    def get(self, job_id):
+        with self._lock:
+            pending = self._pending.get(job_id)
+        if pending is not None:
+            return pending[0]
+        return self.backing.get(job_id)
+
+    def statuses_since(self, since):
+        statuses = self.backing.statuses_since(since)
+        with self._lock:
+            pending = [(job_id, record.get("job_status"), updated_at) for job_id, (record, updated_at) in self._pending.items()]
+        for job_id, status, updated_at in pending:
+            if updated_at >= since and status is not None:
+                statuses = {} if statuses is None else statuses
+                statuses[job_id] = status
+        return statuses
+
+    def query(self, **filters):
+        # Pending updates (at most flush_interval old) are not visible yet
+        return self.backing.query(**filters)
+
+    def expired(self, before, limit=500):
+        return self.backing.expired(before, limit)
+
+    def delete(self, job_ids):
+        return self.backing.delete(job_ids)
+
+    def flush(self):
+        """Write every pending record to the backing store."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for job_id, (record, updated_at) in pending.items():
+                try:
+                    self.backing.put(job_id, record, updated_at=updated_at)
+                except Exception as e:
+                    logger.error(f"Job {job_id}: failed to flush status: {e}")
+                    with self._lock:
+                        # Keep it for the next round unless a newer record arrived
+                        self._pending.setdefault(job_id, (record, updated_at))
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+_store = None
+_store_lock = threading.Lock()
+
+def create_job_status_store(backend, db_path=None):
+    """Create the status store selected by JOB_STATUS_BACKEND."""
+    jobs_dir = os.path.join(LOCAL_STORAGE_PATH, 'jobs')
+    if backend == "sqlite":
+        logger.info(f"Using SQLite job status store at {db_path}")
+        return SQLiteJobStatusStore(db_path, legacy_dir=jobs_dir)
+    return FileJobStatusStore(jobs_dir)
+
+def get_job_status_store():
+    """The status store of this process, created on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = create_job_status_store(JOB_STATUS_BACKEND, JOB_STATUS_DB)
+                if JOB_STATUS_FLUSH_INTERVAL > 0:
+                    store = CachedJobStatusStore(store, JOB_STATUS_FLUSH_INTERVAL)
+                _store = store
+    return _store
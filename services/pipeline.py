@@ -0,0 +1,144 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import re
+import time
+import logging
+import jsonschema
+from app_utils import resolve_job_endpoint
+from services.batch import NON_BATCHABLE_ENDPOINTS, SUB_JOB_IGNORED_KEYS
+from services.shared_inputs import shared_inputs, capture_outputs
+
+logger = logging.getLogger(__name__)
+
+# "{{step_id}}" or "{{step_id.0}}" / "{{step_id.key}}" for part of a step result
+PLACEHOLDER = re.compile(r"^\{\{\s*([A-Za-z0-9_-]+)((?:\.[A-Za-z0-9_-]+)*)\s*\}\}$")
+
+def _references(value, refs=None):
+    refs = [] if refs is None else refs
+    if isinstance(value, dict):
+        for item in value.values():
+            _references(item, refs)
+    elif isinstance(value, list):
+        for item in value:
+            _references(item, refs)
+    elif isinstance(value, str):
+        match = PLACEHOLDER.match(value)
+        if match:
+            refs.append(match.group(1))
+    return refs
+
+def prepare_pipeline(steps, outputs=None):
+    """
+    Resolve the steps of a pipeline and check their references.
+
+    Returns:
+        tuple: (prepared steps, output step ids, None) or (None, None, error message)
+    """
+    prepared = []
+    seen = set()
+    for index, step in enumerate(steps):
+        step_id = step["id"]
+        endpoint = step["endpoint"]
+        if step_id in seen:
+            return None, None, f"steps[{index}]: duplicate step id '{step_id}'"
+        if endpoint in NON_BATCHABLE_ENDPOINTS:
+            return None, None, f"steps[{index}]: {endpoint} cannot be used inside a pipeline"
+        func, schema = resolve_job_endpoint(endpoint)
+        if func is None:
+            return None, None, f"steps[{index}]: unknown endpoint {endpoint}"
+        payload = {k: v for k, v in (step.get("payload") or {}).items() if k not in SUB_JOB_IGNORED_KEYS}
+        for ref in _references(payload):
+            if ref not in seen:
+                return None, None, f"steps[{index}]: '{{{{{ref}}}}}' does not refer to an earlier step"
+        seen.add(step_id)
+        prepared.append({"index": index, "id": step_id, "endpoint": endpoint, "func": func, "schema": schema, "payload": payload})
+
+    outputs = list(outputs) if outputs else [prepared[-1]["id"]]
+    unknown = [output for output in outputs if output not in seen]
+    if unknown:
+        return None, None, f"outputs: unknown step id(s) {', '.join(unknown)}"
+    return prepared, outputs, None
+
+def _lookup(result, path):
+    for part in path:
+        if isinstance(result, list) and part.isdigit():
+            result = result[int(part)]
+        elif isinstance(result, dict):
+            result = result[part]
+        else:
+            raise KeyError(part)
+    return result
+
+def substitute(value, results):
+    """Replace "{{step_id...}}" strings with the results of earlier steps."""
+    if isinstance(value, dict):
+        return {k: substitute(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, results) for v in value]
+    if isinstance(value, str):
+        match = PLACEHOLDER.match(value)
+        if match:
+            path = [p for p in match.group(2).split(".") if p]
+            try:
+                return _lookup(results[match.group(1)], path)
+            except (KeyError, IndexError) as e:
+                raise ValueError(f"Cannot resolve {value}: missing {str(e)}")
+    return value
+
+def run_pipeline(job_id, steps, outputs):
+    """
+    Run prepared steps in order against local intermediate files.
+
+    Every upload made by a step that is not an output stays on local disk
+    under a pipeline:// URL, and later steps download it through
+    download_file (a hard link). Only the output steps upload to cloud
+    storage. The pipeline stops at the first failing step.
+
+    Returns:
+        tuple: (result dict, status code)
+    """
+    results = {}
+    report = []
+    with shared_inputs() as shared:
+        for step in steps:
+            start_time = time.time()
+            step_job_id = f"{job_id}-{step['index']}"
+            entry = {"id": step["id"], "endpoint": step["endpoint"], "job_id": step_job_id}
+            report.append(entry)
+            try:
+                payload = substitute(step["payload"], results)
+                if step["schema"]:
+                    jsonschema.validate(instance=payload, schema=step["schema"])
+            except (ValueError, jsonschema.exceptions.ValidationError) as e:
+                message = e.message if isinstance(e, jsonschema.exceptions.ValidationError) else str(e)
+                entry.update({"code": 400, "error": f"Invalid payload: {message}"})
+                return {"failed_step": step["id"], "steps": report}, 400
+
+            logger.info(f"Job {job_id}: [PIPELINE] Step {step['index']} '{step['id']}' -> {step['endpoint']}")
+            with capture_outputs(step["id"], upload=step["id"] in outputs):
+                response, _, code = step["func"](job_id=step_job_id, data=payload)
+            entry.update({"code": code, "run_time": round(time.time() - start_time, 3)})
+            if code != 200:
+                entry["error"] = response if isinstance(response, (str, dict)) else str(response)
+                logger.warning(f"Job {job_id}: [PIPELINE] Step '{step['id']}' failed with code {code}")
+                return {"failed_step": step["id"], "steps": report}, code
+            results[step["id"]] = response
+
+        logger.info(f"Job {job_id}: [PIPELINE] Done | {len(steps)} step(s), {shared.downloads} download(s)")
+    return {"outputs": {output: results[output] for output in outputs}, "steps": report}, 200
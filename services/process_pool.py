@@ -0,0 +1,166 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import weakref
+import threading
+import logging
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from config import PROCESS_POOL_WORKERS, PROCESS_POOL_WARM_MODULES
+from services.job_control import get_job_control, stage, JobCancelled
+
+logger = logging.getLogger(__name__)
+
+# Pools of this worker process, created on first use: "python" for the
+# CPU-bound stages and "whisper", a single process that alone imports torch
+# and holds a Whisper model
+WHISPER_POOL = "whisper"
+PYTHON_POOL = "python"
+_pools = {}
+_pool_lock = threading.Lock()
+# Pools whose processes were killed to stop a cancelled task; the other
+# tasks they were running are resubmitted once
+_terminated_pools = weakref.WeakSet()
+
+# The Whisper model loaded in the whisper pool process: (name, model)
+_whisper_model = None
+
+def _warm_worker(modules):
+    """Pool initializer: import the heavy modules once per worker process."""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Process pool: could not preload {name}: {str(e)}")
+
+def _noop():
+    return os.getpid()
+
+def get_pool(name=PYTHON_POOL):
+    """Return a process pool of this worker process, or None when disabled."""
+    if PROCESS_POOL_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        pool, pid = _pools.get(name, (None, None))
+        if pool is None or pid != os.getpid():
+            workers = 1 if name == WHISPER_POOL else PROCESS_POOL_WORKERS
+            # spawn, not fork: the parent runs threads and holds locks
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+                initargs=((),) if name == WHISPER_POOL else (PROCESS_POOL_WARM_MODULES,)
+            )
+            _pools[name] = (pool, os.getpid())
+            logger.info(f"PID {os.getpid()} Process pool '{name}' created with {workers} worker(s)")
+        return pool
+
+def warm_pool():
+    """
+    Start the workers of the python pool now so the first job does not pay
+    the start-up cost. The whisper process starts with the first transcription.
+    """
+    pool = get_pool()
+    if pool is None:
+        return
+    for _ in range(PROCESS_POOL_WORKERS):
+        pool.submit(_noop)
+
+def _reset_pool(pool, terminate=False):
+    """
+    Drop a pool so the next task gets a fresh one. With terminate=True its
+    processes are killed, which is the only way to stop a task already running.
+    """
+    with _pool_lock:
+        for name, (current, _) in list(_pools.items()):
+            if current is pool:
+                del _pools[name]
+    if terminate:
+        _terminated_pools.add(pool)
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def run_in_process(func, *args, **kwargs):
+    """
+    Run a CPU-bound function in the process pool and wait for its result.
+
+    The function and its arguments must be picklable (module-level functions
+    and plain data). While waiting, the calling thread releases the GIL, so
+    the web process keeps serving requests. The wait honours cancellation and
+    the max runtime of the current job; a task that is already running is
+    stopped by killing its pool processes. Whisper runs in its own
+    single-process pool.
+
+    Runs the function inline when PROCESS_POOL_WORKERS is 0. The time spent
+    counts as the "transcribe" (Whisper) or "python" stage of the job.
+    """
+    whisper_task = func is whisper_transcribe
+    with stage("transcribe" if whisper_task else "python"):
+        return _run_in_process(WHISPER_POOL if whisper_task else PYTHON_POOL, func, *args, **kwargs)
+
+def _run_in_process(name, func, *args, **kwargs):
+    pool = get_pool(name)
+    if pool is None:
+        return func(*args, **kwargs)
+
+    control = get_job_control()
+    for attempt in (1, 2):
+        try:
+            future = pool.submit(func, *args, **kwargs)
+        except (BrokenProcessPool, RuntimeError):
+            # Broken, or shut down by a reset from another thread
+            _reset_pool(pool)
+            pool = get_pool(name)
+            future = pool.submit(func, *args, **kwargs)
+
+        try:
+            while True:
+                try:
+                    return future.result(timeout=1.0)
+                except FutureTimeoutError:
+                    if control is not None and (control.cancelled.is_set() or control.remaining() == 0):
+                        if not future.cancel():
+                            logger.info(f"Job {control.job_id}: Stopping {func.__name__} in process pool '{name}'")
+                            _reset_pool(pool, terminate=True)
+                        raise JobCancelled(control.reason or "Job cancelled")
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            if pool in _terminated_pools and attempt == 1:
+                # Killed to stop another job's task, not because of this one
+                pool = get_pool(name)
+                continue
+            # A worker died (e.g. killed by the OOM killer); start a fresh pool next time
+            logger.error(f"Process pool '{name}' broken while running {func.__name__}")
+            raise
+
+def whisper_transcribe(model_name, media_path, **options):
+    """Transcribe with Whisper, reusing the model already loaded in this process (one at a time)."""
+    global _whisper_model
+    import whisper
+    if _whisper_model is None or _whisper_model[0] != model_name:
+        # Release the previous model before loading another
+        _whisper_model = None
+        _whisper_model = (model_name, whisper.load_model(model_name))
+    return _whisper_model[1].transcribe(media_path, **options)
@@ -0,0 +1,141 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import threading
+import logging
+import requests
+from config import DOWNLOAD_CONNECTIONS, DOWNLOAD_CHUNK_MB, DOWNLOAD_RANGED_MIN_MB
+from services.job_control import bind_job, current_job_id, check_cancelled
+from services.http_client import get_session, iter_content
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 1024 * 1024
+# Attempts per byte range before the whole download fails
+RANGE_ATTEMPTS = 3
+
+class RangesNotSupported(Exception):
+    """The server answered a Range request with something other than 206."""
+
+def use_ranges(response, length):
+    """True when a response is worth re-fetching as parallel byte ranges."""
+    return (
+        DOWNLOAD_CONNECTIONS > 1
+        and length is not None
+        and length >= DOWNLOAD_RANGED_MIN_MB * 1024 * 1024
+        and response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    )
+
+def _fetch_range(url, fd, start, end, validator, progress, accepted):
+    headers = {"Range": f"bytes={start}-{end}"}
+    if validator:
+        # A changed object answers 200 with the full body instead of mixing versions
+        headers["If-Range"] = validator
+    with get_session().get(url, headers=headers, stream=True) as response:
+        if response.status_code != 206:
+            raise RangesNotSupported(f"HTTP {response.status_code} for bytes {start}-{end}")
+        accepted.set()
+        offset = start
+        for data in iter_content(response, chunk_size=READ_SIZE):
+            if not data:
+                continue
+            os.pwrite(fd, data, offset)
+            offset += len(data)
+            if progress is not None:
+                progress.add(len(data))
+            check_cancelled()
+    if offset != end + 1:
+        raise IOError(f"Short range: got bytes {start}-{offset - 1} of {start}-{end}")
+
+def ranged_download(url, path, length, validator=None, progress=None,
+                    connections=None, chunk_size=None):
+    """
+    Download `length` bytes of `url` into `path` over parallel Range requests.
+
+    The file is preallocated and every range is written in place with
+    positional writes. Each connection takes the next pending range until
+    none is left; a failed range is retried up to RANGE_ATTEMPTS times.
+
+    Args:
+        validator (str, optional): ETag or Last-Modified of the object, sent
+            as If-Range so every range comes from the same version
+
+    Raises:
+        RangesNotSupported: If the server does not serve byte ranges (or the
+            object changed); nothing usable is left in `path`
+    """
+    connections = connections or DOWNLOAD_CONNECTIONS
+    chunk_size = chunk_size or DOWNLOAD_CHUNK_MB * 1024 * 1024
+    ranges = [(start, min(start + chunk_size, length) - 1) for start in range(0, length, chunk_size)]
+    pending = list(reversed(ranges))
+    lock = threading.Lock()
+    failed = threading.Event()
+    # Set once the server answered a range with 206
+    accepted = threading.Event()
+    errors = []
+    job_id = current_job_id()
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            os.posix_fallocate(fd, 0, length)
+        except (OSError, AttributeError):
+            os.ftruncate(fd, length)
+
+        def worker(first):
+            if job_id:
+                bind_job(job_id)
+            # Only the first connection finds out whether ranges are served
+            while not first and not accepted.wait(0.1):
+                if failed.is_set():
+                    return
+            while not failed.is_set():
+                with lock:
+                    if not pending:
+                        return
+                    start, end = pending.pop()
+                for attempt in range(1, RANGE_ATTEMPTS + 1):
+                    try:
+                        _fetch_range(url, fd, start, end, validator, progress, accepted)
+                        break
+                    except (requests.RequestException, IOError) as e:
+                        if attempt == RANGE_ATTEMPTS:
+                            errors.append(e)
+                            failed.set()
+                            return
+                        logger.warning(f"Range {start}-{end} of {url.split('?')[0]} failed ({str(e)}), retrying")
+                    except BaseException as e:
+                        errors.append(e)
+                        failed.set()
+                        return
+
+        threads = [
+            threading.Thread(target=worker, args=(i == 0,), name=f"ranged-download-{i}", daemon=True)
+            for i in range(min(connections, len(ranges)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        os.close(fd)
+
+    if errors:
+        raise errors[0]
+    logger.info(f"Downloaded {length} bytes of {url.split('?')[0]} over {len(threads)} connection(s) in {len(ranges)} range(s)")
@@ -0,0 +1,171 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import hashlib
+import logging
+from config import RESULT_CACHE_DIR, RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES, COST_PROBE_TIMEOUT
+from services.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+# Payload keys that do not change the result of a job
+IGNORED_PAYLOAD_KEYS = ("webhook_url", "id", "stream_input")
+
+def is_bypass_requested(headers):
+    """True when the client asked to skip the cache (X-Cache-Bypass or Cache-Control: no-cache)."""
+    if headers.get("X-Cache-Bypass", "").lower() in ("1", "true", "yes"):
+        return True
+    cache_control = headers.get("Cache-Control", "").lower()
+    return "no-cache" in cache_control or "no-store" in cache_control
+
+def _collect_urls(value, urls):
+    if isinstance(value, dict):
+        for item in value.values():
+            _collect_urls(item, urls)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_urls(item, urls)
+    elif isinstance(value, str) and value.startswith(("http://", "https://")):
+        urls.append(value)
+
+def input_identity(url):
+    """
+    Identify the current version of a remote input.
+
+    Returns:
+        str: URL plus ETag/Last-Modified/Content-Length, or None when the
+        server gives no validator (the input cannot be told apart from a
+        changed one, so the job is not cached)
+    """
+    try:
+        head = get_session().head(url, allow_redirects=True, timeout=COST_PROBE_TIMEOUT)
+        head.raise_for_status()
+    except Exception as e:
+        logger.debug(f"Result cache HEAD failed for {url}: {str(e)}")
+        return None
+    etag = head.headers.get("ETag")
+    last_modified = head.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return None
+    return f"{url}|{etag or ''}|{last_modified or ''}|{head.headers.get('Content-Length', '')}"
+
+def compute_cache_key(endpoint, data):
+    """
+    Hash the endpoint, the normalized payload and the identity of its inputs.
+
+    Returns:
+        str: Hex digest, or None when the request is not cacheable
+    """
+    payload = {k: v for k, v in (data or {}).items() if k not in IGNORED_PAYLOAD_KEYS}
+    urls = []
+    _collect_urls(payload, urls)
+    identities = []
+    for url in sorted(set(urls)):
+        identity = input_identity(url)
+        if identity is None:
+            logger.info(f"Result cache: no ETag/Last-Modified for {url}, not caching")
+            return None
+        identities.append(identity)
+    material = json.dumps({"endpoint": endpoint, "payload": payload, "inputs": identities}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _entry_path(key):
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.json")
+
+def get_cached_result(key):
+    """Return the stored entry for a key, or None if missing or expired."""
+    path = _entry_path(key)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if entry.get("expires_at", 0) < time.time():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+    # The mtime is the LRU clock
+    try:
+        os.utime(path, None)
+    except FileNotFoundError:
+        pass
+    return entry
+
+def store_result(key, endpoint, response):
+    """Store a successful job response under its cache key."""
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    now = time.time()
+    entry = {
+        "key": key,
+        "endpoint": endpoint,
+        "created_at": now,
+        "expires_at": now + RESULT_CACHE_TTL,
+        "response": response
+    }
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Result cache: could not store entry {key}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    prune()
+
+def prune(max_entries=None):
+    """Drop expired entries, then the least recently used ones above max_entries."""
+    max_entries = RESULT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    now = time.time()
+    entries = []
+    try:
+        names = os.listdir(RESULT_CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(RESULT_CACHE_DIR, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            continue
+        if mtime + RESULT_CACHE_TTL < now:
+            _remove(path)
+        else:
+            entries.append((mtime, path))
+    removed = 0
+    if len(entries) > max_entries:
+        entries.sort()
+        for _, path in entries[:len(entries) - max_entries]:
+            _remove(path)
+            removed += 1
+    return removed
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
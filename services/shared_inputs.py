@@ -0,0 +1,225 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import uuid
+import shutil
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from config import LOCAL_STORAGE_PATH
+from services.job_control import run_subprocess
+
+logger = logging.getLogger(__name__)
+
+_active = contextvars.ContextVar("shared_inputs", default=None)
+# (SharedInputs, label, upload) of the pipeline step being run
+_output_mode = contextvars.ContextVar("pipeline_output_mode", default=None)
+
+# Scheme of the URLs given to intermediate files kept on local disk
+LOCAL_URL_SCHEME = "pipeline://"
+
+class _Entry:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.value = None
+        self.error = None
+
+class SharedInputs:
+    """
+    Inputs, outputs and probe results shared by the jobs of one batch or pipeline.
+
+    While active (see shared_inputs), download_file fetches every shared URL
+    once into a private work directory and hands each caller its own hard
+    link (or copy) of that file, so callers can still delete "their" input.
+    Probe results are memoized by file identity, which hard links share.
+    """
+
+    def __init__(self, urls=None, workdir=None):
+        # None shares every URL
+        self.urls = set(urls) if urls is not None else None
+        self.workdir = workdir or os.path.join(LOCAL_STORAGE_PATH, f"shared_{uuid.uuid4()}")
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.downloads = 0
+        self.hits = 0
+
+    def shares(self, url):
+        return isinstance(url, str) and (self.urls is None or url in self.urls)
+
+    def memo(self, key, compute):
+        """Compute a value once per key; concurrent callers wait for the first one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                entry.value = compute()
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    # Let a later caller retry instead of caching the failure
+                    self._entries.pop(key, None)
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.value
+
+    def register(self, url, path):
+        """Make `url` resolve to an existing local file."""
+        entry = _Entry()
+        entry.value = path
+        entry.ready.set()
+        with self._lock:
+            self._entries[("download", url)] = entry
+            if self.urls is not None:
+                self.urls.add(url)
+
+    def keep(self, path, label):
+        """Hard link (or copy) a file into the work directory so the caller may delete it."""
+        directory = os.path.join(self.workdir, "outputs", label)
+        os.makedirs(directory, exist_ok=True)
+        _, ext = os.path.splitext(path)
+        kept = os.path.join(directory, f"{uuid.uuid4()}{ext}")
+        try:
+            os.link(path, kept)
+        except OSError:
+            shutil.copyfile(path, kept)
+        return kept
+
+    def publish(self, path, label):
+        """Keep an intermediate file locally and return the URL later steps use for it."""
+        kept = self.keep(path, label)
+        url = f"{LOCAL_URL_SCHEME}{label}/{os.path.basename(kept)}"
+        self.register(url, kept)
+        return url
+
+    def local_path(self, url, download):
+        """Local file holding `url`, downloaded with download(url, dir) on first use."""
+        def fetch():
+            os.makedirs(self.workdir, exist_ok=True)
+            self.downloads += 1
+            return download(url, self.workdir)
+        return self.memo(("download", url), fetch)
+
+    def local_copy(self, url, storage_path, download):
+        """Give the caller its own link to the shared file of `url`."""
+        source = self.local_path(url, download)
+        os.makedirs(storage_path, exist_ok=True)
+        _, ext = os.path.splitext(source)
+        dest = os.path.join(storage_path, f"{uuid.uuid4()}{ext}")
+        try:
+            os.link(source, dest)
+        except OSError:
+            shutil.copyfile(source, dest)
+        return dest
+
+    def close(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+def current_shared_inputs():
+    return _active.get()
+
+@contextmanager
+def shared_inputs(urls=None, workdir=None):
+    """
+    Share downloads and probes among everything run in this context.
+
+    Worker threads must run inside a copy of the context
+    (contextvars.copy_context().run) to see the shared inputs.
+    """
+    shared = SharedInputs(urls, workdir)
+    token = _active.set(shared)
+    try:
+        yield shared
+    finally:
+        _active.reset(token)
+        shared.close()
+        if shared.downloads or shared.hits:
+            logger.info(f"Shared inputs: {shared.downloads} download(s), {shared.hits} reuse(s)")
+
+@contextmanager
+def capture_outputs(label, upload):
+    """
+    Route the uploads of one pipeline step.
+
+    With upload=False, services.cloud_storage.upload_file keeps the file on
+    local disk and returns a pipeline:// URL that later steps can download.
+    With upload=True the file is uploaded as usual and the returned URL also
+    resolves to the local copy for later steps.
+    """
+    token = _output_mode.set((current_shared_inputs(), label, upload))
+    try:
+        yield
+    finally:
+        _output_mode.reset(token)
+
+def local_output_url(file_path):
+    """pipeline:// URL for a file when the current step keeps its outputs local, else None."""
+    mode = _output_mode.get()
+    if mode is None or mode[0] is None or mode[2]:
+        return None
+    return mode[0].publish(file_path, mode[1])
+
+def remember_output(url, file_path):
+    """Let later pipeline steps read an uploaded output from local disk."""
+    mode = _output_mode.get()
+    if mode is None or mode[0] is None or not os.path.exists(file_path):
+        return
+    mode[0].register(url, mode[0].keep(file_path, mode[1]))
+
+def resolve_input(url):
+    """
+    Return a local path for a shared URL, otherwise the URL itself.
+
+    For services that read their input straight from the URL (ffprobe,
+    single-frame extraction): inside a batch they reuse the shared download.
+    """
+    shared = current_shared_inputs()
+    if shared is None or not shared.shares(url):
+        return url
+    from services.file_management import fetch_file
+    return shared.local_path(url, fetch_file)
+
+def _identity(target):
+    try:
+        st = os.stat(target)
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    except (OSError, TypeError, ValueError):
+        return target
+
+def run_probe(cmd, target):
+    """
+    Run an ffprobe command whose input is `target` (last use in cmd).
+
+    Inside shared_inputs the result is reused by every command that probes
+    the same file (or a hard link of it) with the same options.
+    """
+    shared = current_shared_inputs()
+    if shared is None:
+        return run_subprocess(cmd, capture_output=True, text=True)
+    options = tuple(arg for arg in cmd if arg != target)
+    return shared.memo(("probe", options, _identity(target)), lambda: run_subprocess(cmd, capture_output=True, text=True))
@@ -0,0 +1,122 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import logging
+from config import STREAM_INPUT_ENABLED, HTTP_READ_TIMEOUT, COST_PROBE_TIMEOUT
+from services.http_client import get_session
+from services.file_management import download_file, resolve_extension
+from services.shared_inputs import current_shared_inputs
+
+logger = logging.getLogger(__name__)
+
+# FFmpeg http protocol options: reconnect dropped connections (at the same
+# offset) and give up on a silent server like the Python downloads do
+STREAM_OPTIONS = {
+    "reconnect": "1",
+    "reconnect_delay_max": "5",
+    "rw_timeout": str(int(HTTP_READ_TIMEOUT * 1000000))
+}
+
+class MediaInput:
+    """
+    Where FFmpeg reads an input from: the source URL itself (streamed) or a
+    downloaded local file.
+
+    Attributes:
+        path (str): What to pass to -i
+        options (dict): Input options to put before -i
+        extension (str): Extension of the input, including the dot
+        streamed (bool): True when FFmpeg reads the URL directly
+    """
+
+    def __init__(self, path, extension, streamed):
+        self.path = path
+        self.extension = extension
+        self.streamed = streamed
+        self.options = dict(STREAM_OPTIONS) if streamed else {}
+
+    @property
+    def local_path(self):
+        """The downloaded file the caller has to remove, or None."""
+        return None if self.streamed else self.path
+
+    def option_args(self):
+        """The input options as command line arguments (for ffprobe)."""
+        args = []
+        for key, value in self.options.items():
+            args += [f"-{key}", value]
+        return args
+
+    def args(self, seek=None):
+        """Command line arguments that open the input, with input seeking to `seek` seconds."""
+        args = self.option_args()
+        if seek:
+            args += ["-ss", str(seek)]
+        return args + ["-i", self.path]
+
+    def remove(self):
+        if self.local_path and os.path.exists(self.local_path):
+            os.remove(self.local_path)
+
+def _probe_ranges(url):
+    """
+    Response headers of `url` when it serves byte ranges, else None.
+
+    A one-byte GET rather than a HEAD: signed URLs are often valid for GET only.
+    """
+    try:
+        with get_session().get(url, headers={"Range": "bytes=0-0"}, stream=True,
+                               allow_redirects=True, timeout=COST_PROBE_TIMEOUT) as response:
+            if response.status_code == 206 and response.headers.get("Content-Range"):
+                return response.headers
+            logger.info(f"[STREAM_INPUT] {url.split('?')[0]} answered a Range request with HTTP {response.status_code}")
+    except Exception as e:
+        logger.info(f"[STREAM_INPUT] Range probe of {url.split('?')[0]} failed: {str(e)}")
+    return None
+
+def open_input(url, storage_path, stream=None):
+    """
+    Open a media input for FFmpeg, streamed from its URL when possible.
+
+    FFmpeg reads the URL itself when streaming is requested (`stream`, or
+    STREAM_INPUT_ENABLED when None) and the server serves byte ranges, so
+    input seeking fetches only the ranges it needs. Everything else falls
+    back to downloading the whole file first, as download_file does:
+    servers without ranges, inputs shared by a batch, and inputs whose
+    format cannot be told from the URL or the response.
+
+    Returns:
+        MediaInput
+    """
+    stream = STREAM_INPUT_ENABLED if stream is None else stream
+    shared = current_shared_inputs()
+    if stream and url.startswith(("http://", "https://")) and not (shared is not None and shared.shares(url)):
+        headers = _probe_ranges(url)
+        if headers is not None:
+            extension = resolve_extension(url, {
+                "content_type": headers.get("Content-Type"),
+                "content_disposition": headers.get("Content-Disposition")
+            })
+            if extension:
+                logger.info(f"[STREAM_INPUT] Streaming {url.split('?')[0]} into FFmpeg")
+                return MediaInput(url, extension, streamed=True)
+        logger.info(f"[STREAM_INPUT] Downloading {url.split('?')[0]} first")
+
+    local_path = download_file(url, storage_path)
+    return MediaInput(local_path, os.path.splitext(local_path)[1], streamed=False)
@@ -20,7 +20,8 @@ import os
 import subprocess
 import json
 import re
-from services.file_management import download_file
+from services.file_management import download_files
+from services.job_control import run_subprocess
 from config import LOCAL_STORAGE_PATH
 
 def get_extension_from_format(format_name):
@@ -58,7 +59,7 @@ def get_metadata(filename, metadata_requests, job_id):
             thumbnail_filename
         ]
         try:
-            subprocess.run(thumbnail_command, check=True, capture_output=True, text=True)
+            run_subprocess(thumbnail_command, check=True, capture_output=True, text=True)
             if os.path.exists(thumbnail_filename):
                 metadata['thumbnail'] = thumbnail_filename  # Return local path instead of URL
         except subprocess.CalledProcessError as e:
@@ -76,7 +77,7 @@ def get_metadata(filename, metadata_requests, job_id):
             '-show_streams',
             filename
         ]
-        result = subprocess.run(ffprobe_command, capture_output=True, text=True)
+        result = run_subprocess(ffprobe_command, capture_output=True, text=True)
         probe_data = json.loads(result.stdout)
         
         if metadata_requests.get('duration'):
@@ -106,32 +107,41 @@ def process_ffmpeg_compose(data, job_id):
         if "argument" in option and option["argument"] is not None:
             command.append(str(option["argument"]))
     
+    # Download the inputs and the subtitles files of the filters all at once
+    # Regex: subtitles='<url>' or subtitles="<url>"
+    subtitles_pattern = r"subtitles=['\"]([^'\"]+)"
+    subtitles_urls = [
+        url for filter_obj in data.get("filters") or []
+        for url in re.findall(subtitles_pattern, filter_obj["filter"])
+    ]
+    local_paths = download_files(
+        [(input_data["file_url"], LOCAL_STORAGE_PATH) for input_data in data["inputs"]]
+        + [(url, LOCAL_STORAGE_PATH) for url in subtitles_urls]
+    )
+    input_paths = local_paths[:len(data["inputs"])]
+    subtitles_paths = local_paths[len(data["inputs"]):]  # Track downloaded subtitles/filter files
+
     # Add inputs
-    input_paths = []
-    for input_data in data["inputs"]:
+    for input_data, input_path in zip(data["inputs"], input_paths):
         if "options" in input_data:
             for option in input_data["options"]:
                 command.append(option["option"])
                 if "argument" in option and option["argument"] is not None:
                     command.append(str(option["argument"]))
-        input_path = download_file(input_data["file_url"], LOCAL_STORAGE_PATH)
-        input_paths.append(input_path)
         command.extend(["-i", input_path])
     
     # Add filters
-    subtitles_paths = []  # Track downloaded subtitles/filter files
     if data.get("filters"):
         new_filters = []
+        # re.sub visits the matches in the order re.findall listed them
+        next_subtitles_path = iter(subtitles_paths)
         for filter_obj in data["filters"]:
             filter_str = filter_obj["filter"]
             def replace_subtitles_url(match):
-                url = match.group(1)
-                local_path = download_file(url, LOCAL_STORAGE_PATH)
-                subtitles_paths.append(local_path)
+                local_path = next(next_subtitles_path)
                 fixed_path = local_path.replace('\\', '/')
                 return f"subtitles='{fixed_path}"  # keep the opening quote
-            # Regex: subtitles='<url>' or subtitles="<url>"
-            filter_str = re.sub(r"subtitles=['\"]([^'\"]+)", replace_subtitles_url, filter_str)
+            filter_str = re.sub(subtitles_pattern, replace_subtitles_url, filter_str)
             new_filters.append(filter_str)
         filter_complex = ";".join(new_filters)
         command.extend(["-filter_complex", filter_complex])
@@ -156,7 +166,7 @@ def process_ffmpeg_compose(data, job_id):
     
     # Execute FFmpeg command
     try:
-        subprocess.run(command, check=True, capture_output=True, text=True)
+        run_subprocess(command, check=True, capture_output=True, text=True)
     except subprocess.CalledProcessError as e:
         raise Exception(f"FFmpeg command failed: {e.stderr}")
     
@@ -16,12 +16,12 @@
 
 import os
 import logging
-import requests
 import json
 from google.cloud import storage
 from google.oauth2 import service_account
 from urllib.parse import urlparse, unquote
 import uuid
+from services.http_client import get_session
 
 logger = logging.getLogger(__name__)
 
@@ -76,7 +76,7 @@ def stream_upload_to_gcs(file_url, custom_filename=None, make_public=False, down
         blob = bucket.blob(filename)
 
         # Stream the file from URL
-        response = requests.get(file_url, stream=True, headers=download_headers)
+        response = get_session().get(file_url, stream=True, headers=download_headers)
         response.raise_for_status()
 
         # Get content type from response headers
@@ -18,14 +18,15 @@ import os
 import ffmpeg
 import subprocess
 import logging
-from services.file_management import download_file
+from services.stream_input import open_input
+from services.job_control import run_ffmpeg
 from config import LOCAL_STORAGE_PATH
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def process_media_convert(media_url, job_id, output_format='mp4', video_codec='libx264', video_preset='medium', video_crf=23, audio_codec='aac', audio_bitrate='128k', webhook_url=None):
+def process_media_convert(media_url, job_id, output_format='mp4', video_codec='libx264', video_preset='medium', video_crf=23, audio_codec='aac', audio_bitrate='128k', webhook_url=None, stream_input=None):
     """
     Convert media to specified format with customizable encoding settings.
     
@@ -39,17 +40,20 @@ def process_media_convert(media_url, job_id, output_format='mp4', video_codec='l
         audio_codec (str): Audio codec to use (default: 'aac')
         audio_bitrate (str): Audio bitrate (default: '128k')
         webhook_url (str, optional): URL to send completion webhook
+        stream_input (bool, optional): Read the media straight from its URL
+            when the server allows it (default: STREAM_INPUT_ENABLED)
         
     Returns:
         str: Path to the converted output file
     """
-    input_filename = download_file(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
+    media_input = open_input(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"), stream_input)
+    input_filename = media_input.local_path
     output_filename = f"{job_id}.{output_format}"
     output_path = os.path.join(LOCAL_STORAGE_PATH, output_filename)
 
     try:
         # Set up the ffmpeg conversion
-        stream = ffmpeg.input(input_filename)
+        stream = ffmpeg.input(media_input.path, **media_input.options)
         output_options = {}
         
         # Add format if specified
@@ -102,10 +106,10 @@ def process_media_convert(media_url, job_id, output_format='mp4', video_codec='l
         logger.info(f"Running ffmpeg command: {' '.join(cmd)}")
         
         # Run the conversion
-        ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
+        run_ffmpeg(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
         
         # Clean up input file
-        os.remove(input_filename)
+        media_input.remove()
         logger.info(f"Media conversion successful: {output_path} to format {output_format}")
 
         # Ensure the output file exists locally before attempting upload
@@ -127,7 +131,7 @@ def process_media_convert(media_url, job_id, output_format='mp4', video_codec='l
             raise Exception(f"{error_msg} - {detailed_error}")
         
         # Clean up input file if it exists
-        if 'input_filename' in locals() and os.path.exists(input_filename):
+        if input_filename and os.path.exists(input_filename):
             try:
                 os.remove(input_filename)
                 logger.info(f"Cleaned up input file: {input_filename}")
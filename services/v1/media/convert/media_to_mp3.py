@@ -19,18 +19,23 @@
 import os
 import ffmpeg
 import requests
-from services.file_management import download_file
+from services.stream_input import open_input
+from services.job_control import run_ffmpeg
 from config import LOCAL_STORAGE_PATH
 
-def process_media_to_mp3(media_url, job_id, bitrate='128k', sample_rate=None):
-    """Convert media to MP3 format with specified bitrate and sample rate."""
-    input_filename = download_file(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
+def process_media_to_mp3(media_url, job_id, bitrate='128k', sample_rate=None, stream_input=None):
+    """Convert media to MP3 format with specified bitrate and sample rate.
+
+    With stream_input (default: STREAM_INPUT_ENABLED) FFmpeg reads the
+    media straight from its URL when the server allows it.
+    """
+    media_input = open_input(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"), stream_input)
     output_filename = f"{job_id}.mp3"
     output_path = os.path.join(LOCAL_STORAGE_PATH, output_filename)
 
     try:
         # Build the ffmpeg command
-        stream = ffmpeg.input(input_filename)
+        stream = ffmpeg.input(media_input.path, **media_input.options)
         output_options = {'acodec': 'libmp3lame', 'audio_bitrate': bitrate}
         
         # Only set sample rate if provided
@@ -38,13 +43,13 @@ def process_media_to_mp3(media_url, job_id, bitrate='128k', sample_rate=None):
             output_options['ar'] = sample_rate
             
         # Convert media file to MP3 with specified options
-        (
+        run_ffmpeg(
             stream
             .output(output_path, **output_options)
-            .overwrite_output()
-            .run(capture_stdout=True, capture_stderr=True)
+            .overwrite_output(),
+            capture_stdout=True, capture_stderr=True
         )
-        os.remove(input_filename)
+        media_input.remove()
         sample_rate_info = f" and sample rate {sample_rate}Hz" if sample_rate is not None else ""
         print(f"Conversion successful: {output_path} with bitrate {bitrate}{sample_rate_info}")
 
@@ -17,7 +17,6 @@
 
 
 import os
-import whisper
 import srt
 import json
 from datetime import timedelta
@@ -25,6 +24,7 @@ from whisper.utils import WriteSRT, WriteVTT
 from services.file_management import download_file
 import logging
 from config import LOCAL_STORAGE_PATH
+from services.process_pool import run_in_process, whisper_transcribe
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -137,9 +137,7 @@ def process_transcribe_media(media_url, task, include_text, include_srt, include
         # Load a larger model for better translation quality
         #model_size = "large" if task == "translate" else "base"
         model_size = "base"
-        logger.info(f"Job {job_id}: [05] Carregando modelo Whisper | Modelo: {model_size}")
-        model = whisper.load_model(model_size)
-        logger.info(f"Job {job_id}: [05] Modelo carregado com sucesso")
+        logger.info(f"Job {job_id}: [05] Modelo Whisper: {model_size} (carregado no process pool)")
 
         # Configure transcription/translation options
         options = {
@@ -153,7 +151,7 @@ def process_transcribe_media(media_url, task, include_text, include_srt, include
             options["language"] = language
         
         logger.info(f"Job {job_id}: [06] Executando transcrição | Idioma: {language or 'auto'} | Word timestamps: {word_timestamps}")
-        result = model.transcribe(input_filename, **options)
+        result = run_in_process(whisper_transcribe, model_size, input_filename, **options)
         logger.info(f"Job {job_id}: [06] Transcrição concluída")
         
         # For translation task, the result['text'] will be in English
@@ -236,7 +234,7 @@ def process_transcribe_media(media_url, task, include_text, include_srt, include
         if include_segments is True:
             logger.info(f"Job {job_id}: [09] Sanitizando segmentos | Total: {len(result.get('segments', []))} segmentos | Word timestamps: {word_timestamps}")
             # Limpar segmentos para garantir serialização JSON segura
-            segments_json = clean_segments_for_json(result['segments'], word_timestamps)
+            segments_json = run_in_process(clean_segments_for_json, result['segments'], word_timestamps)
             logger.info(f"Job {job_id}: [09] Segmentos sanitizados | Total: {len(segments_json)} segmentos válidos")
 
         os.remove(input_filename)
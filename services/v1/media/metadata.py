@@ -17,11 +17,11 @@
 
 
 import os
-import subprocess
 import json
 import logging
-import requests
 from config import LOCAL_STORAGE_PATH
+from services.shared_inputs import resolve_input, run_probe
+from services.http_client import get_session
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -45,14 +45,20 @@ def get_media_metadata(media_url, job_id=None):
         # Initialize metadata dictionary
         metadata = {}
 
-        # Get file size from HTTP HEAD request (without downloading)
-        try:
-            head_response = requests.head(media_url, allow_redirects=True, timeout=10)
-            if 'content-length' in head_response.headers:
-                metadata['filesize'] = int(head_response.headers['content-length'])
-                metadata['filesize_mb'] = round(metadata['filesize'] / (1024 * 1024), 2)  # Convert to MB
-        except Exception as e:
-            logger.warning(f"Could not retrieve file size from HEAD request: {str(e)}")
+        # Inside a batch the input may already be on local disk
+        media_input = resolve_input(media_url)
+        if media_input != media_url:
+            metadata['filesize'] = os.path.getsize(media_input)
+            metadata['filesize_mb'] = round(metadata['filesize'] / (1024 * 1024), 2)
+        else:
+            # Get file size from HTTP HEAD request (without downloading)
+            try:
+                head_response = get_session().head(media_url, allow_redirects=True, timeout=10)
+                if 'content-length' in head_response.headers:
+                    metadata['filesize'] = int(head_response.headers['content-length'])
+                    metadata['filesize_mb'] = round(metadata['filesize'] / (1024 * 1024), 2)  # Convert to MB
+            except Exception as e:
+                logger.warning(f"Could not retrieve file size from HEAD request: {str(e)}")
 
         # Run ffprobe directly on the URL with reduced probing
         ffprobe_command = [
@@ -63,11 +69,11 @@ def get_media_metadata(media_url, job_id=None):
             '-show_streams',
             '-analyzeduration', '100K',
             '-probesize', '100K',
-            media_url
+            media_input
         ]
 
         logger.info(f"Running ffprobe command on URL")
-        result = subprocess.run(ffprobe_command, capture_output=True, text=True)
+        result = run_probe(ffprobe_command, media_input)
 
         if result.returncode != 0:
             logger.error(f"Error during ffprobe: {result.stderr}")
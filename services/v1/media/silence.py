@@ -21,14 +21,15 @@ import json
 import subprocess
 import logging
 import re
-from services.file_management import download_file
+from services.stream_input import open_input
+from services.job_control import run_subprocess
 from config import LOCAL_STORAGE_PATH
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-30dB", min_duration=0.5, mono=False, job_id=None):
+def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-30dB", min_duration=0.5, mono=False, job_id=None, stream_input=None):
     """
     Detect silence in media files using FFmpeg's silencedetect filter.
     
@@ -40,18 +41,26 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
         min_duration (float, optional): Minimum silence duration to detect in seconds
         mono (bool, optional): Whether to convert stereo to mono before analysis
         job_id (str, optional): Unique job identifier
+        stream_input (bool, optional): Read the media straight from its URL
+            when the server allows it, only between start_time and end_time;
+            silences crossing those bounds are then cut at them
+            (default: STREAM_INPUT_ENABLED)
         
     Returns:
         list: List of dictionaries containing silence intervals with start, end, and duration
     """
     logger.info(f"Starting silence detection for media URL: {media_url}")
-    input_filename = download_file(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
-    logger.info(f"Downloaded media to local file: {input_filename}")
+    media_input = open_input(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"), stream_input)
+    input_filename = media_input.local_path
+    if media_input.streamed:
+        logger.info("Streaming media from its URL")
+    else:
+        logger.info(f"Downloaded media to local file: {input_filename}")
     
     try:
         # For reliable silence detection with time constraints, we need a different approach
         # We'll use FFmpeg without any time constraints and process the results later
-        cmd = ['ffmpeg', '-i', input_filename]
+        cmd = ['ffmpeg']
         
         # We won't use audio trim filters as they're causing issues with silence detection
         # Instead, we'll filter the results after the analysis is complete
@@ -78,6 +87,18 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
                 logger.info(f"Will filter results ending at {end_seconds} seconds")
             except ValueError:
                 logger.warning(f"Could not parse end time '{end_time}', using infinity")
+
+        # A streamed input is only read between start and end: input seeking
+        # skips what comes before, -t stops after. FFmpeg then reports times
+        # from the seek point, shifted back below
+        offset = 0
+        if media_input.streamed:
+            offset = start_seconds
+            cmd.extend(media_input.args(seek=start_seconds or None))
+            if end_seconds != float('inf'):
+                cmd.extend(['-t', str(end_seconds - start_seconds)])
+        else:
+            cmd.extend(media_input.args())
             
         # Add audio processing options
         cmd.extend(['-af'])
@@ -102,7 +123,7 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
         logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
         
         # Run the FFmpeg command and capture stderr for silence detection output
-        result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+        result = run_subprocess(cmd, stderr=subprocess.PIPE, text=True)
         
         # Parse the silence detection output
         silence_intervals = []
@@ -124,8 +145,8 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
             start = silence_starts[i] if i < len(silence_starts) else "0.0"
             
             # Convert to float 
-            start_time_float = float(start) 
-            end_time_float = float(end)
+            start_time_float = float(start) + offset
+            end_time_float = float(end) + offset
             duration_float = float(duration)
             
             # Filter the results based on the specified time range
@@ -152,16 +173,16 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
             })
         
         # Clean up the downloaded file
-        os.remove(input_filename)
-        logger.info(f"Removed local file: {input_filename}")
+        if input_filename:
+            os.remove(input_filename)
+            logger.info(f"Removed local file: {input_filename}")
         
         return silence_intervals
         
     except Exception as e:
         logger.error(f"Silence detection failed: {str(e)}")
         # Make sure to clean up even on error
-        if os.path.exists(input_filename):
-            os.remove(input_filename)
+        media_input.remove()
         raise
 
 def format_time(seconds):
@@ -19,10 +19,10 @@
 import os
 import boto3
 import logging
-import requests
 from urllib.parse import urlparse, unquote, quote
 import uuid
 import re
+from services.http_client import get_session, iter_content
 
 logger = logging.getLogger(__name__)
 
@@ -92,7 +92,7 @@ def stream_upload_to_s3(file_url, custom_filename=None, make_public=False, downl
         upload_id = multipart_upload['UploadId']
         
         # Stream the file from URL
-        response = requests.get(file_url, stream=True, headers=download_headers)
+        response = get_session().get(file_url, stream=True, headers=download_headers)
         response.raise_for_status()
         
         # Process in chunks using multipart upload
@@ -102,7 +102,7 @@ def stream_upload_to_s3(file_url, custom_filename=None, make_public=False, downl
         
         buffer = bytearray()
         
-        for chunk in response.iter_content(chunk_size=1024 * 1024):  # 1MB read chunks
+        for chunk in iter_content(response, chunk_size=1024 * 1024):  # 1MB read chunks
             buffer.extend(chunk)
             
             # When we have enough data for a part, upload it
@@ -19,48 +19,46 @@
 import os
 import ffmpeg
 import requests
-from services.file_management import download_file
-from config import LOCAL_STORAGE_PATH
+from services.file_management import download_files
+from services.job_control import run_ffmpeg
 
-def process_video_concatenate(media_urls, job_id, webhook_url=None):
-    """Combine multiple videos into one."""
-    input_files = []
-    output_filename = f"{job_id}.mp4"
-    output_path = os.path.join(LOCAL_STORAGE_PATH, output_filename)
+def process_video_concatenate(media_urls, job_id, workspace, webhook_url=None):
+    """
+    Combine multiple videos into one.
 
+    Inputs, the concat list (on the RAM tier when available) and the output
+    live in `workspace` (a services.workspace.JobWorkspace), which removes
+    them once the caller has uploaded the output.
+    """
     try:
         # Download all media files
-        for i, media_item in enumerate(media_urls):
-            url = media_item['video_url']
-            input_filename = download_file(url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input_{i}"))
-            input_files.append(input_filename)
+        input_files = download_files(
+            (media_item['video_url'], workspace.root)
+            for i, media_item in enumerate(media_urls)
+        )
+        workspace.check_quota()
 
         # Generate an absolute path concat list file for FFmpeg
-        concat_file_path = os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_concat_list.txt")
+        concat_lines = [f"file '{os.path.abspath(input_file)}'\n" for input_file in input_files]
+        concat_file_path = workspace.path("concat_list.txt", ram=True, size_hint=sum(len(line) for line in concat_lines))
         with open(concat_file_path, 'w') as concat_file:
-            for input_file in input_files:
-                # Write absolute paths to the concat list
-                concat_file.write(f"file '{os.path.abspath(input_file)}'\n")
+            concat_file.writelines(concat_lines)
 
         # Use the concat demuxer to concatenate the videos
-        (
+        output_path = workspace.output_path(f"{job_id}.mp4")
+        run_ffmpeg(
             ffmpeg.input(concat_file_path, format='concat', safe=0).
-                output(output_path, c='copy').
-                run(overwrite_output=True)
+                output(output_path, c='copy'),
+            overwrite_output=True
         )
 
-        # Clean up input files
-        for f in input_files:
-            os.remove(f)
-            
-        os.remove(concat_file_path)  # Remove the concat list file after the operation
-
         print(f"Video combination successful: {output_path}")
 
         # Check if the output file exists locally before upload
         if not os.path.exists(output_path):
             raise FileNotFoundError(f"Output file {output_path} does not exist after combination.")
 
+        workspace.add_output(output_path)
         return output_path
     except Exception as e:
         print(f"Video combination failed: {str(e)}")
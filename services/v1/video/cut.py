@@ -18,11 +18,12 @@
 
 import os
 import json
-import subprocess
 import logging
 import uuid
 import tempfile
 from services.file_management import download_file
+from services.job_control import run_subprocess
+from services.shared_inputs import run_probe
 from services.cloud_storage import upload_file
 from config import LOCAL_STORAGE_PATH
 
@@ -92,7 +93,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
             '-of', 'default=noprint_wrappers=1:nokey=1',
             input_filename
         ]
-        duration_result = subprocess.run(probe_cmd, capture_output=True, text=True)
+        duration_result = run_probe(probe_cmd, input_filename)
         try:
             file_duration = float(duration_result.stdout.strip())
             logger.info(f"File duration: {file_duration} seconds")
@@ -147,7 +148,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
                 '-c', 'copy',
                 output_filename
             ]
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
+            run_subprocess(cmd, check=True, capture_output=True, text=True)
         else:
             # Switch to a different approach: extract segments and concatenate
             segment_files = []
@@ -180,7 +181,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
                         segment_file
                     ]
                     logger.info(f"Extracting segment {i}: {' '.join(cmd)}")
-                    process = subprocess.run(cmd, capture_output=True, text=True)
+                    process = run_subprocess(cmd, capture_output=True, text=True)
                     
                     if process.returncode != 0:
                         logger.error(f"Error during segment {i} extraction: {process.stderr}")
@@ -210,7 +211,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
                     segment_file
                 ]
                 logger.info(f"Extracting final segment: {' '.join(cmd)}")
-                process = subprocess.run(cmd, capture_output=True, text=True)
+                process = run_subprocess(cmd, capture_output=True, text=True)
                 
                 if process.returncode != 0:
                     logger.error(f"Error during final segment extraction: {process.stderr}")
@@ -244,7 +245,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
                     output_filename
                 ]
                 logger.info(f"Concatenating segments: {' '.join(cmd)}")
-                process = subprocess.run(cmd, capture_output=True, text=True)
+                process = run_subprocess(cmd, capture_output=True, text=True)
                 
                 if process.returncode != 0:
                     logger.error(f"Error during concatenation: {process.stderr}")
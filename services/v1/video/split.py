@@ -18,10 +18,12 @@
 
 import os
 import json
-import subprocess
 import logging
 import uuid
-from services.file_management import download_file
+import shutil
+from services.stream_input import open_input
+from services.job_control import run_subprocess
+from services.shared_inputs import run_probe
 from services.cloud_storage import upload_file
 from config import LOCAL_STORAGE_PATH
 
@@ -53,7 +55,7 @@ def time_to_seconds(time_str):
         raise ValueError(f"Invalid time format: {time_str}. Expected HH:MM:SS[.mmm]")
 
 def split_video(video_url, splits, job_id=None, video_codec='libx264', video_preset='medium', 
-               video_crf=23, audio_codec='aac', audio_bitrate='128k'):
+               video_crf=23, audio_codec='aac', audio_bitrate='128k', stream_input=None):
     """
     Splits a video file into multiple segments with customizable encoding settings.
     
@@ -66,22 +68,30 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
         video_crf (int, optional): Constant Rate Factor for quality (0-51, default: 23)
         audio_codec (str, optional): Audio codec to use for encoding (default: 'aac')
         audio_bitrate (str, optional): Audio bitrate (default: '128k')
+        stream_input (bool, optional): Read the video straight from its URL
+            when the server allows it; each split then fetches only its own
+            byte ranges (default: STREAM_INPUT_ENABLED)
         
     Returns:
-        tuple: (list of output file paths, input file path)
+        tuple: (list of output file paths, input file path), the input file
+        path is None when the video was streamed
     """
     logger.info(f"Starting video split operation for {video_url}")
     if not job_id:
         job_id = str(uuid.uuid4())
         
-    input_filename = download_file(video_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
-    logger.info(f"Downloaded video to local file: {input_filename}")
+    media_input = open_input(video_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"), stream_input)
+    input_filename = media_input.local_path
+    if media_input.streamed:
+        logger.info("Streaming video from its URL")
+    else:
+        logger.info(f"Downloaded video to local file: {input_filename}")
     
     output_files = []
     
     try:
         # Get the file extension
-        _, ext = os.path.splitext(input_filename)
+        ext = media_input.extension
         
         # Get the duration of the input file
         probe_cmd = [
@@ -89,9 +99,10 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
             '-v', 'error', 
             '-show_entries', 'format=duration', 
             '-of', 'default=noprint_wrappers=1:nokey=1',
-            input_filename
+            *media_input.option_args(),
+            media_input.path
         ]
-        duration_result = subprocess.run(probe_cmd, capture_output=True, text=True)
+        duration_result = run_probe(probe_cmd, media_input.path)
         
         try:
             file_duration = float(duration_result.stdout.strip())
@@ -136,12 +147,13 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
             # Create output filename for this split
             output_filename = os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_split_{index+1}{ext}")
             
-            # Create FFmpeg command to extract the segment
+            # Create FFmpeg command to extract the segment. Input seeking
+            # skips what comes before the segment without decoding (or
+            # reading, when streamed) it; re-encoding keeps the cut exact
             cmd = [
                 'ffmpeg',
-                '-i', input_filename,
-                '-ss', str(start_seconds),
-                '-to', str(end_seconds),
+                *media_input.args(seek=start_seconds),
+                '-t', str(end_seconds - start_seconds),
                 '-c:v', video_codec,
                 '-preset', video_preset,
                 '-crf', str(video_crf),
@@ -154,7 +166,7 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
             logger.info(f"Running FFmpeg command for split {index+1}: {' '.join(cmd)}")
             
             # Run the FFmpeg command
-            process = subprocess.run(cmd, capture_output=True, text=True)
+            process = run_subprocess(cmd, capture_output=True, text=True)
             
             if process.returncode != 0:
                 logger.error(f"Error processing split {index+1}: {process.stderr}")
@@ -171,8 +183,8 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
         logger.error(f"Video split operation failed: {str(e)}")
         
         # Clean up all temporary files if they exist
-        if 'input_filename' in locals() and os.path.exists(input_filename):
-            os.remove(input_filename)
+        if input_filename:
+            shutil.rmtree(os.path.dirname(input_filename), ignore_errors=True)
                 
         for output_file in output_files:
             if os.path.exists(output_file):
@@ -19,6 +19,8 @@
 import os
 import ffmpeg
 from config import LOCAL_STORAGE_PATH
+from services.shared_inputs import resolve_input
+from services.job_control import run_ffmpeg
 
 def extract_thumbnail(video_url, job_id, second=0):
     """
@@ -39,12 +41,12 @@ def extract_thumbnail(video_url, job_id, second=0):
     try:
         # Extract thumbnail directly from URL using ffmpeg streaming
         # analyzeduration and probesize are set low to reduce initial buffering
-        (
+        run_ffmpeg(
             ffmpeg
-            .input(video_url, ss=second, analyzeduration='100K', probesize='100K')
+            .input(resolve_input(video_url), ss=second, analyzeduration='100K', probesize='100K')
             .output(thumbnail_path, vframes=1, update=1)
-            .overwrite_output()
-            .run(capture_stdout=True, capture_stderr=True)
+            .overwrite_output(),
+            capture_stdout=True, capture_stderr=True
         )
 
         # Ensure the thumbnail file exists
@@ -18,10 +18,11 @@
 
 import os
 import json
-import subprocess
 import logging
 import uuid
-from services.file_management import download_file
+from services.stream_input import open_input
+from services.job_control import run_subprocess
+from services.shared_inputs import run_probe
 from services.cloud_storage import upload_file
 from config import LOCAL_STORAGE_PATH
 
@@ -56,7 +57,7 @@ def time_to_seconds(time_str):
         raise ValueError(f"Invalid time format: {time_str}. Expected HH:MM:SS[.mmm]")
 
 def trim_video(video_url, start=None, end=None, job_id=None, video_codec='libx264', video_preset='medium', 
-               video_crf=23, audio_codec='aac', audio_bitrate='128k'):
+               video_crf=23, audio_codec='aac', audio_bitrate='128k', stream_input=None):
     """
     Trims a video by removing specified portions from the beginning and/or end with customizable encoding settings.
     
@@ -70,20 +71,27 @@ def trim_video(video_url, start=None, end=None, job_id=None, video_codec='libx26
         video_crf (int, optional): Constant Rate Factor for quality (0-51, default: 23)
         audio_codec (str, optional): Audio codec to use for encoding (default: 'aac')
         audio_bitrate (str, optional): Audio bitrate (default: '128k')
+        stream_input (bool, optional): Read the video straight from its URL
+            when the server allows it (default: STREAM_INPUT_ENABLED)
         
     Returns:
-        tuple: (output_filename, input_filename)
+        tuple: (output_filename, input_filename), input_filename is None
+        when the video was streamed
     """
     logger.info(f"Starting video trim operation for {video_url}")
     if not job_id:
         job_id = str(uuid.uuid4())
         
-    input_filename = download_file(video_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
-    logger.info(f"Downloaded video to local file: {input_filename}")
+    media_input = open_input(video_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"), stream_input)
+    input_filename = media_input.local_path
+    if media_input.streamed:
+        logger.info("Streaming video from its URL")
+    else:
+        logger.info(f"Downloaded video to local file: {input_filename}")
     
     try:
         # Get the file extension
-        _, ext = os.path.splitext(input_filename)
+        ext = media_input.extension
         
         # Create output filename
         output_filename = os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_output{ext}")
@@ -94,9 +102,10 @@ def trim_video(video_url, start=None, end=None, job_id=None, video_codec='libx26
             '-v', 'error', 
             '-show_entries', 'format=duration', 
             '-of', 'default=noprint_wrappers=1:nokey=1',
-            input_filename
+            *media_input.option_args(),
+            media_input.path
         ]
-        duration_result = subprocess.run(probe_cmd, capture_output=True, text=True)
+        duration_result = run_probe(probe_cmd, media_input.path)
         
         try:
             file_duration = float(duration_result.stdout.strip())
@@ -121,17 +130,16 @@ def trim_video(video_url, start=None, end=None, job_id=None, video_codec='libx26
         if start_seconds is not None and end_seconds is not None and start_seconds >= end_seconds:
             raise ValueError(f"Invalid trim: start time ({start}) must be before end time ({end})")
         
-        # Prepare FFmpeg command based on trim parameters
-        cmd = ['ffmpeg', '-i', input_filename]
+        # Prepare FFmpeg command based on trim parameters. Input seeking
+        # (-ss before -i) skips to the start without decoding, or reading
+        # when streamed, everything before it; re-encoding keeps it exact
+        cmd = ['ffmpeg'] + media_input.args(seek=start_seconds if start_seconds > 0 else None)
         
         filter_applied = False
         
         if start_seconds > 0 or end_seconds < file_duration:
             # We need to trim the video
             logger.info(f"Trimming video from {start_seconds}s to {end_seconds}s")
-            
-            if start_seconds > 0:
-                cmd.extend(['-ss', str(start_seconds)])
                 
             if end_seconds < file_duration:
                 duration = end_seconds - (start_seconds or 0)
@@ -156,7 +164,7 @@ def trim_video(video_url, start=None, end=None, job_id=None, video_codec='libx26
         logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
         
         # Run the FFmpeg command
-        process = subprocess.run(cmd, capture_output=True, text=True)
+        process = run_subprocess(cmd, capture_output=True, text=True)
         
         if process.returncode != 0:
             logger.error(f"Error during trim: {process.stderr}")
@@ -169,8 +177,7 @@ def trim_video(video_url, start=None, end=None, job_id=None, video_codec='libx26
         logger.error(f"Video trim operation failed: {str(e)}")
         
         # Clean up all temporary files if they exist
-        if 'input_filename' in locals() and os.path.exists(input_filename):
-            os.remove(input_filename)
+        media_input.remove()
                 
         if 'output_filename' in locals() and os.path.exists(output_filename):
             os.remove(output_filename)
@@ -0,0 +1,181 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import re
+import sys
+import time
+import threading
+import traceback
+import logging
+from config import (
+    WATCHDOG_ENABLED, WATCHDOG_INTERVAL, WATCHDOG_SLOW_FACTOR,
+    WATCHDOG_MIN_SECONDS, WATCHDOG_CANCEL_FACTOR
+)
+from services.job_control import running_jobs, while_running, cancel_job, stage_timings
+from services.job_eta import estimate_run_seconds
+from services.job_progress import read_progress
+from services.job_status_store import get_job_status_store
+
+logger = logging.getLogger(__name__)
+
+# Snapshots per job: at the slow threshold, then at 2x and 4x of it
+MAX_SNAPSHOTS = 3
+STACK_FRAMES = 30
+CPU_SAMPLE_SECONDS = 0.5
+# Signed URLs in FFmpeg command lines
+URL_QUERY = re.compile(r"(https?://[^\s?#]+)[?#]\S*")
+
+def _thread_stack(thread_id):
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return None
+    return "".join(traceback.format_stack(frame)[-STACK_FRAMES:])
+
+def _process_info(proc):
+    info = {"pid": proc.pid}
+    with proc.oneshot():
+        info["name"] = proc.name()
+        info["status"] = proc.status()
+        info["cmdline"] = URL_QUERY.sub(r"\1?...", " ".join(proc.cmdline()))[:1000]
+        cpu = proc.cpu_times()
+        info["cpu_seconds"] = round(cpu.user + cpu.system, 1)
+        info["rss_mb"] = round(proc.memory_info().rss / (1024 * 1024), 1)
+        info["threads"] = proc.num_threads()
+        try:
+            io = proc.io_counters()
+            info["read_bytes"] = io.read_bytes
+            info["write_bytes"] = io.write_bytes
+        except Exception:
+            pass
+    try:
+        connections = proc.net_connections(kind="inet") if hasattr(proc, "net_connections") else proc.connections(kind="inet")
+        info["connections"] = [
+            f"{conn.raddr.ip}:{conn.raddr.port} {conn.status}" for conn in connections if conn.raddr
+        ]
+    except Exception:
+        pass
+    return info
+
+def _child_processes(control):
+    """CPU, RSS, I/O and open connections of the child processes of a job and their descendants."""
+    import psutil
+    with control.lock:
+        pids = [process.pid for process in control.processes]
+    procs = []
+    for pid in pids:
+        try:
+            proc = psutil.Process(pid)
+            procs += [proc] + proc.children(recursive=True)
+        except psutil.Error:
+            continue
+    for proc in procs:
+        try:
+            proc.cpu_percent(None)
+        except psutil.Error:
+            pass
+    if procs:
+        time.sleep(CPU_SAMPLE_SECONDS)
+    infos = []
+    for proc in procs:
+        try:
+            info = _process_info(proc)
+            info["cpu_percent"] = proc.cpu_percent(None)
+            infos.append(info)
+        except psutil.Error:
+            continue
+    return infos
+
+def capture_diagnostics(control, expected=None, basis=None):
+    """Snapshot of where a running job is: stack, FFmpeg progress, child processes and transfers."""
+    now = time.time()
+    snapshot = {
+        "captured_at": now,
+        "run_seconds": round(now - control.started_at, 1),
+        "expected_seconds": round(expected, 1) if expected else None,
+        "basis": basis,
+        "stack": _thread_stack(control.thread_id),
+        "progress": read_progress(control.job_id),
+        "stages": stage_timings(control)
+    }
+    with control.lock:
+        transfers = list(control.transfers)
+    snapshot["transfers"] = [item.snapshot(now) for item in transfers]
+    try:
+        snapshot["processes"] = _child_processes(control)
+    except Exception as e:
+        snapshot["processes"] = None
+        logger.warning(f"Job {control.job_id}: [WATCHDOG] Could not inspect child processes: {str(e)}")
+    return snapshot
+
+def _publish(control):
+    # Only while the job runs, so the final record cannot be overwritten
+    def update():
+        store = get_job_status_store()
+        record = store.get(control.job_id)
+        if record is not None and record.get("job_status") == "running":
+            store.put(control.job_id, dict(record, diagnostics=control.diagnostics))
+    while_running(control, update)
+
+def check_job(control, now=None):
+    """Capture diagnostics of a job running past its slow threshold and cancel it past the cancel one."""
+    now = now or time.time()
+    elapsed = now - control.started_at
+    if control.cancelled.is_set() or elapsed < WATCHDOG_MIN_SECONDS:
+        return
+    expected, basis = estimate_run_seconds(control.endpoint, control.cost.get("cpu_seconds", 0))
+    if not expected:
+        return
+
+    taken = len(control.diagnostics)
+    over_cancel = WATCHDOG_CANCEL_FACTOR > 0 and elapsed >= expected * WATCHDOG_CANCEL_FACTOR
+    if (taken < MAX_SNAPSHOTS and elapsed >= expected * WATCHDOG_SLOW_FACTOR * 2 ** taken) or (over_cancel and not taken):
+        snapshot = capture_diagnostics(control, expected, basis)
+        control.diagnostics.append(snapshot)
+        progress = snapshot["progress"] or {}
+        logger.warning(
+            f"Job {control.job_id}: [WATCHDOG] Running for {int(elapsed)}s, expected {int(expected)}s ({control.endpoint}) | "
+            f"FFmpeg: {progress.get('percent')}% at {progress.get('speed')} | "
+            f"{len(snapshot['processes'] or [])} child process(es), {len(snapshot['transfers'])} transfer(s)"
+        )
+        _publish(control)
+
+    if over_cancel:
+        cancel_job(
+            control.job_id,
+            f"Watchdog: run time of {int(elapsed)}s exceeds {WATCHDOG_CANCEL_FACTOR}x the expected {int(expected)}s",
+            timed_out=True
+        )
+
+def _watchdog_loop():
+    while True:
+        time.sleep(WATCHDOG_INTERVAL)
+        for control in running_jobs():
+            try:
+                check_job(control)
+            except Exception as e:
+                logger.error(f"Job {control.job_id}: [WATCHDOG] Error: {str(e)}")
+
+_watchdog_started = False
+
+def start_watchdog():
+    """Start the slow-job watchdog thread of this worker (WATCHDOG_ENABLED)."""
+    global _watchdog_started
+    if _watchdog_started or not WATCHDOG_ENABLED or WATCHDOG_INTERVAL <= 0:
+        return
+    _watchdog_started = True
+    threading.Thread(target=_watchdog_loop, name="job-watchdog", daemon=True).start()
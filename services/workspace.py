@@ -0,0 +1,213 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import time
+import shutil
+import threading
+import logging
+from config import LOCAL_STORAGE_PATH, WORKSPACE_QUOTA_MB, WORKSPACE_RAM_DIR, WORKSPACE_RAM_MAX_MB
+from services.job_control import get_job_control, track_job_file
+from services.file_management import download_file
+
+logger = logging.getLogger(__name__)
+
+# The job monitor asks every second; the directories are walked at most this often
+QUOTA_CHECK_SECONDS = 2
+
+class WorkspaceQuotaExceeded(Exception):
+    """The files of a job workspace outgrew its quota."""
+
+def _tree_size(root):
+    total = 0
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+    return total
+
+class JobWorkspace:
+    """
+    Private scratch directory of one job.
+
+    Files live in LOCAL_STORAGE_PATH/<job_id>_workspace, plus a directory on
+    a RAM disk (WORKSPACE_RAM_DIR) for small intermediates asked for with
+    path(..., ram=True). Both are registered with the running job: a
+    cancelled job has them removed, and the job monitor cancels a job whose
+    workspace grows past the quota. Leaving the context removes everything;
+    outputs must be uploaded (or moved out) before that.
+
+    Usage:
+        with JobWorkspace(job_id) as workspace:
+            video_path = workspace.download(video_url)
+            output_path = workspace.output_path("out.mp4")
+            ...
+            workspace.add_output(output_path)
+            for entry in workspace.manifest(): ...
+    """
+
+    def __init__(self, job_id, quota_mb=None, ram_max_mb=None):
+        self.job_id = job_id
+        quota_mb = WORKSPACE_QUOTA_MB if quota_mb is None else quota_mb
+        ram_max_mb = WORKSPACE_RAM_MAX_MB if ram_max_mb is None else ram_max_mb
+        self.quota_bytes = quota_mb * 1024 * 1024 if quota_mb > 0 else None
+        self.ram_max_bytes = ram_max_mb * 1024 * 1024 if ram_max_mb > 0 else 0
+        self.root = os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_workspace")
+        self.ram_root = None
+        if self.ram_max_bytes and WORKSPACE_RAM_DIR and os.path.isdir(WORKSPACE_RAM_DIR):
+            self.ram_root = os.path.join(WORKSPACE_RAM_DIR, f"{job_id}_workspace")
+        self._outputs = []
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._usage = 0
+        self._ram_used = 0
+        self._ram_checked_at = 0.0
+        self._control = None
+        self.closed = False
+
+    def open(self):
+        os.makedirs(os.path.join(self.root, "outputs"), exist_ok=True)
+        track_job_file(self.root)
+        if self.ram_root:
+            try:
+                os.makedirs(self.ram_root, exist_ok=True)
+                track_job_file(self.ram_root)
+            except OSError as e:
+                logger.warning(f"Job {self.job_id}: [WORKSPACE] RAM tier unavailable: {str(e)}")
+                self.ram_root = None
+        self._control = get_job_control()
+        if self._control is not None:
+            with self._control.lock:
+                self._control.workspaces.add(self)
+        return self
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def path(self, name, ram=False, size_hint=None):
+        """
+        Path for a scratch file. With ram=True it is on the RAM disk while
+        the RAM tier stays under WORKSPACE_RAM_MAX_MB (including
+        `size_hint` bytes), otherwise on disk.
+        """
+        if ram and self.ram_root:
+            with self._lock:
+                now = time.time()
+                # The RAM tree is walked at most every QUOTA_CHECK_SECONDS;
+                # paths handed out in between count with their size_hint
+                if now - self._ram_checked_at >= QUOTA_CHECK_SECONDS:
+                    self._ram_used = _tree_size(self.ram_root)
+                    self._ram_checked_at = now
+                if self._ram_used + (size_hint or 0) <= self.ram_max_bytes:
+                    self._ram_used += size_hint or 0
+                    return os.path.join(self.ram_root, name)
+        return os.path.join(self.root, name)
+
+    def mkdir(self, name, ram=False):
+        path = self.path(name, ram=ram)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def output_path(self, name):
+        """Path for an output file; outputs/ holds nothing else."""
+        return os.path.join(self.root, "outputs", name)
+
+    @property
+    def outputs_dir(self):
+        return os.path.join(self.root, "outputs")
+
+    def download(self, url):
+        """download_file into the workspace, checked against the quota."""
+        path = download_file(url, self.root)
+        self.check_quota()
+        return path
+
+    def add_output(self, path, **meta):
+        """Record an output in the manifest, in the order outputs are added."""
+        entry = dict(meta, path=path, name=os.path.basename(path), size=os.path.getsize(path))
+        with self._lock:
+            self._outputs.append(entry)
+        return entry
+
+    def collect_outputs(self, suffix=None):
+        """Add every file of outputs/ (ending in `suffix`) to the manifest, sorted by name."""
+        names = sorted(name for name in os.listdir(self.outputs_dir) if suffix is None or name.endswith(suffix))
+        return [self.add_output(os.path.join(self.outputs_dir, name)) for name in names]
+
+    def manifest(self):
+        with self._lock:
+            return [dict(entry) for entry in self._outputs]
+
+    def outputs(self):
+        return [entry["path"] for entry in self.manifest()]
+
+    def usage(self):
+        """Bytes used by the workspace, RAM tier included."""
+        self._usage = _tree_size(self.root) + (_tree_size(self.ram_root) if self.ram_root else 0)
+        self._checked_at = time.time()
+        return self._usage
+
+    def over_quota(self, now=None):
+        """Reason to stop the job when the workspace is over its quota, else None. Called by the job monitor."""
+        if self.quota_bytes is None or self.closed:
+            return None
+        if (now or time.time()) - self._checked_at < QUOTA_CHECK_SECONDS:
+            used = self._usage
+        else:
+            used = self.usage()
+        if used > self.quota_bytes:
+            return f"Workspace quota of {self.quota_bytes // (1024 * 1024)} MB exceeded ({used // (1024 * 1024)} MB used)"
+        return None
+
+    def check_quota(self):
+        """
+        Raises:
+            WorkspaceQuotaExceeded: If the workspace is over its quota
+        """
+        self._checked_at = 0.0
+        reason = self.over_quota()
+        if reason:
+            raise WorkspaceQuotaExceeded(reason)
+
+    def close(self):
+        """Remove the workspace. Safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._control is not None:
+            with self._control.lock:
+                self._control.workspaces.discard(self)
+        freed = self.usage()
+        for root in (self.root, self.ram_root):
+            if root:
+                shutil.rmtree(root, ignore_errors=True)
+        logger.info(f"Job {self.job_id}: [WORKSPACE] Removed workspace ({freed} bytes, {len(self._outputs)} output(s))")